@@ -0,0 +1,3 @@
+"""
+Benchmarks of cbrlib on synthetic casebases, see ``python -m benchmarks --help``.
+"""
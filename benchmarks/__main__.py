@@ -0,0 +1,79 @@
+"""
+Runs the benchmarks, writes the measurements as JSON and compares them to a baseline.
+
+    python -m benchmarks --sizes 1000 10000 --output results.json --baseline benchmarks/baseline.json
+
+The exit code is 1, if the throughput of any benchmark dropped by more than ``--tolerance`` compared to the
+baseline. ``benchmarks/baseline.json`` holds the measurements of the default sizes, which are refreshed with
+``--output benchmarks/baseline.json`` when a change is expected to alter them.
+"""
+
+import argparse
+import json
+import platform
+import sys
+
+from benchmarks import suite
+
+
+def _report(measurement: suite.Measurement) -> None:
+    # below MIN_REPEAT_P99 runs there is no p99 and the slowest run is reported as what it is
+    tail, latency = ("p99", measurement.p99) if measurement.p99 is not None else ("max", measurement.max)
+    print(
+        f"{measurement.name:<32} {measurement.size:>10} "
+        f"{measurement.throughput:>14.0f} cases/s "
+        f"p50 {measurement.p50 * 1000:>10.3f}ms "
+        f"{tail} {latency * 1000:>10.3f}ms "
+        f"peak {measurement.peak_memory / 1024:>10.0f}KiB",
+        file=sys.stderr,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="numbers of cases")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help=f"timed runs per benchmark, the p99 latency needs at least {suite.MIN_REPEAT_P99}",
+    )
+    parser.add_argument("--filter", dest="pattern", help="only run benchmarks whose name contains this")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="file to write the measurements to")
+    parser.add_argument("--baseline", help="measurements to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative drop of the throughput")
+    arguments = parser.parse_args()
+
+    measurements = suite.run(
+        arguments.sizes, arguments.repeat, pattern=arguments.pattern, seed=arguments.seed, report=_report
+    )
+    result = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "measurements": suite.to_json(measurements),
+    }
+    if arguments.output:
+        with open(arguments.output, "w") as fd:
+            json.dump(result, fd, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+    if not arguments.baseline:
+        return 0
+    with open(arguments.baseline) as fd:
+        baseline = json.load(fd)["measurements"]
+    regressions = 0
+    for comparison in suite.compare(measurements, baseline):
+        regressed = comparison.ratio < 1 - arguments.tolerance
+        regressions += regressed
+        print(
+            f"{comparison.name:<32} {comparison.size:>10} {comparison.ratio:>6.2f}x"
+            f"{'  REGRESSION' if regressed else ''}",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
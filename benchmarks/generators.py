@@ -0,0 +1,95 @@
+"""
+Synthetic casebases for the benchmarks.
+
+The cases mix the attribute kinds cbrlib supports: numeric (``price``, ``rating``), ordered (``size``), looked up
+in a table (``colour``) and sets (``tags``). Cases are generated lazily from a seed, so even 10⁷ cases can be
+streamed without keeping them in memory, and the same seed always yields the same cases.
+"""
+
+import functools
+import random
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from cbrlib import evaluate
+from cbrlib.types import (
+    FunctionCalculationParameter,
+    NumericEvaluationOptions,
+    NumericInterpolation,
+    WeightedPropertyEvaluatorMapping,
+)
+
+SIZES = ["xs", "s", "m", "l", "xl", "xxl"]
+COLOURS = ["red", "orange", "yellow", "green", "blue", "purple", "black", "white"]
+TAGS = [f"tag-{i}" for i in range(40)]
+
+COLOUR_LOOKUP = {
+    "red": {"orange": 0.8, "purple": 0.5},
+    "orange": {"red": 0.8, "yellow": 0.8},
+    "yellow": {"orange": 0.8, "green": 0.4},
+    "green": {"yellow": 0.4, "blue": 0.5},
+    "blue": {"green": 0.5, "purple": 0.7},
+    "purple": {"blue": 0.7, "red": 0.5},
+    "black": {"white": 0.1},
+    "white": {"black": 0.1},
+}
+
+
+@dataclass(slots=True, frozen=True)
+class Product:
+    price: Optional[float] = None
+    rating: Optional[int] = None
+    size: Optional[str] = None
+    colour: Optional[str] = None
+    tags: Optional[tuple[str, ...]] = None
+
+
+def generate_cases(count: int, seed: int = 0) -> Iterator[Product]:
+    generator = random.Random(seed)
+    for _ in range(count):
+        yield Product(
+            price=round(generator.uniform(1, 1000), 2),
+            rating=generator.randint(0, 10),
+            size=generator.choice(SIZES),
+            colour=generator.choice(COLOURS),
+            tags=tuple(generator.sample(TAGS, generator.randint(1, 6))),
+        )
+
+
+def generate_queries(count: int, seed: int = 1) -> list[Product]:
+    return list(generate_cases(count, seed))
+
+
+def price_evaluator(interpolation: NumericInterpolation = NumericInterpolation.POLYNOM) -> evaluate.Evaluator:
+    parameter = FunctionCalculationParameter(equal=0.01, tolerance=0.5, linearity=0.5, interpolation=interpolation)
+    options = NumericEvaluationOptions(min_=1, max_=1000, if_less=parameter, if_more=parameter)
+    return functools.partial(evaluate.numeric, options)
+
+
+def rating_evaluator() -> evaluate.Evaluator:
+    parameter = FunctionCalculationParameter(tolerance=1.0)
+    options = NumericEvaluationOptions(min_=0, max_=10, if_less=parameter, if_more=parameter)
+    return functools.partial(evaluate.numeric, options)
+
+
+def size_evaluator() -> evaluate.Evaluator:
+    options = NumericEvaluationOptions(min_=0, max_=len(SIZES) - 1)
+    return functools.partial(evaluate.total_order, SIZES, functools.partial(evaluate.numeric, options))
+
+
+def colour_evaluator() -> evaluate.Evaluator:
+    return functools.partial(evaluate.table_lookup, COLOUR_LOOKUP)
+
+
+def tags_evaluator(set_similarity=evaluate.set_intermediate) -> evaluate.Evaluator:
+    return functools.partial(set_similarity, evaluate.equality)
+
+
+def mappings() -> tuple[WeightedPropertyEvaluatorMapping, ...]:
+    return (
+        WeightedPropertyEvaluatorMapping("price", price_evaluator(), 2),
+        WeightedPropertyEvaluatorMapping("rating", rating_evaluator(), 1),
+        WeightedPropertyEvaluatorMapping("size", size_evaluator(), 1),
+        WeightedPropertyEvaluatorMapping("colour", colour_evaluator(), 1),
+        WeightedPropertyEvaluatorMapping("tags", tags_evaluator(), 1),
+    )
@@ -0,0 +1,202 @@
+"""
+The benchmarks and the measurement of their throughput, latency and memory.
+
+A benchmark prepares its data for a number of cases once and returns a function which processes all of them.
+That function is timed ``repeat`` times. The p99 latency is only reported for at least ``MIN_REPEAT_P99`` runs,
+below that it would just be the slowest run, which is reported as ``max``. The peak memory is measured with
+``tracemalloc`` in an extra run, so tracing does not distort the timings.
+"""
+
+import dataclasses
+import functools
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional
+
+from cbrlib import casebase, evaluate
+from cbrlib.casebase import CaseBase
+from cbrlib.types import FacetConfig, NumericInterpolation, ReasoningRequest
+
+from benchmarks import generators
+
+Run = Callable[[], Any]
+
+MIN_REPEAT_P99 = 100
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    prepare: Callable[[int, int], Run]
+
+
+@dataclass(frozen=True)
+class Measurement:
+    name: str
+    size: int
+    repeat: int
+    throughput: float
+    p50: float
+    p99: Optional[float]
+    max: float
+    peak_memory: int
+
+
+def _request(query: generators.Product, facets: bool) -> ReasoningRequest:
+    if not facets:
+        return ReasoningRequest(query, limit=10, threshold=0.5)
+    return ReasoningRequest(
+        query,
+        limit=10,
+        threshold=0.5,
+        facets=(FacetConfig("rating"), FacetConfig("size"), FacetConfig("colour")),
+    )
+
+
+def _infer(columnar: bool, facets: bool, size: int, seed: int) -> Run:
+    mappings = generators.mappings()
+    cases = generators.generate_cases(size, seed)
+    # the columnar casebase reads the cases from the generator, so they are not copied into another list first
+    source = CaseBase(cases, mappings) if columnar else list(cases)
+    request = _request(generators.generate_queries(1, seed + 1)[0], facets)
+    evaluator = functools.partial(evaluate.case_average, mappings)
+    return functools.partial(casebase.infer, source, request, evaluator)
+
+
+def _infer_stream(size: int, seed: int) -> Run:
+    evaluator = functools.partial(evaluate.case_average, generators.mappings())
+    request = _request(generators.generate_queries(1, seed + 1)[0], True)
+    return lambda: casebase.infer(generators.generate_cases(size, seed), request, evaluator)
+
+
+def _aggregate(aggregation: Callable[..., float], size: int, seed: int) -> Run:
+    mappings = generators.mappings()
+    if aggregation is not evaluate.case_average:
+        mappings = tuple(evaluate.PropertyEvaluatorMapping(m[0], m[1]) for m in mappings)
+    evaluator = functools.partial(aggregation, mappings)
+    cases = list(generators.generate_cases(size, seed))
+    query = generators.generate_queries(1, seed + 1)[0]
+    return lambda: [evaluator(query, case) for case in cases]
+
+
+def _attribute(evaluator: evaluate.Evaluator, property_name: str, size: int, seed: int) -> Run:
+    values = [getattr(case, property_name) for case in generators.generate_cases(size, seed)]
+    query = getattr(generators.generate_queries(1, seed + 1)[0], property_name)
+    return lambda: [evaluator(query, value) for value in values]
+
+
+def _benchmarks() -> list[Benchmark]:
+    benchmarks = [
+        Benchmark("infer/list", functools.partial(_infer, False, False)),
+        Benchmark("infer/list/facets", functools.partial(_infer, False, True)),
+        Benchmark("infer/casebase", functools.partial(_infer, True, False)),
+        Benchmark("infer/casebase/facets", functools.partial(_infer, True, True)),
+        Benchmark("infer/stream/facets", _infer_stream),
+    ]
+    for aggregation in (
+        evaluate.case_average,
+        evaluate.case_median,
+        evaluate.case_min,
+        evaluate.case_max,
+        evaluate.case_euclidean,
+    ):
+        benchmarks.append(Benchmark(f"aggregate/{aggregation.__name__}", functools.partial(_aggregate, aggregation)))
+    for interpolation in NumericInterpolation:
+        evaluator = generators.price_evaluator(interpolation)
+        benchmarks.append(
+            Benchmark(f"numeric/{interpolation.value}", functools.partial(_attribute, evaluator, "price"))
+        )
+    for set_similarity in (evaluate.set_query_inclusion, evaluate.set_case_inclusion, evaluate.set_intermediate):
+        evaluator = generators.tags_evaluator(set_similarity)
+        benchmarks.append(
+            Benchmark(f"set/{set_similarity.__name__}", functools.partial(_attribute, evaluator, "tags"))
+        )
+    return benchmarks
+
+
+BENCHMARKS = _benchmarks()
+
+
+def _percentile(ordered: list[float], percentile: float) -> float:
+    index = min(len(ordered) - 1, max(0, round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(benchmark: Benchmark, size: int, repeat: int, seed: int = 0) -> Measurement:
+    run = benchmark.prepare(size, seed)
+    run()
+    latencies = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    latencies.sort()
+    p50 = _percentile(latencies, 50)
+    return Measurement(
+        benchmark.name,
+        size,
+        repeat,
+        throughput=size / p50 if p50 > 0 else float("inf"),
+        p50=p50,
+        p99=_percentile(latencies, 99) if repeat >= MIN_REPEAT_P99 else None,
+        max=latencies[-1],
+        peak_memory=peak_memory,
+    )
+
+
+def run(
+    sizes: Iterable[int],
+    repeat: int = 5,
+    *,
+    pattern: Optional[str] = None,
+    seed: int = 0,
+    report: Callable[[Measurement], None] = lambda measurement: None,
+) -> list[Measurement]:
+    measurements = []
+    for size in sizes:
+        for benchmark in BENCHMARKS:
+            if pattern is not None and pattern not in benchmark.name:
+                continue
+            measurement = measure(benchmark, size, repeat, seed)
+            report(measurement)
+            measurements.append(measurement)
+    return measurements
+
+
+@dataclass(frozen=True)
+class Comparison:
+    name: str
+    size: int
+    throughput: float
+    baseline: float
+
+    @property
+    def ratio(self) -> float:
+        return self.throughput / self.baseline if self.baseline > 0 else float("inf")
+
+
+def compare(measurements: Iterable[Measurement], baseline: Iterable[dict[str, Any]]) -> list[Comparison]:
+    """Pairs every measurement with the baseline measurement of the same benchmark and size, if any."""
+    baseline_throughputs = {(b["name"], b["size"]): b["throughput"] for b in baseline}
+    comparisons = []
+    for measurement in measurements:
+        baseline_throughput = baseline_throughputs.get((measurement.name, measurement.size))
+        if baseline_throughput is not None:
+            comparisons.append(
+                Comparison(measurement.name, measurement.size, measurement.throughput, baseline_throughput)
+            )
+    return comparisons
+
+
+def to_json(measurements: Iterable[Measurement]) -> list[dict[str, Any]]:
+    return [dataclasses.asdict(measurement) for measurement in measurements]
@@ -0,0 +1,35 @@
+import time
+
+from cbrlib import ReasoningRequest, casebase, evaluate
+from cbrlib.compiling import compile_evaluator
+
+from main import Whiskey, load_whiskeys, whiskey_evaluator
+
+REPEATS = 20
+
+
+def measure(whiskeys, request, evaluator) -> float:
+    runtimes = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        casebase.infer(whiskeys, request, evaluator)
+        runtimes.append(time.perf_counter() - start)
+    return min(runtimes)
+
+
+def main() -> None:
+    whiskeys = load_whiskeys()
+    request = ReasoningRequest(query=Whiskey(age=25, colour="peat", sweetness=10, peatiness=0), limit=10)
+    evaluator = whiskey_evaluator()
+    compiled = compile_evaluator(evaluator.args[0], evaluate.case_average)
+    expected = casebase.infer(whiskeys, request, evaluator)
+    assert casebase.infer(whiskeys, request, compiled) == expected
+
+    nested = measure(whiskeys, request, evaluator)
+    flat = measure(whiskeys, request, compiled)
+    print(f"nested partials: {nested * 1000:.3f}ms")
+    print(f"compiled:        {flat * 1000:.3f}ms ({nested / flat:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
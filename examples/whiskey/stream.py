@@ -0,0 +1,30 @@
+import json
+import sys
+from typing import Iterator
+
+from cbrlib import FacetConfig, ReasoningRequest, casebase
+
+from main import Whiskey, _serializer, raw_whiskeys, whiskey_evaluator
+
+
+def stream_whiskeys() -> Iterator[Whiskey]:
+    for row in raw_whiskeys():
+        yield Whiskey(**row)
+
+
+def main() -> None:
+    request = ReasoningRequest(
+        query=Whiskey(age=25, colour="peat", sweetness=10, peatiness=0),
+        limit=5,
+        threshold=0.4,
+        facets=(FacetConfig("distillery"), FacetConfig("colour")),
+    )
+    for progress in casebase.infer_iter(stream_whiskeys(), request, whiskey_evaluator(), every=25):
+        if not progress.complete:
+            best = progress.response.hits[0].similarity if progress.response.hits else 0
+            print(f"{progress.number_of_cases} whiskeys scored, best similarity {best:.3f}", file=sys.stderr)
+    print(json.dumps(progress.response, indent=2, default=_serializer))
+
+
+if __name__ == "__main__":
+    main()
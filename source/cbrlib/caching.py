@@ -0,0 +1,162 @@
+"""
+A cache of ranked results, so paging through the hits of a query does not score the casebase again.
+
+The cache stores the positions and similarities of the best hits of a query together with the total number
+of hits and the facets. Every page of the same query is served from that ranking as long as it lies within
+the cached depth. Entries are evicted least recently used first.
+"""
+
+import dataclasses
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional, Sequence
+
+from cbrlib.casebase import HitCollector, collect, snapshot_of
+from cbrlib.columns import value_key
+from cbrlib.evaluate import Evaluator
+from cbrlib.types import C, Facet, FacetValue, ReasoningRequest, ReasoningResponse, Result
+
+
+def query_key(query: Any) -> Hashable:
+    """
+    Returns a hashable key for a query, so that equal queries have the same key. Dataclasses are keyed by
+    their fields, everything else like ``columns.value_key``.
+    """
+    if dataclasses.is_dataclass(query) and not isinstance(query, type):
+        return type(query), tuple(query_key(getattr(query, f.name)) for f in dataclasses.fields(query))
+    return value_key(query)
+
+
+def _facets_key(facets: Optional[Iterable[Any]]) -> Optional[tuple[Any, ...]]:
+    return tuple(facets) if facets is not None else None
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class _Ranking:
+    casebase: Any
+    cases: Sequence[Any]
+    version: Any
+    evaluator: Evaluator
+    depth: int
+    total_number_of_hits: int
+    positions: list[int]
+    similarities: list[float]
+    facets: Optional[tuple[Facet, ...]]
+
+
+def _copy_facets(facets: Optional[Iterable[Facet]]) -> Optional[list[Facet]]:
+    if facets is None:
+        return None
+    return [
+        Facet(facet.name, [FacetValue(v.value, v.count, v.importance) for v in facet.values], facet.entropy)
+        for facet in facets
+    ]
+
+
+class ResultCache:
+    """
+    Caches the ranked hits of requests against sequences of cases.
+
+    The key of an entry is the normalized query, the threshold, the facets, the evaluator (by identity) and
+    the casebase (by identity). A ``CaseBase`` also contributes its ``version``, so entries of a changed
+    casebase are not used anymore. Other sequences have to be invalidated with ``invalidate`` after a change.
+
+    At least ``depth`` hits are ranked on a miss. A page beyond the cached depth ranks twice as many hits as
+    needed. At most ``maxsize`` rankings are kept.
+    """
+
+    def __init__(self, maxsize: int = 128, *, depth: int = 100) -> None:
+        self.maxsize = maxsize
+        self.depth = depth
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, _Ranking] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _key(self, casebase: Sequence[Any], request: ReasoningRequest, evaluator: Evaluator) -> tuple:
+        return (
+            id(casebase),
+            id(evaluator),
+            query_key(request.query),
+            request.threshold,
+            _facets_key(request.facets),
+        )
+
+    def _lookup(self, key: tuple, casebase: Sequence[Any], evaluator: Evaluator, depth: int) -> Optional[_Ranking]:
+        with self._lock:
+            ranking = self._entries.get(key)
+            if ranking is None:
+                return None
+            if (
+                ranking.casebase is not casebase
+                or ranking.evaluator is not evaluator
+                or ranking.version != getattr(casebase, "version", None)
+            ):
+                del self._entries[key]
+                return None
+            if ranking.depth < depth and ranking.total_number_of_hits > ranking.depth:
+                return None
+            self._entries.move_to_end(key)
+            return ranking
+
+    def _store(self, key: tuple, ranking: _Ranking) -> None:
+        with self._lock:
+            self._entries[key] = ranking
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def infer(
+        self,
+        casebase: Sequence[C],
+        request: ReasoningRequest[C],
+        evaluator: Evaluator,
+        *,
+        getvalue: Callable[[Any, str, Optional[Any]], Any] = getattr,
+    ) -> ReasoningResponse[C]:
+        """Returns the same response as ``casebase.infer``, scoring the casebase only on a cache miss."""
+        key = self._key(casebase, request, evaluator)
+        page_end = request.offset + request.limit
+        ranking = self._lookup(key, casebase, evaluator, page_end)
+        cases = ranking.cases if ranking is not None else snapshot_of(casebase)
+        if ranking is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            version = getattr(cases, "version", None)
+            depth = max(self.depth, page_end if page_end <= self.depth else 2 * page_end)
+            collector = HitCollector(dataclasses.replace(request, offset=0, limit=depth), getvalue)
+            collect(cases, request, evaluator, collector)
+            ranked = collector.ranking()
+            facets = collector.facets()
+            ranking = _Ranking(
+                casebase,
+                cases,
+                version,
+                evaluator,
+                depth,
+                collector.total_number_of_hits,
+                [position for _, position in ranked],
+                [similarity for similarity, _ in ranked],
+                tuple(facets) if facets is not None else None,
+            )
+            self._store(key, ranking)
+        positions = ranking.positions[request.offset:page_end]  # fmt: skip
+        similarities = ranking.similarities[request.offset:page_end]  # fmt: skip
+        return ReasoningResponse(
+            ranking.total_number_of_hits,
+            hits=[Result(similarity, cases[position]) for similarity, position in zip(similarities, positions)],
+            facets=_copy_facets(ranking.facets),
+        )
+
+    def invalidate(self, casebase: Optional[Sequence[Any]] = None) -> None:
+        """Removes the entries of a casebase or all entries."""
+        with self._lock:
+            if casebase is None:
+                self._entries.clear()
+                return
+            for key in [key for key, ranking in self._entries.items() if ranking.casebase is casebase]:
+                del self._entries[key]
@@ -1,8 +1,28 @@
-from typing import Any, Callable, Iterable, Optional
+import asyncio
+import bisect
+import functools
+import heapq
+import itertools
+import threading
+from array import array
+from concurrent.futures import Executor
+from typing import Any, AsyncIterable, Callable, Generic, Iterable, Iterator, Mapping, Optional, Sequence, Union
 
+from cbrlib import compiling, evaluate, indexing, instrumentation
+from cbrlib.columns import Column
 from cbrlib.evaluate import Evaluator
-from cbrlib.facetting import FacetCollectingIterator
-from cbrlib.types import C, Facet, ReasoningRequest, ReasoningResponse, Result
+from cbrlib.facetting import FacetCollector
+from cbrlib.types import (
+    C,
+    Facet,
+    PropertyEvaluatorMapping,
+    ReasoningProgress,
+    ReasoningRequest,
+    ReasoningResponse,
+    ReasoningStats,
+    Result,
+    WeightedPropertyEvaluatorMapping,
+)
 
 
 def _make_relevant_facets(
@@ -19,39 +39,957 @@ def _make_relevant_facets(
     )
 
 
+class CaseBase(Sequence[C]):
+    """
+    A casebase which ingests its cases once and stores the properties used for reasoning as columns.
+
+    A column is built for every property named in ``mappings`` and ``properties`` when the casebase is
+    created. Columns of other properties are built on first access. ``infer`` evaluates a ``CaseBase``
+    column by column if the evaluator is one of the ``case_*`` aggregators of ``cbrlib.evaluate``.
+
+    Indexes of the columns are built on first use. For ``case_average`` evaluators and a threshold above 0
+    ``infer`` uses them to evaluate only the cases which can reach the threshold.
+
+    If ``deduplicate`` is set, cases with the same values (see ``columns.value_key``) for all properties named
+    in ``mappings`` and ``properties`` are grouped. ``infer`` then scores one case per group and applies its
+    similarity to all cases of the group, if the evaluator is built from mappings of these properties only
+    (``functools.partial(case_*, mappings)`` or a ``CompiledEvaluator``). The response stays the same.
+    """
+
+    def __init__(
+        self,
+        cases: Iterable[C],
+        mappings: Iterable[Union[PropertyEvaluatorMapping, WeightedPropertyEvaluatorMapping]] = (),
+        *,
+        properties: Iterable[str] = (),
+        getvalue: Callable[[Any, str], Any] = getattr,
+        deduplicate: bool = False,
+    ) -> None:
+        self._cases = list(cases)
+        self._getvalue = getvalue
+        self._columns: dict[str, Column] = {}
+        self._value_indexes: dict[str, Optional[indexing.ValueIndex]] = {}
+        self._numeric_indexes: dict[str, Optional[indexing.NumericIndex]] = {}
+        self._version = 0
+        projection = list(dict.fromkeys([*(m[0] for m in mappings), *properties]))
+        self._projection: Optional[frozenset[str]] = frozenset(projection) if deduplicate else None
+        self._groups: Optional[_CaseGroups] = None
+        for property_name in projection:
+            self.column(property_name)
+
+    def __len__(self) -> int:
+        return len(self._cases)
+
+    def __getitem__(self, index):
+        return self._cases[index]
+
+    def __iter__(self) -> Iterator[C]:
+        return iter(self._cases)
+
+    @property
+    def version(self) -> int:
+        """A counter which changes whenever the cases change, e.g. to invalidate cached results."""
+        return self._version
+
+    def column(self, property_name: str) -> Column:
+        column = self._columns.get(property_name)
+        if column is None:
+            getvalue = self._getvalue
+            column = Column(property_name, [getvalue(case, property_name) for case in self._cases])
+            self._columns[property_name] = column
+        return column
+
+    @property
+    def columns(self) -> Mapping[str, Column]:
+        return _Columns(self)
+
+    def value_index(self, property_name: str) -> Optional[indexing.ValueIndex]:
+        """Returns the inverted index of a column or ``None``, if the column contains unhashable values."""
+        if property_name not in self._value_indexes:
+            self._value_indexes[property_name] = indexing.ValueIndex.build(self.column(property_name))
+        return self._value_indexes[property_name]
+
+    def numeric_index(self, property_name: str) -> Optional[indexing.NumericIndex]:
+        """Returns the sorted index of a column or ``None``, if the column contains non-numeric values."""
+        if property_name not in self._numeric_indexes:
+            self._numeric_indexes[property_name] = indexing.NumericIndex.build(self.column(property_name))
+        return self._numeric_indexes[property_name]
+
+    def groups(self) -> Optional["_CaseGroups"]:
+        """Returns the groups of equal cases, if the casebase was created with ``deduplicate``."""
+        if self._projection is not None and self._groups is None:
+            self._groups = _CaseGroups.build([self.column(name) for name in sorted(self._projection)])
+        return self._groups
+
+    def slice(self, start: int, stop: int) -> "CaseBase[C]":
+        """Returns a casebase with the cases ``start:stop`` which reuses the values of the columns built so far."""
+        casebase = CaseBase(self._cases[start:stop], getvalue=self._getvalue)
+        casebase._projection = self._projection
+        for property_name, column in self._columns.items():
+            casebase._columns[property_name] = Column(property_name, column.values[start:stop])
+        return casebase
+
+
+class _CaseGroups:
+    """
+    The cases of a casebase grouped by the codes of their values in the projected columns. Groups are
+    numbered in the order of their first case, the positions of every group are ascending.
+    """
+
+    __slots__ = ("of_case", "members", "representatives")
+
+    def __init__(self, of_case: array, members: list[array]) -> None:
+        self.of_case = of_case
+        self.members = members
+        self.representatives = [positions[0] for positions in members]
+
+    @classmethod
+    def build(cls, columns: Sequence[Column]) -> "_CaseGroups":
+        groups: dict[tuple[int, ...], int] = {}
+        of_case = array("l")
+        members: list[array] = []
+        for position, key in enumerate(zip(*(column.codes for column in columns))):
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = len(members)
+                members.append(array("l"))
+            members[group].append(position)
+            of_case.append(group)
+        return cls(of_case, members)
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+
+class _Columns(Mapping[str, Column]):
+    def __init__(self, casebase: CaseBase) -> None:
+        self._casebase = casebase
+
+    def __getitem__(self, property_name: str) -> Column:
+        return self._casebase.column(property_name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._casebase._columns)
+
+    def __len__(self) -> int:
+        return len(self._casebase._columns)
+
+
+class _SelectedColumns(Mapping[str, Column]):
+    def __init__(self, casebase: CaseBase, positions: Sequence[int]) -> None:
+        self._casebase = casebase
+        self._positions = positions
+
+    def __getitem__(self, property_name: str) -> Column:
+        return self._casebase.column(property_name).take(self._positions)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._casebase._columns)
+
+    def __len__(self) -> int:
+        return len(self._casebase._columns)
+
+
+class _LivePositions:
+    # The positions of the live cases of a base among each other, of which the cases at the ``removed`` slots
+    # were removed. Only the removed slots are kept, so a base with few removed cases costs little memory.
+    __slots__ = ("_size", "_removed", "_removed_slots", "_gaps")
+
+    def __init__(self, size: int, removed: Iterable[int]) -> None:
+        self._size = size
+        self._removed = sorted(removed)
+        self._removed_slots = set(self._removed)
+        # the number of live slots before every removed slot, the live position at which the slots jump
+        self._gaps = [slot - index for index, slot in enumerate(self._removed)]
+
+    def __len__(self) -> int:
+        return self._size - len(self._removed)
+
+    def __getitem__(self, slot: int) -> int:
+        """Returns the position of the case at a slot of the base, -1 if it was removed."""
+        if slot in self._removed_slots:
+            return -1
+        return slot - bisect.bisect_left(self._removed, slot)
+
+    def slot(self, position: int) -> int:
+        return position + bisect.bisect_right(self._gaps, position)
+
+    def slots(self) -> Iterator[int]:
+        start = 0
+        for removed in self._removed:
+            yield from range(start, removed)
+            start = removed + 1
+        yield from range(start, self._size)
+
+
+class _LiveCollector:
+    # Passes the hits of the live cases of a segment on with their position in the snapshot.
+    __slots__ = ("_collector", "_positions", "_start")
+
+    def __init__(self, collector: "HitCollector", positions: _LivePositions, start: int) -> None:
+        self._collector = collector
+        self._positions = positions
+        self._start = start
+
+    def collect(self, similarity: float, slot: int, case: Any) -> None:
+        position = self._positions[slot]
+        if position >= 0:
+            self._collector.collect(similarity, self._start + position, case)
+
+    def collect_columns(
+        self,
+        casebase: CaseBase,
+        slots: Sequence[int],
+        similarities: Sequence[float],
+        start: int,
+        renumber: Optional[Sequence[int]] = None,
+    ) -> None:
+        removed = self._positions._removed_slots
+        live = [index for index, slot in enumerate(slots) if slot not in removed]
+        self._collector.collect_columns(
+            casebase,
+            [slots[index] for index in live],
+            [similarities[index] for index in live],
+            self._start,
+            self._positions,
+        )
+
+
+class _AddedCases:
+    # The cases added to a ``MutableCaseBase`` since its base was built and the values of their properties.
+    # The lists are only appended to, so a snapshot reads the first cases it counted, no matter how many cases
+    # were added after it was taken.
+    __slots__ = ("cases", "values", "getvalue")
+
+    def __init__(self, properties: Iterable[str], getvalue: Callable[[Any, str], Any]) -> None:
+        self.cases: list[Any] = []
+        self.values: dict[str, list[Any]] = {property_name: [] for property_name in properties}
+        self.getvalue = getvalue
+
+    def __len__(self) -> int:
+        return len(self.cases)
+
+    def extend(self, cases: list[Any]) -> None:
+        getvalue = self.getvalue
+        for property_name, values in self.values.items():
+            values.extend(getvalue(case, property_name) for case in cases)
+        self.cases.extend(cases)
+
+    def without(self, index: int) -> "_AddedCases":
+        """Returns new lists without the case at ``index``, since snapshots may read the current ones."""
+        added = _AddedCases(self.values, self.getvalue)
+        for values, current in zip((added.cases, *added.values.values()), (self.cases, *self.values.values())):
+            values.extend(current)
+            del values[index]
+        return added
+
+    def casebase(self, count: int) -> CaseBase:
+        casebase = CaseBase(self.cases[:count], getvalue=self.getvalue)
+        for property_name, values in self.values.items():
+            casebase._columns[property_name] = Column(property_name, values[:count])
+        return casebase
+
+
+class CaseBaseSnapshot(Sequence[C]):
+    """
+    The cases of a ``MutableCaseBase`` at one version. A snapshot never changes.
+
+    The cases are stored in an indexed base ``CaseBase``, of which removed cases are only marked, and a small
+    ``CaseBase`` of the cases added since the base was built, which is built when the snapshot is read first.
+    Both are evaluated with all fast paths of ``CaseBase`` and the results are the same as for a list of the
+    live cases in the order of the snapshot.
+    """
+
+    def __init__(
+        self,
+        base: CaseBase[C],
+        removed: list[int],
+        number_of_removed: int,
+        added: _AddedCases,
+        number_of_added: int,
+        version: int,
+    ) -> None:
+        self._base = base
+        self._removed = removed
+        self._number_of_removed = number_of_removed
+        self._added_cases = added
+        self._number_of_added = number_of_added
+        self._added: Optional[CaseBase[C]] = None
+        self._version = version
+        self._live: Optional[_LivePositions] = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _live_positions(self) -> _LivePositions:
+        # the slots of the base removed up to this version are the first ones of the append-only list
+        if self._live is None:
+            self._live = _LivePositions(len(self._base), self._removed[: self._number_of_removed])
+        return self._live
+
+    def _number_of_live(self) -> int:
+        return len(self._base) - self._number_of_removed
+
+    def _added_casebase(self) -> CaseBase[C]:
+        if self._added is None:
+            self._added = self._added_cases.casebase(self._number_of_added)
+        return self._added
+
+    def __len__(self) -> int:
+        return self._number_of_live() + self._number_of_added
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        number_of_live = self._number_of_live()
+        if index < 0:
+            index += len(self)
+        if 0 <= index < number_of_live:
+            if self._number_of_removed == 0:
+                return self._base[index]
+            return self._base[self._live_positions().slot(index)]
+        if not 0 <= index - number_of_live < self._number_of_added:
+            raise IndexError("snapshot index out of range")
+        return self._added_cases.cases[index - number_of_live]
+
+    def __iter__(self) -> Iterator[C]:
+        if self._number_of_removed == 0:
+            yield from self._base
+        else:
+            base = self._base
+            for slot in self._live_positions().slots():
+                yield base[slot]
+        yield from itertools.islice(self._added_cases.cases, self._number_of_added)
+
+    def segments(self, collector: "HitCollector[C]", start: int = 0) -> list[tuple[CaseBase[C], Any, int]]:
+        """
+        Returns the casebases the snapshot is made of, each with the collector to score it into and the
+        position of its first case, so that the hits of the live cases get their position in the snapshot.
+        """
+        number_of_live = self._number_of_live()
+        segments: list[tuple[CaseBase[C], Any, int]] = []
+        if self._number_of_removed == 0:
+            segments.append((self._base, collector, start))
+        elif number_of_live > 0:
+            segments.append((self._base, _LiveCollector(collector, self._live_positions(), start), 0))
+        if self._number_of_added > 0:
+            segments.append((self._added_casebase(), collector, start + number_of_live))
+        return segments
+
+    def _collect(
+        self, request: ReasoningRequest[C], evaluator: Evaluator, collector: "HitCollector[C]", start: int
+    ) -> None:
+        for casebase, segment_collector, segment_start in self.segments(collector, start):
+            collect(casebase, request, evaluator, segment_collector, start=segment_start)
+
+
+class MutableCaseBase(Generic[C]):
+    """
+    A casebase which changes with ``add``, ``update`` and ``remove`` and keeps its columns and indexes.
+
+    Every change publishes a new ``CaseBaseSnapshot`` with a higher ``version``. Readers work on the snapshot
+    they got, e.g. ``infer(casebase.snapshot(), ...)``, and never see a change which was applied after it was
+    taken. ``infer`` and the other functions of this module take the current snapshot themselves.
+
+    Added cases are appended to a small casebase of their own and removed cases are only marked, so a change
+    does not rebuild the columns and indexes of the other cases. When the added or removed cases exceed
+    ``compaction_ratio`` of the casebase, all live cases are moved to a new base reusing the values read so
+    far. An updated case moves to the end of the casebase order. Iterating a ``MutableCaseBase`` iterates its
+    current snapshot.
+    """
+
+    def __init__(
+        self,
+        cases: Iterable[C] = (),
+        mappings: Iterable[Union[PropertyEvaluatorMapping, WeightedPropertyEvaluatorMapping]] = (),
+        *,
+        properties: Iterable[str] = (),
+        getvalue: Callable[[Any, str], Any] = getattr,
+        compaction_ratio: float = 0.125,
+    ) -> None:
+        self._properties = list(dict.fromkeys([*(m[0] for m in mappings), *properties]))
+        self._getvalue = getvalue
+        self._compaction_ratio = compaction_ratio
+        self._lock = threading.Lock()
+        self._next_key = 0
+        self._version = 0
+        cases = list(cases)
+        keys = self._new_keys(len(cases))
+        self._build(CaseBase(cases, properties=self._properties, getvalue=getvalue), keys, [], [])
+
+    def _new_keys(self, count: int) -> list[int]:
+        keys = list(range(self._next_key, self._next_key + count))
+        self._next_key += count
+        return keys
+
+    def _build(self, base: CaseBase[C], base_keys: list[int], added: list[C], added_keys: list[int]) -> None:
+        self._base = base
+        self._base_keys = base_keys
+        # the slots of the removed cases of the base in the order of their removal, which snapshots share
+        self._removed: list[int] = []
+        self._added = _AddedCases(self._properties, self._getvalue)
+        self._added.extend(added)
+        self._added_keys = added_keys
+        self._locations: dict[int, tuple[bool, int]] = {key: (False, slot) for slot, key in enumerate(base_keys)}
+        self._locations.update((key, (True, index)) for index, key in enumerate(added_keys))
+        self._publish()
+
+    def _publish(self) -> None:
+        self._snapshot = CaseBaseSnapshot(
+            self._base, self._removed, len(self._removed), self._added, len(self._added), self._version
+        )
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def snapshot(self) -> CaseBaseSnapshot[C]:
+        """Returns the current cases. The snapshot does not change when the casebase changes."""
+        return self._snapshot
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def __iter__(self) -> Iterator[C]:
+        return iter(self._snapshot)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._locations
+
+    def _append(self, cases: list[C], keys: list[int]) -> None:
+        start = len(self._added)
+        self._added.extend(cases)
+        self._added_keys.extend(keys)
+        for offset, key in enumerate(keys):
+            self._locations[key] = (True, start + offset)
+
+    def _remove(self, key: int) -> None:
+        in_added, index = self._locations.pop(key)
+        if not in_added:
+            self._removed.append(index)
+            return
+        added_keys = list(self._added_keys)
+        del added_keys[index]
+        self._added = self._added.without(index)
+        self._added_keys = added_keys
+        for position in range(index, len(added_keys)):
+            self._locations[added_keys[position]] = (True, position)
+
+    def _commit(self) -> None:
+        limit = max(1, int(self._compaction_ratio * len(self._base)))
+        if len(self._added) > limit or len(self._removed) > limit:
+            self._compact()
+        else:
+            self._publish()
+
+    def _compact(self) -> None:
+        live = list(_LivePositions(len(self._base), self._removed).slots())
+        cases = [*(self._base[slot] for slot in live), *self._added.cases]
+        keys = [*(self._base_keys[slot] for slot in live), *self._added_keys]
+        base = CaseBase(cases, getvalue=self._getvalue)
+        for property_name in self._properties:
+            values = self._base.column(property_name).values
+            added = self._added.values[property_name]
+            base._columns[property_name] = Column(property_name, [*(values[slot] for slot in live), *added])
+        self._build(base, keys, [], [])
+
+    def add(self, case: C) -> int:
+        """Adds a case and returns the key which identifies it for ``update`` and ``remove``."""
+        return self.add_all([case])[0]
+
+    def add_all(self, cases: Iterable[C]) -> list[int]:
+        """Adds many cases as a single change and returns their keys."""
+        with self._lock:
+            cases = list(cases)
+            self._version += 1
+            keys = self._new_keys(len(cases))
+            self._append(cases, keys)
+            self._commit()
+            return keys
+
+    def update(self, key: int, case: C) -> None:
+        """Replaces the case with the given key. Raises a ``KeyError``, if there is no such case."""
+        with self._lock:
+            if key not in self._locations:
+                raise KeyError(key)
+            self._version += 1
+            self._remove(key)
+            self._append([case], [key])
+            self._commit()
+
+    def remove(self, key: int) -> None:
+        """Removes the case with the given key. Raises a ``KeyError``, if there is no such case."""
+        with self._lock:
+            if key not in self._locations:
+                raise KeyError(key)
+            self._version += 1
+            self._remove(key)
+            self._commit()
+
+
+class HitCollector(Generic[C]):
+    """
+    Collects the hits of a single request while the cases are scored, e.g. by ``collect``. Collectors of
+    disjoint parts of a casebase are combined with ``merge``.
+
+    Only the best ``offset + limit`` hits are kept in a bounded min-heap, so memory stays O(k) no matter
+    how large the casebase is. The heap entries are ``(similarity, -position, case)`` which keeps the
+    ranking identical to a stable descending sort over the casebase order.
+    """
+
+    def __init__(
+        self,
+        request: ReasoningRequest[C],
+        getvalue: Callable[[Any, str, Optional[Any]], Any],
+    ) -> None:
+        self._threshold = request.threshold
+        self._offset = request.offset
+        self._size = request.offset + request.limit
+        self._heap: list[tuple[float, int, C]] = []
+        self._facet_collector: Optional[FacetCollector] = None
+        if request.facets is not None:
+            relevant_facets = _make_relevant_facets(request.query, request.facets, getvalue)
+            self._facet_collector = FacetCollector(relevant_facets, getvalue=getvalue)
+        self.total_number_of_hits = 0
+
+    def collect(self, similarity: float, position: int, case: C) -> None:
+        if not similarity >= self._threshold:
+            return
+        self.total_number_of_hits += 1
+        if self._facet_collector is not None:
+            self._facet_collector.collect(similarity, case, position)
+        self._keep((similarity, -position, case))
+
+    def _keep(self, entry: tuple[float, int, C]) -> None:
+        heap = self._heap
+        if len(heap) < self._size:
+            heapq.heappush(heap, entry)
+        elif heap and entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def collect_columns(
+        self,
+        casebase: CaseBase[C],
+        positions: Sequence[int],
+        similarities: Sequence[float],
+        start: int,
+        renumber: Optional[Sequence[int]] = None,
+    ) -> None:
+        """
+        Collects the similarities of the cases at the given positions of a casebase. The facets are counted
+        on the dictionary encoded columns of the casebase. The position of a hit in the response order is
+        ``start`` plus its position or plus ``renumber[position]``, if given.
+        """
+        threshold = self._threshold
+        hits = [index for index, similarity in enumerate(similarities) if similarity >= threshold]
+        hit_positions = [positions[index] for index in hits]
+        hit_similarities = [similarities[index] for index in hits]
+        self.total_number_of_hits += len(hits)
+        if renumber is not None:
+            hit_numbers = [start + renumber[position] for position in hit_positions]
+        else:
+            hit_numbers = [start + position for position in hit_positions]
+        facet_collector = self._facet_collector
+        if facet_collector is not None:
+            if facet_collector.getvalue is casebase._getvalue:
+                facet_collector.collect_columns(casebase.columns, hit_positions, hit_similarities, hit_numbers)
+            else:
+                for position, similarity, number in zip(hit_positions, hit_similarities, hit_numbers):
+                    facet_collector.collect(similarity, casebase[position], number)
+        for position, similarity, number in zip(hit_positions, hit_similarities, hit_numbers):
+            self._keep((similarity, -number, casebase[position]))
+
+    def collect_groups(
+        self,
+        casebase: CaseBase[C],
+        groups: _CaseGroups,
+        selected: Sequence[int],
+        similarities: Sequence[float],
+        start: int,
+    ) -> None:
+        """
+        Collects the similarities of the selected groups of equal cases for every case of the groups. The
+        facets are collected case by case, so their counts and sums stay the same.
+        """
+        threshold = self._threshold
+        size = self._size
+        hit_similarities: dict[int, float] = {}
+        for group, similarity in zip(selected, similarities):
+            if similarity < threshold:
+                continue
+            members = groups.members[group]
+            hit_similarities[group] = similarity
+            self.total_number_of_hits += len(members)
+            # ties are ranked by position, so no more than the first ``size`` cases of a group can be kept
+            for position in members[:size]:
+                self._keep((similarity, -(start + position), casebase[position]))
+        facet_collector = self._facet_collector
+        if facet_collector is None or not hit_similarities:
+            return
+        hit_positions = sorted(itertools.chain.from_iterable(groups.members[group] for group in hit_similarities))
+        of_case = groups.of_case
+        similarities = [hit_similarities[of_case[position]] for position in hit_positions]
+        numbers = [start + position for position in hit_positions]
+        if facet_collector.getvalue is casebase._getvalue:
+            facet_collector.collect_columns(casebase.columns, hit_positions, similarities, numbers)
+        else:
+            for position, similarity, number in zip(hit_positions, similarities, numbers):
+                facet_collector.collect(similarity, casebase[position], number)
+
+    def merge(self, other: "HitCollector[C]") -> None:
+        """Adds the hits of a collector which scored another, disjoint part of the same casebase."""
+        self.total_number_of_hits += other.total_number_of_hits
+        if self._facet_collector is not None and other._facet_collector is not None:
+            self._facet_collector.merge(other._facet_collector)
+        heap = self._heap
+        for entry in other._heap:
+            if len(heap) < self._size:
+                heapq.heappush(heap, entry)
+            elif heap and entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+    def ranking(self) -> list[tuple[float, int]]:
+        """Returns the similarity and position of the hits kept so far in the order of the response."""
+        return [
+            (similarity, -negated_position) for similarity, negated_position, _ in sorted(self._heap, reverse=True)
+        ]
+
+    def facets(self) -> Optional[list[Facet]]:
+        return self._facet_collector.facets if self._facet_collector is not None else None
+
+    def hits(self) -> list[Result[C]]:
+        ranked = sorted(self._heap, reverse=True)
+        return [Result(similarity, case) for similarity, _, case in ranked[self._offset:]]  # fmt: skip
+
+    def response(self) -> ReasoningResponse[C]:
+        return ReasoningResponse(self.total_number_of_hits, hits=self.hits(), facets=self.facets())
+
+
+def snapshot_of(casebase: Any) -> Any:
+    """Returns the current snapshot of a ``MutableCaseBase`` and any other casebase as it is."""
+    return casebase.snapshot() if isinstance(casebase, MutableCaseBase) else casebase
+
+
+def _reads_columns(casebase: CaseBase, evaluator: Evaluator) -> bool:
+    # whether the columns and indexes of the casebase hold the values the evaluator reads from the cases, i.e.
+    # whether it is built as functools.partial(case_*, mappings) with the getvalue of the casebase
+    return (
+        isinstance(evaluator, functools.partial) and evaluator.keywords.get("getvalue", getattr) is casebase._getvalue
+    )
+
+
+def _reads_projection(casebase: CaseBase, evaluator: Evaluator) -> bool:
+    # whether the evaluator reads only projected properties of the cases, with the getvalue of the casebase
+    if isinstance(evaluator, compiling.CompiledEvaluator):
+        mappings, getvalue = evaluator.mappings, evaluator.getvalue
+    elif evaluate.as_column_evaluator(evaluator) is not None:
+        mappings, getvalue = evaluator.args[0], evaluator.keywords.get("getvalue", getattr)
+    else:
+        return False
+    return getvalue is casebase._getvalue and all(mapping[0] in casebase._projection for mapping in mappings)
+
+
+def _collect_groups(
+    casebase: CaseBase[C],
+    groups: _CaseGroups,
+    request: ReasoningRequest[C],
+    evaluator: Evaluator,
+    collector: HitCollector[C],
+    start: int,
+    stats: Optional[ReasoningStats],
+) -> None:
+    query = request.query
+    candidates = indexing.candidates(casebase, evaluator, query, request.threshold)
+    if candidates is not None:
+        of_case = groups.of_case
+        selected: Sequence[int] = sorted({of_case[position] for position in candidates})
+    else:
+        selected = range(len(groups))
+    representatives = [groups.representatives[group] for group in selected]
+    if stats is not None:
+        stats.cases_scored += len(representatives)
+    column_evaluator = evaluate.as_column_evaluator(evaluator)
+    if column_evaluator is not None:
+        columns = _SelectedColumns(casebase, representatives)
+        similarities = column_evaluator(query, columns, len(representatives))
+    else:
+        evaluator = compiling.bind(evaluator, query)
+        if stats is not None:
+            evaluator = instrumentation.timed_evaluator(evaluator, stats)
+        evaluator = evaluate.with_threshold(evaluator, request.threshold)
+        similarities = [evaluator(query, casebase[position]) for position in representatives]
+    collector.collect_groups(casebase, groups, selected, similarities, start)
+
+
+def collect(
+    casebase: Iterable[C],
+    request: ReasoningRequest[C],
+    evaluator: Evaluator,
+    collector: HitCollector[C],
+    *,
+    start: int = 0,
+) -> None:
+    """
+    Scores the cases of a casebase into a collector, using the columns and indexes of a ``CaseBase``. The
+    positions of the cases start at ``start``, e.g. for the parts of a casebase scored one after another.
+    """
+    query = request.query
+    casebase = snapshot_of(casebase)
+    stats = instrumentation.current()
+    if isinstance(casebase, CaseBaseSnapshot):
+        casebase._collect(request, evaluator, collector, start)
+        return
+    if isinstance(casebase, CaseBase):
+        groups = casebase.groups()
+        if groups is not None and _reads_projection(casebase, evaluator):
+            _collect_groups(casebase, groups, request, evaluator, collector, start, stats)
+            return
+    if isinstance(casebase, CaseBase) and _reads_columns(casebase, evaluator):
+        column_evaluator = evaluate.as_column_evaluator(evaluator)
+        positions = indexing.candidates(casebase, evaluator, query, request.threshold)
+        if column_evaluator is not None and positions is not None:
+            if stats is not None:
+                stats.cases_scored += len(positions)
+            columns = _SelectedColumns(casebase, positions)
+            similarities = column_evaluator(query, columns, len(positions))
+            collector.collect_columns(casebase, positions, similarities, start)
+            return
+        if column_evaluator is not None:
+            if stats is not None:
+                stats.cases_scored += len(casebase)
+            similarities = column_evaluator(query, casebase.columns, len(casebase))
+            collector.collect_columns(casebase, range(len(casebase)), similarities, start)
+            return
+    evaluator = compiling.bind(evaluator, query)
+    if stats is not None:
+        evaluator = instrumentation.timed_evaluator(evaluator, stats)
+        casebase = instrumentation.counted(casebase, stats)
+    evaluator = evaluate.with_threshold(evaluator, request.threshold)
+    for position, case in enumerate(casebase, start):
+        collector.collect(evaluator(query, case), position, case)
+
+
 def infer(
     casebase: Iterable[C],
     request: ReasoningRequest[C],
     evaluator: Evaluator,
     *,
     getvalue: Callable[[Any, str, Optional[Any]], Any] = getattr,
+    stats: bool = False,
+    on_stats: Optional[Callable[[ReasoningStats], None]] = None,
 ) -> ReasoningResponse[C]:
+    """
+    Returns the best hits of the casebase for the request.
 
-    threshold = request.threshold
-    evaluate_cases = map(
-        lambda c: Result(evaluator(request.query, c), c),
-        casebase,
-    )
-    sort_results = sorted(
-        evaluate_cases,
-        key=lambda r: r.similarity,
-        reverse=True,
-    )
-    calculate_results = filter(
-        lambda r: r.similarity >= threshold,
-        sort_results,
-    )
-    if request.facets is not None:
-        relevant_facets = _make_relevant_facets(request.query, request.facets, getvalue)
-        calculate_results = FacetCollectingIterator(calculate_results, relevant_facets, getvalue=getvalue)
-    result_list = list(calculate_results)
-    total_number_of_hits = len(result_list)
-
-    offset = request.offset
-    limit = request.limit
-    result_list = result_list[offset:offset + limit]  # fmt: skip
+    If ``stats`` is set, the response carries a ``ReasoningStats`` with the number of scored cases and hits,
+    the calls and time of the evaluator of every property and the time of the phases ``scoring`` (which
+    includes ``facet_collection``), ``ranking`` and ``facets``. ``on_stats`` is called with the same
+    statistics after the query, e.g. to sample them in production.
+    """
+    if stats or on_stats is not None:
+        return _infer_with_stats(casebase, request, evaluator, getvalue, stats, on_stats)
+    collector = HitCollector(request, getvalue)
+    collect(casebase, request, evaluator, collector)
+    return collector.response()
+
+
+def _infer_with_stats(
+    casebase: Iterable[C],
+    request: ReasoningRequest[C],
+    evaluator: Evaluator,
+    getvalue: Callable[[Any, str, Optional[Any]], Any],
+    stats: bool,
+    on_stats: Optional[Callable[[ReasoningStats], None]],
+) -> ReasoningResponse[C]:
+    reasoning_stats = ReasoningStats()
+    with instrumentation.collecting(reasoning_stats):
+        collector = HitCollector(request, getvalue)
+        if collector._facet_collector is not None:
+            collector._facet_collector = instrumentation.TimedFacetCollector(
+                collector._facet_collector, reasoning_stats
+            )
+        with instrumentation.phase(reasoning_stats, "scoring"):
+            collect(casebase, request, evaluator, collector)
+        with instrumentation.phase(reasoning_stats, "ranking"):
+            hits = collector.hits()
+        with instrumentation.phase(reasoning_stats, "facets"):
+            facets = collector.facets()
+    reasoning_stats.cases_above_threshold = collector.total_number_of_hits
+    if on_stats is not None:
+        on_stats(reasoning_stats)
     return ReasoningResponse(
-        total_number_of_hits,
-        hits=result_list,
-        facets=calculate_results.facets if request.facets is not None else None,
+        collector.total_number_of_hits, hits=hits, facets=facets, stats=reasoning_stats if stats else None
     )
+
+
+def infer_many(
+    casebase: Iterable[C],
+    requests: Iterable[ReasoningRequest[C]],
+    evaluator: Evaluator,
+    *,
+    getvalue: Callable[[Any, str, Optional[Any]], Any] = getattr,
+    chunk_size: int = 1024,
+) -> list[ReasoningResponse[C]]:
+    """
+    Answers many requests with a single pass over the casebase.
+
+    Every request gets the same response as from ``infer``. If the evaluator is one of the ``case_*``
+    aggregators, the cases are read in chunks of ``chunk_size`` into columns which are then evaluated for all
+    queries, so the values of each case are looked up only once per batch. A ``CaseBase`` is evaluated over
+    its existing columns.
+    """
+    _check_chunk_size("chunk_size", chunk_size)
+    casebase = snapshot_of(casebase)
+    requests = list(requests)
+    collectors = [HitCollector(request, getvalue) for request in requests]
+    column_evaluator = evaluate.as_column_evaluator(evaluator)
+    if column_evaluator is None:
+        queries = [request.query for request in requests]
+        evaluators = [
+            evaluate.with_threshold(compiling.bind(evaluator, query), request.threshold)
+            for query, request in zip(queries, requests)
+        ]
+        for position, case in enumerate(casebase):
+            for query, request_evaluator, collector in zip(queries, evaluators, collectors):
+                collector.collect(request_evaluator(query, case), position, case)
+    elif isinstance(casebase, (CaseBase, CaseBaseSnapshot)):
+        for request, collector in zip(requests, collectors):
+            collect(casebase, request, evaluator, collector)
+    else:
+        for start, chunk in _chunks(casebase, evaluator, chunk_size):
+            for request, collector in zip(requests, collectors):
+                collect(chunk, request, evaluator, collector, start=start)
+    return [collector.response() for collector in collectors]
+
+
+def _check_chunk_size(name: str, chunk_size: int) -> None:
+    # a chunk size below 1 would end the chunks before the first case
+    if chunk_size < 1:
+        raise ValueError(f"{name} must be at least 1, not {chunk_size}")
+
+
+def _as_chunk(cases: list[C], evaluator: Evaluator) -> Sequence[C]:
+    # Chunks are casebases of their own, if the evaluator can be evaluated column by column.
+    if evaluate.as_column_evaluator(evaluator) is None:
+        return cases
+    return CaseBase(cases, getvalue=evaluator.keywords.get("getvalue", getattr))
+
+
+def _chunks(casebase: Iterable[C], evaluator: Evaluator, chunk_size: int) -> Iterator[tuple[int, Sequence[C]]]:
+    if isinstance(casebase, CaseBase):
+        for start in range(0, len(casebase), chunk_size):
+            yield start, casebase.slice(start, start + chunk_size)
+        return
+    iterator = iter(casebase)
+    start = 0
+    while chunk := list(itertools.islice(iterator, chunk_size)):
+        yield start, _as_chunk(chunk, evaluator)
+        start += len(chunk)
+
+
+def infer_iter(
+    casebase: Iterable[C],
+    request: ReasoningRequest[C],
+    evaluator: Evaluator,
+    *,
+    getvalue: Callable[[Any, str, Optional[Any]], Any] = getattr,
+    every: int = 1024,
+) -> Iterator[ReasoningProgress[C]]:
+    """
+    Scores the cases in a single pass and yields the response for the cases scored so far after every
+    ``every`` cases.
+
+    Only the best ``offset + limit`` hits, the counters and the facet values are kept in memory besides the
+    chunk of cases currently scored, so the casebase can be streamed from a file or a database cursor. The
+    last progress is ``complete`` and its response is the same as from ``infer``.
+    """
+    _check_chunk_size("every", every)
+    return _infer_iter(snapshot_of(casebase), request, evaluator, getvalue, every)
+
+
+def _infer_iter(
+    casebase: Iterable[C],
+    request: ReasoningRequest[C],
+    evaluator: Evaluator,
+    getvalue: Callable[[Any, str, Optional[Any]], Any],
+    every: int,
+) -> Iterator[ReasoningProgress[C]]:
+    collector = HitCollector(request, getvalue)
+    number_of_cases = 0
+    for start, chunk in _chunks(casebase, evaluator, every):
+        collect(chunk, request, evaluator, collector, start=start)
+        number_of_cases = start + len(chunk)
+        yield ReasoningProgress(number_of_cases, collector.response())
+    yield ReasoningProgress(number_of_cases, collector.response(), complete=True)
+
+
+async def _async_chunks(
+    casebase: AsyncIterable[C], evaluator: Evaluator, chunk_size: int
+) -> AsyncIterable[tuple[int, Sequence[C]]]:
+    start = 0
+    chunk = []
+    async for case in casebase:
+        chunk.append(case)
+        if len(chunk) == chunk_size:
+            yield start, _as_chunk(chunk, evaluator)
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        yield start, _as_chunk(chunk, evaluator)
+
+
+async def _iterate_async(iterable: Iterable[Any]) -> AsyncIterable[Any]:
+    for item in iterable:
+        yield item
+
+
+def _collect_chunk(
+    chunk: Sequence[C],
+    request: ReasoningRequest[C],
+    evaluator: Evaluator,
+    getvalue: Callable[[Any, str, Optional[Any]], Any],
+    start: int,
+) -> HitCollector[C]:
+    # scores a chunk into a collector of its own, which is returned from the worker of an executor
+    collector = HitCollector(request, getvalue)
+    collect(chunk, request, evaluator, collector, start=start)
+    return collector
+
+
+async def infer_async(
+    casebase: Union[Iterable[C], AsyncIterable[C]],
+    request: ReasoningRequest[C],
+    evaluator: Evaluator,
+    *,
+    getvalue: Callable[[Any, str, Optional[Any]], Any] = getattr,
+    every: int = 1024,
+    executor: Optional[Executor] = None,
+) -> ReasoningResponse[C]:
+    """
+    Returns the same response as ``infer`` without blocking the event loop for the whole casebase.
+
+    The cases, which may come from an async iterable, are scored in chunks of ``every`` cases and control is
+    given back to the event loop after each chunk. If an ``executor`` is given, the chunks are scored in it
+    one after another, so the event loop only collects the cases. Every chunk is scored into a collector of
+    its own which is merged on the event loop, so process pools work as well, if the cases, the evaluator and
+    ``getvalue`` are picklable.
+    """
+    _check_chunk_size("every", every)
+    loop = asyncio.get_running_loop()
+    collector = HitCollector(request, getvalue)
+    casebase = snapshot_of(casebase)
+    if isinstance(casebase, AsyncIterable):
+        chunks = _async_chunks(casebase, evaluator, every)
+    else:
+        chunks = _iterate_async(_chunks(casebase, evaluator, every))
+    async for start, chunk in chunks:
+        if executor is not None:
+            chunk_collector = await loop.run_in_executor(
+                executor, _collect_chunk, chunk, request, evaluator, getvalue, start
+            )
+            collector.merge(chunk_collector)
+        else:
+            collect(chunk, request, evaluator, collector, start=start)
+            await asyncio.sleep(0)
+    return collector.response()
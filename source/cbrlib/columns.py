@@ -0,0 +1,269 @@
+from array import array
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+_MAX_EXACT_INTEGER = 2**53
+
+_UNSET = object()
+
+
+def value_key(value: Any) -> Any:
+    """
+    Returns a hashable key for a value, so that two values have the same key only if every evaluator returns
+    the same similarity for them.
+
+    Lists and tuples are keyed by their elements, sets by their elements regardless of the order and dicts by
+    their items. Other unhashable values are only equal to themselves.
+    """
+    value_type = type(value)
+    if value_type in (str, int, float, bool) or value is None:
+        return value_type, value
+    if value_type in (list, tuple):
+        return value_type, tuple(value_key(element) for element in value)
+    if value_type in (set, frozenset):
+        return value_type, frozenset(value_key(element) for element in value)
+    if value_type is dict:
+        return value_type, frozenset((value_key(k), value_key(v)) for k, v in value.items())
+    try:
+        hash(value)
+    except TypeError:
+        return value_type, id(value)
+    return value_type, value
+
+
+_COLLECTION_TYPES = (list, tuple, set, frozenset)
+
+
+def hashed_elements(elements: Iterable[Any]) -> Optional[frozenset]:
+    """
+    Returns the elements of a collection as frozenset for membership tests by equality or ``None``, if an
+    element is unhashable. NaN is left out, because it is not equal to itself.
+    """
+    try:
+        return frozenset(element for element in elements if not (type(element) is float and element != element))
+    except TypeError:
+        return None
+
+
+def _to_numbers(values: Sequence[Any]) -> Optional[array]:
+    for value in values:
+        if type(value) is float:
+            continue
+        if type(value) is int and -_MAX_EXACT_INTEGER <= value <= _MAX_EXACT_INTEGER:
+            continue
+        return None
+    return array("d", values)
+
+
+class Column(Sequence):
+    """
+    A single property of all cases of a casebase stored as one contiguous list.
+
+    ``missing`` is a mask with one byte per case which is set, if the case has no value (``None``) for the
+    property.
+    """
+
+    __slots__ = (
+        "name",
+        "values",
+        "missing",
+        "_numbers",
+        "_dictionary",
+        "_codes",
+        "_distinct",
+        "_source",
+        "_has_distinct_values",
+        "_element_sets",
+        "_element_domain",
+        "_element_codes",
+    )
+
+    def __init__(self, name: str, values: Iterable[Any]) -> None:
+        self.name = name
+        self.values = list(values)
+        self.missing = bytearray(value is None for value in self.values)
+        self._numbers = _UNSET
+        self._dictionary: Optional[list[Any]] = None
+        self._codes: Optional[array] = None
+        self._distinct: Optional[Column] = None
+        self._source: Optional[Column] = None
+        self._has_distinct_values = _UNSET
+        self._element_sets = _UNSET
+        self._element_domain = _UNSET
+        self._element_codes = _UNSET
+
+    @classmethod
+    def wrap(
+        cls,
+        name: str,
+        values: Sequence[Any],
+        missing: Sequence[int],
+        *,
+        dictionary: Optional[Sequence[Any]] = None,
+        codes: Optional[Sequence[int]] = None,
+        numbers: Any = _UNSET,
+        element_domain: Any = _UNSET,
+        element_codes: Any = _UNSET,
+    ) -> "Column":
+        """
+        Returns a column over existing sequences without copying them, e.g. views of a buffer which is shared
+        with other processes. ``dictionary``, ``codes``, ``numbers``, ``element_domain`` and ``element_codes``
+        must be what the column would derive from ``values``, everything which is not given is derived on first
+        use.
+        """
+        column = cls.__new__(cls)
+        column.name = name
+        column.values = values
+        column.missing = missing
+        column._numbers = numbers
+        column._dictionary = dictionary if codes is not None else None
+        column._codes = codes if dictionary is not None else None
+        column._distinct = None
+        column._source = None
+        column._has_distinct_values = _UNSET
+        column._element_sets = _UNSET
+        column._element_domain = element_domain if element_codes is not _UNSET else _UNSET
+        column._element_codes = element_codes if element_domain is not _UNSET else _UNSET
+        return column
+
+    @property
+    def numbers(self) -> Optional[Sequence[float]]:
+        """
+        The values as ``array("d")``, if every value is a float or an integer which is exactly representable
+        as float. Otherwise ``None``. A wrapped column may hold them in another sequence of such numbers.
+        """
+        if self._numbers is _UNSET:
+            self._numbers = _to_numbers(self.values)
+        return self._numbers
+
+    def _encode(self) -> None:
+        keys: dict[Any, int] = {}
+        dictionary = []
+        codes = array("l")
+        for value in self.values:
+            key = value_key(value)
+            code = keys.get(key)
+            if code is None:
+                code = keys[key] = len(dictionary)
+                dictionary.append(value)
+            codes.append(code)
+        self._dictionary = dictionary
+        self._codes = codes
+
+    @property
+    def dictionary(self) -> list[Any]:
+        """The distinct values of the column in order of their first occurrence, see ``value_key``."""
+        if self._dictionary is None:
+            self._encode()
+        return self._dictionary
+
+    @property
+    def codes(self) -> array:
+        """The position of every value in ``dictionary``."""
+        if self._codes is None:
+            self._encode()
+        return self._codes
+
+    def distinct(self) -> "Column":
+        """Returns the distinct values of the column as a column of their own."""
+        if self._distinct is None:
+            if self._source is not None:
+                self._distinct = self._source.distinct()
+            else:
+                self._distinct = Column(self.name, self.dictionary)
+        return self._distinct
+
+    @property
+    def has_distinct_values(self) -> bool:
+        """
+        Whether the values of the dictionary are also distinct for a dict. The dictionary distinguishes values
+        which are equal for a dict, e.g. 1 and 1.0, and may contain unhashable values.
+        """
+        if self._has_distinct_values is _UNSET:
+            values = [value for value in self.dictionary if value is not None]
+            try:
+                self._has_distinct_values = len(set(values)) == len(values)
+            except TypeError:
+                self._has_distinct_values = False
+        return self._has_distinct_values
+
+    @property
+    def element_sets(self) -> Optional[list[frozenset]]:
+        """
+        Every value as ``frozenset`` of its elements, if all values are lists, tuples or sets of hashable
+        elements. Otherwise ``None``.
+        """
+        if self._element_sets is _UNSET:
+            element_sets = None
+            if all(type(value) in _COLLECTION_TYPES for value in self.values):
+                element_sets = [hashed_elements(value) for value in self.values]
+                if any(elements is None for elements in element_sets):
+                    element_sets = None
+            self._element_sets = element_sets
+        return self._element_sets
+
+    def _encode_elements(self) -> None:
+        self._element_domain = self._element_codes = None
+        if not all(type(value) in _COLLECTION_TYPES for value in self.values):
+            return
+        keys: dict[Any, int] = {}
+        domain = []
+        element_codes = []
+        for value in self.values:
+            codes = []
+            for element in value:
+                key = value_key(element)
+                code = keys.get(key)
+                if code is None:
+                    code = keys[key] = len(domain)
+                    domain.append(element)
+                codes.append(code)
+            element_codes.append(tuple(codes))
+        self._element_domain = domain
+        self._element_codes = element_codes
+
+    @property
+    def element_domain(self) -> Optional[list[Any]]:
+        """
+        The distinct elements of all values, if all values are lists, tuples or sets. Otherwise ``None``.
+        """
+        if self._element_domain is _UNSET:
+            self._encode_elements()
+        return self._element_domain
+
+    @property
+    def element_codes(self) -> Optional[list[tuple[int, ...]]]:
+        """The elements of every value as positions in ``element_domain`` in iteration order."""
+        if self._element_codes is _UNSET:
+            self._encode_elements()
+        return self._element_codes
+
+    def take(self, positions: Sequence[int]) -> "Column":
+        """
+        Returns a column with the values at the given positions. The new column shares the dictionary and the
+        distinct values of this column, which are built on first use, so they are built only once for all
+        selections.
+        """
+        codes = self.codes
+        column = Column(self.name, [self.values[position] for position in positions])
+        column._dictionary = self._dictionary
+        column._codes = array("l", [codes[position] for position in positions])
+        column._source = self._source if self._source is not None else self
+        column._has_distinct_values = self._has_distinct_values
+        return column
+
+    @property
+    def cardinality(self) -> int:
+        """The number of distinct values."""
+        return len(self.dictionary)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.values)
+
+    def __repr__(self) -> str:
+        return f"Column({self.name!r}, size={len(self.values)})"
@@ -0,0 +1,284 @@
+"""
+Compilation of mapping tuples into one flat scoring function per query.
+
+An evaluator built as ``functools.partial(evaluate.case_average, mappings)`` looks up the query values, the
+attribute evaluators and their options again for every case. ``compile_evaluator`` does that once per query:
+mappings without a query value are dropped, query values and everything derived from them only (e.g. the
+maximum distance of ``numeric`` or the rank of a ``total_order`` query) are resolved up front and the remaining
+work per case is a single loop over plain closures. The results are exactly those of the wrapped aggregator.
+"""
+
+import functools
+import math
+import operator
+from statistics import median
+from typing import Any, Callable, Iterable, Optional, Sequence, Union
+
+from cbrlib import evaluate
+from cbrlib.columns import value_key
+from cbrlib.evaluate import Evaluator
+from cbrlib.types import NumericEvaluationOptions, PropertyEvaluatorMapping, WeightedPropertyEvaluatorMapping
+
+Scorer = Callable[[Any], float]
+
+_NO_QUERY = object()
+
+
+def _compile_numeric(options: NumericEvaluationOptions, query: Any) -> Optional[Scorer]:
+    if type(query) not in (int, float):
+        return None
+    option_max_distance = options.max_distance
+    max_distance = evaluate._calculate_max_distance(query, option_max_distance, options.origin, options.use_origin)
+    if max_distance == 0:
+        return lambda case: 1.0
+    cyclic = options.cyclic
+    is_less = evaluate._is_less
+    less = options.if_less
+    more = options.if_more
+    less_stretch = less.tolerance - less.equal
+    more_stretch = more.tolerance - more.equal
+    less_interpolation = less.get_interpolation()
+    more_interpolation = more.get_interpolation()
+
+    def score(case: Any) -> float:
+        distance = abs(query - case)
+        if cyclic and distance > option_max_distance:
+            distance = 2 * option_max_distance - distance
+        relative_distance = distance / max_distance
+        if relative_distance >= 1:
+            return 0.0
+        if is_less(case, query, option_max_distance, cyclic):
+            if relative_distance <= less.equal:
+                return 1.0
+            elif relative_distance >= less.tolerance:
+                return 0.0
+            return less_interpolation((relative_distance - less.equal) / less_stretch, less.linearity)
+        if relative_distance <= more.equal:
+            return 1.0
+        elif relative_distance >= more.tolerance:
+            return 0.0
+        return more_interpolation((relative_distance - more.equal) / more_stretch, more.linearity)
+
+    return score
+
+
+def _compile_ranked(rank: Callable[[Any], Optional[int]], size: int, evaluator: Evaluator, query: Any) -> Scorer:
+    query_rank = rank(query)
+    if query_rank is None:
+        return lambda case: 0
+    similarities: list[Optional[float]] = [None] * size
+    score_rank = compile_attribute(evaluator, query_rank)
+
+    def score(case: Any) -> float:
+        case_rank = rank(case)
+        if case_rank is None:
+            return 0
+        similarity = similarities[case_rank]
+        if similarity is None:
+            similarity = similarities[case_rank] = score_rank(case_rank)
+        return similarity
+
+    return score
+
+
+def _compile_total_order(ordering: Sequence[Any], evaluator: Evaluator, query: Any) -> Scorer:
+    def rank(value: Any) -> Optional[int]:
+        try:
+            return ordering.index(value)
+        except ValueError:
+            return None
+
+    return _compile_ranked(rank, len(ordering), evaluator, query)
+
+
+def _compile_table_lookup(lookup: Any, query: Any) -> Scorer:
+    if query not in lookup:
+        return lambda case: 1 if query == case else 0
+    query_map = lookup[query]
+
+    def score(case: Any) -> float:
+        if query == case:
+            return 1
+        if case not in query_map:
+            return 0
+        return query_map[case]
+
+    return score
+
+
+def _compile_similarity_table(table: evaluate.SimilarityTable, query: Any) -> Scorer:
+    row = table.row(query)
+    if row is None:
+        return functools.partial(table._evaluator, query)
+    intern = table.intern
+
+    def score(case: Any) -> float:
+        case_code = intern(case)
+        if case_code is None:
+            return table._evaluator(query, case)
+        return row[case_code]
+
+    return score
+
+
+def compile_attribute(evaluator: Evaluator, query: Any) -> Scorer:
+    """
+    Returns a function of the case value only, which evaluates it exactly like ``evaluator(query, case)``.
+
+    ``equality``, ``numeric``, ``total_order``, ``TotalOrder``, ``table_lookup`` and similarity tables are
+    specialized for the query value. Any other evaluator gets the query value bound.
+    """
+    if evaluator is evaluate.equality:
+        return lambda case: 0 if query != case else 1
+    if isinstance(evaluator, evaluate.TotalOrder):
+        return _compile_ranked(evaluator.rank, len(evaluator.ordering), evaluator.evaluator, query)
+    if isinstance(evaluator, evaluate.SimilarityTable):
+        return _compile_similarity_table(evaluator, query)
+    if isinstance(evaluator, functools.partial) and not evaluator.keywords:
+        scorer = None
+        if evaluator.func is evaluate.numeric and len(evaluator.args) == 1:
+            scorer = _compile_numeric(evaluator.args[0], query)
+        elif evaluator.func is evaluate.total_order and len(evaluator.args) == 2:
+            scorer = _compile_total_order(*evaluator.args, query)
+        elif evaluator.func is evaluate.table_lookup and len(evaluator.args) == 1:
+            scorer = _compile_table_lookup(evaluator.args[0], query)
+        if scorer is not None:
+            return scorer
+    return functools.partial(evaluator, query)
+
+
+def _compile_getter(getvalue: Callable[[Any, str], Any], property_name: str) -> Callable[[Any], Any]:
+    if getvalue is getattr:
+        return operator.attrgetter(property_name)
+    return lambda case: getvalue(case, property_name)
+
+
+def _compile_average(terms: list[tuple[Callable[[Any], Any], Scorer, float]]) -> Scorer:
+    divider = 0
+    for _, _, weight in terms:
+        divider += weight
+    if divider <= 0:
+        return lambda case: 0
+
+    def score(case: Any) -> float:
+        similarity_sum = 0
+        for get, score_value, weight in terms:
+            similarity_sum += weight * score_value(get(case))
+        return similarity_sum / divider
+
+    return score
+
+
+def _compile_collected(
+    terms: list[tuple[Callable[[Any], Any], Scorer, float]],
+    aggregate: Callable[[list[float]], float],
+) -> Scorer:
+    if not terms:
+        return lambda case: 0
+    return lambda case: aggregate([score_value(get(case)) for get, score_value, _ in terms])
+
+
+def _compile_euclidean(terms: list[tuple[Callable[[Any], Any], Scorer, float]]) -> Scorer:
+    def score(case: Any) -> float:
+        similarity_sum = 0
+        for get, score_value, _ in terms:
+            similarity = score_value(get(case))
+            if similarity <= 0:
+                continue
+            similarity_sum += similarity**2
+        return math.sqrt(similarity_sum)
+
+    return score
+
+
+def _median(similarities: list[float]) -> float:
+    return median(sorted(similarities))
+
+
+_aggregations = {
+    evaluate.case_average: _compile_average,
+    evaluate.case_median: lambda terms: _compile_collected(terms, _median),
+    evaluate.case_min: lambda terms: _compile_collected(terms, min),
+    evaluate.case_max: lambda terms: _compile_collected(terms, max),
+    evaluate.case_euclidean: _compile_euclidean,
+}
+
+
+class CompiledEvaluator:
+    """
+    A drop-in evaluator for ``functools.partial(aggregation, mappings, getvalue=getvalue)``, which compiles
+    the mappings into a scoring function on the first call with a query and reuses it while the query values
+    stay the same (see ``cbrlib.columns.value_key``), so a query changed in place is compiled again.
+
+    Calling the evaluator directly still reads and compares the query values for every case. Code scoring
+    many cases for one query should score them with ``bind(query)``, which compiles the query once and does
+    not look at it again, as the functions of ``cbrlib.casebase`` do.
+    """
+
+    __slots__ = ("mappings", "aggregation", "getvalue", "_compile_aggregation", "_state")
+
+    def __init__(
+        self,
+        mappings: Iterable[Union[PropertyEvaluatorMapping, WeightedPropertyEvaluatorMapping]],
+        aggregation: Callable[..., float],
+        getvalue: Callable[[Any, str], Any],
+    ) -> None:
+        if aggregation not in _aggregations:
+            raise ValueError(f"Aggregation {aggregation!r} can not be compiled")
+        self.mappings = tuple(mappings)
+        self.aggregation = aggregation
+        self.getvalue = getvalue
+        self._compile_aggregation = _aggregations[aggregation]
+        self._state: tuple[Any, Optional[Scorer]] = (_NO_QUERY, None)
+
+    def compile(self, query: Any) -> Scorer:
+        """Returns the scoring function of a query, which takes a case and returns its similarity."""
+        getvalue = self.getvalue
+        terms = []
+        for mapping in self.mappings:
+            property_name = mapping[0]
+            query_value = getvalue(query, property_name)
+            if query_value is None:
+                continue
+            weight = mapping[2] if len(mapping) > 2 else 1
+            terms.append(
+                (_compile_getter(getvalue, property_name), compile_attribute(mapping[1], query_value), weight)
+            )
+        return self._compile_aggregation(terms)
+
+    def _query_key(self, query: Any) -> tuple:
+        getvalue = self.getvalue
+        return tuple(value_key(getvalue(query, mapping[0])) for mapping in self.mappings)
+
+    def bind(self, query: Any) -> Evaluator:
+        """
+        Returns an evaluator of the cases for this query only, which is compiled once, e.g. for the cases of a
+        single request, so the query values are not compared again for every case.
+        """
+        score = self.compile(query)
+
+        def evaluate_case(query: Any, case: Any) -> float:
+            return score(case)
+
+        return evaluate_case
+
+    def __call__(self, query: Any, case: Any) -> float:
+        query_key = self._query_key(query)
+        state = self._state
+        if state[0] != query_key:
+            state = self._state = (query_key, self.compile(query))
+        return state[1](case)
+
+
+def compile_evaluator(
+    mappings: Iterable[Union[PropertyEvaluatorMapping, WeightedPropertyEvaluatorMapping]],
+    aggregation: Callable[..., float] = evaluate.case_average,
+    *,
+    getvalue: Callable[[Any, str], Any] = getattr,
+) -> CompiledEvaluator:
+    return CompiledEvaluator(mappings, aggregation, getvalue)
+
+
+def bind(evaluator: Evaluator, query: Any) -> Evaluator:
+    """Returns the evaluator for the cases of a single query, which a ``CompiledEvaluator`` compiles only once."""
+    return evaluator.bind(query) if isinstance(evaluator, CompiledEvaluator) else evaluator
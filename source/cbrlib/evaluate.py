@@ -1,23 +1,124 @@
 import functools
 import math
+import time
 from statistics import median
-from typing import Any, Callable, Iterable, Mapping, Sequence
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Sequence, Union
 
+from cbrlib import instrumentation, vectorized
+from cbrlib.columns import Column, hashed_elements, value_key
 from cbrlib.types import (
     Evaluator,
     NumericEvaluationOptions,
     PropertyEvaluatorMapping,
+    ReasoningStats,
     WeightedPropertyEvaluatorMapping,
 )
 
+_PRUNING_TOLERANCE = 1e-9
+
+
+_evaluation_orders: dict[tuple[int, int], tuple[Any, Any, tuple[int, ...]]] = {}
+
+
+def _pruning_order(
+    mappings: Sequence[WeightedPropertyEvaluatorMapping],
+    costs: Optional[Mapping[str, float]],
+) -> tuple[int, ...]:
+    def key(index: int) -> float:
+        weight = mappings[index][2]
+        if costs is None:
+            return -weight
+        cost = costs.get(mappings[index][0], 1.0)
+        return -weight / cost if cost > 0 else -math.inf
+
+    return tuple(sorted(range(len(mappings)), key=key))
+
+
+def _evaluation_order(
+    mappings: Sequence[WeightedPropertyEvaluatorMapping],
+    costs: Optional[Mapping[str, float]],
+) -> Optional[tuple[int, ...]]:
+    # The order is computed once per mappings and costs objects. The cache keeps a reference to both, so
+    # their ids can not be reused by other objects while the entry exists. None means the mappings are
+    # already in the right order.
+    key = (id(mappings), id(costs))
+    entry = _evaluation_orders.get(key)
+    if entry is not None and entry[0] is mappings and entry[1] is costs:
+        return entry[2]
+    if len(_evaluation_orders) >= 256:
+        _evaluation_orders.clear()
+    order = _pruning_order(mappings, costs)
+    if order == tuple(range(len(mappings))):
+        order = None
+    _evaluation_orders[key] = (mappings, costs, order)
+    return order
+
+
+def _case_average_pruned(
+    mappings: Iterable[WeightedPropertyEvaluatorMapping],
+    query: Any,
+    case: Any,
+    getvalue: Callable[[Any, str], Any],
+    threshold: float,
+    costs: Optional[Mapping[str, float]],
+) -> float:
+    if not isinstance(mappings, (tuple, list)):
+        mappings = tuple(mappings)
+    order = _evaluation_order(mappings, costs)
+    divider = 0
+    query_values = []
+    for mapping in mappings:
+        query_value = getvalue(query, mapping[0])
+        query_values.append(query_value)
+        if query_value is not None:
+            divider += mapping[2]
+    if divider <= 0:
+        return 0
+    limit = (threshold - _PRUNING_TOLERANCE) * divider
+    reachable = divider
+    similarity_sum = 0
+    weighted_similarities = [None] * len(mappings) if order is not None else None
+    for index in order if order is not None else range(len(mappings)):
+        query_value = query_values[index]
+        if query_value is None:
+            continue
+        mapping = mappings[index]
+        weight = mapping[2]
+        weighted_similarity = weight * mapping[1](query_value, getvalue(case, mapping[0]))
+        similarity_sum += weighted_similarity
+        reachable -= weight
+        if similarity_sum + reachable < limit:
+            return (similarity_sum + reachable) / divider
+        if weighted_similarities is not None:
+            weighted_similarities[index] = weighted_similarity
+    if weighted_similarities is not None:
+        # sum up in the order of the mappings to get exactly the same result as without a threshold
+        similarity_sum = 0
+        for weighted_similarity in weighted_similarities:
+            if weighted_similarity is not None:
+                similarity_sum += weighted_similarity
+    return similarity_sum / divider
+
 
 def case_average(
     mappings: Iterable[WeightedPropertyEvaluatorMapping],
     query: Any,
     case: Any,
     *,
-    getvalue: Callable[[Any, str], Any] = getattr
+    getvalue: Callable[[Any, str], Any] = getattr,
+    threshold: Optional[float] = None,
+    costs: Optional[Mapping[str, float]] = None,
 ) -> float:
+    """
+    Returns the weighted average of the similarities of all mappings with a query value.
+
+    If a ``threshold`` is given, the mappings are evaluated ordered by weight (divided by their ``costs``, if
+    given) and the evaluation stops as soon as the case can not reach the threshold anymore, assuming a
+    similarity of 1 for every remaining mapping. In that case the returned value is that upper bound, which
+    is below the threshold, and not the exact similarity.
+    """
+    if threshold is not None:
+        return _case_average_pruned(mappings, query, case, getvalue, threshold, costs)
     divider = 0
     similarity_sum = 0
     for mapping in mappings:
@@ -67,13 +168,53 @@ def case_median(
     return median(sorted(similarity_results))
 
 
+def _case_extremum_pruned(
+    mappings: Iterable[PropertyEvaluatorMapping],
+    query: Any,
+    case: Any,
+    getvalue: Callable[[Any, str], Any],
+    costs: Optional[Mapping[str, float]],
+    aggregate: Callable[[Iterable[float]], float],
+    stop: Callable[[float], bool],
+) -> float:
+    mappings = tuple(mappings)
+    if costs is not None:
+        mappings = tuple(sorted(mappings, key=lambda m: costs.get(m[0], 1.0)))
+    similarity_results = []
+    for mapping in mappings:
+        property_name = mapping[0]
+        evaluator = mapping[1]
+        query_value = getvalue(query, property_name)
+        if query_value is None:
+            continue
+        similarity = evaluator(query_value, getvalue(case, property_name))
+        if stop(similarity):
+            return similarity
+        similarity_results.append(similarity)
+    if not similarity_results:
+        return 0
+    return aggregate(similarity_results)
+
+
 def case_min(
     mappings: Iterable[PropertyEvaluatorMapping],
     query: Any,
     case: Any,
     *,
-    getvalue: Callable[[Any, str], Any] = getattr
+    getvalue: Callable[[Any, str], Any] = getattr,
+    threshold: Optional[float] = None,
+    costs: Optional[Mapping[str, float]] = None,
 ) -> float:
+    """
+    Returns the smallest similarity of all mappings with a query value.
+
+    If a ``threshold`` is given, the mappings are evaluated ordered by their ``costs`` and the evaluation
+    stops at the first similarity of 0 or below the threshold, which is returned instead of the minimum.
+    """
+    if threshold is not None:
+        return _case_extremum_pruned(
+            mappings, query, case, getvalue, costs, min, lambda similarity: similarity <= 0 or similarity < threshold
+        )
     similarity_results = _collect_similarities(mappings, query, case, getvalue)
     if not similarity_results:
         return 0
@@ -85,8 +226,18 @@ def case_max(
     query: Any,
     case: Any,
     *,
-    getvalue: Callable[[Any, str], Any] = getattr
+    getvalue: Callable[[Any, str], Any] = getattr,
+    threshold: Optional[float] = None,
+    costs: Optional[Mapping[str, float]] = None,
 ) -> float:
+    """
+    Returns the largest similarity of all mappings with a query value.
+
+    If a ``threshold`` is given, the mappings are evaluated ordered by their ``costs`` and the evaluation
+    stops at the first similarity of 1. The threshold itself can not prune the maximum.
+    """
+    if threshold is not None:
+        return _case_extremum_pruned(mappings, query, case, getvalue, costs, max, lambda similarity: similarity >= 1)
     similarity_results = _collect_similarities(mappings, query, case, getvalue)
     if not similarity_results:
         return 0
@@ -114,6 +265,406 @@ def case_euclidean(
     return math.sqrt(similarity_sum)
 
 
+ColumnEvaluator = Callable[[Any, Mapping[str, Sequence[Any]], int], list[float]]
+
+
+def _evaluate_column_vectorized(
+    evaluator: Evaluator, query_value: Any, values: Sequence[Any]
+) -> Optional[list[float]]:
+    if not vectorized.is_available() or not isinstance(values, Column) or not isinstance(evaluator, functools.partial):
+        return None
+    if evaluator.func is numeric and len(evaluator.args) == 1 and not evaluator.keywords:
+        if type(query_value) not in (int, float) or values.numbers is None:
+            return None
+        if not math.isfinite(query_value) or not vectorized.is_finite(values.numbers):
+            return None
+        return vectorized.numeric(evaluator.args[0], query_value, values.numbers).tolist()
+    return None
+
+
+def _evaluate_ranks_vectorized(
+    evaluator: "TotalOrder", query_value: Any, values: Sequence[Any]
+) -> Optional[list[float]]:
+    inner = evaluator.evaluator
+    if not vectorized.is_available() or not isinstance(inner, functools.partial) or inner.func is not numeric:
+        return None
+    if len(inner.args) != 1 or inner.keywords:
+        return None
+    query_rank = evaluator.rank(query_value)
+    ranks = evaluator.ranks(values)
+    if query_rank is None:
+        return [0] * len(ranks)
+    known = [rank for rank in ranks if rank is not None]
+    similarities = iter(vectorized.numeric(inner.args[0], query_rank, known).tolist())
+    return [0 if rank is None else next(similarities) for rank in ranks]
+
+
+def _evaluates_distinct(evaluator: Evaluator, values: Sequence[Any]) -> bool:
+    # whether evaluate_column evaluates the distinct values of a column only
+    if not isinstance(values, Column) or len(values) == 0:
+        return False
+    return isinstance(evaluator, SimilarityTable) or values.cardinality * 2 <= len(values)
+
+
+def evaluate_column(evaluator: Evaluator, query_value: Any, values: Sequence[Any]) -> list[float]:
+    """
+    Evaluates the query value against every value of a column.
+
+    If ``values`` is a ``Column`` with many repeated values, every distinct value is evaluated only once. If
+    the evaluator can be vectorized, the NumPy backend is used.
+    """
+    if _evaluates_distinct(evaluator, values):
+        if isinstance(evaluator, SimilarityTable):
+            return evaluator.evaluate_column(query_value, values)
+        similarities = evaluate_column(evaluator, query_value, values.distinct())
+        return [similarities[code] for code in values.codes]
+    if isinstance(evaluator, functools.partial) and evaluator.func in _set_similarities:
+        similarities = _evaluate_sets_column(evaluator, query_value, values)
+    elif isinstance(evaluator, TotalOrder):
+        similarities = _evaluate_ranks_vectorized(evaluator, query_value, values)
+    else:
+        similarities = _evaluate_column_vectorized(evaluator, query_value, values)
+    if similarities is not None:
+        return similarities
+    return [evaluator(query_value, value) for value in values]
+
+
+_NO_QUERY = object()
+
+
+class MemoizedEvaluator:
+    """
+    Wraps an attribute evaluator and evaluates every distinct case value only once per query value.
+
+    The cache is cleared whenever the evaluator is called with another query value. Values are compared by
+    ``cbrlib.columns.value_key``, so lists and sets (e.g. for the ``set_*`` evaluators) are supported, too.
+    ``hits`` and ``misses`` count the calls answered from and not answered from the cache.
+    """
+
+    __slots__ = ("_evaluator", "_state", "hits", "misses")
+
+    def __init__(self, evaluator: Evaluator) -> None:
+        self._evaluator = evaluator
+        # query key and cache are replaced together, so concurrent callers never mix up two queries
+        self._state: tuple[Any, dict[Any, float]] = (_NO_QUERY, {})
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, query: Any, case: Any) -> float:
+        query_key = value_key(query)
+        state = self._state
+        if query_key != state[0]:
+            state = self._state = (query_key, {})
+        cache = state[1]
+        case_key = value_key(case)
+        similarity = cache.get(case_key)
+        if similarity is not None:
+            self.hits += 1
+            return similarity
+        self.misses += 1
+        similarity = cache[case_key] = self._evaluator(query, case)
+        return similarity
+
+    @property
+    def hit_rate(self) -> float:
+        calls = self.hits + self.misses
+        return self.hits / calls if calls > 0 else 0.0
+
+    def reset_statistics(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+
+def memoize(evaluator: Evaluator) -> MemoizedEvaluator:
+    return MemoizedEvaluator(evaluator)
+
+
+class SimilarityTable:
+    """
+    The complete similarity function of an evaluator over a finite domain, stored as dense matrix.
+
+    Every value of the domain is interned to a small int which indexes the rows (query) and columns (case)
+    of the matrix. The table is a drop-in evaluator: values outside of the domain are passed to the wrapped
+    evaluator.
+    """
+
+    __slots__ = ("_evaluator", "_codes", "_interned", "domain", "matrix")
+
+    def __init__(self, evaluator: Evaluator, domain: Iterable[Any]) -> None:
+        self._evaluator = evaluator
+        self._codes: dict[Any, int] = {}
+        # the codes of the values of the last column dictionary, which is shared by all selections of a column
+        self._interned: tuple[Optional[list[Any]], list[Optional[int]]] = (None, [])
+        self.domain: list[Any] = []
+        for value in domain:
+            key = value_key(value)
+            if key not in self._codes:
+                self._codes[key] = len(self.domain)
+                self.domain.append(value)
+        self.matrix: list[list[float]] = [[evaluator(query, case) for case in self.domain] for query in self.domain]
+
+    def intern(self, value: Any) -> Optional[int]:
+        """Returns the code of a value or ``None``, if the value is not part of the domain."""
+        return self._codes.get(value_key(value))
+
+    def row(self, query: Any) -> Optional[list[float]]:
+        """Returns the similarities of a query value to all values of the domain ordered by their codes."""
+        code = self.intern(query)
+        return self.matrix[code] if code is not None else None
+
+    def __call__(self, query: Any, case: Any) -> float:
+        query_code = self._codes.get(value_key(query))
+        case_code = self._codes.get(value_key(case))
+        if query_code is None or case_code is None:
+            return self._evaluator(query, case)
+        return self.matrix[query_code][case_code]
+
+    def evaluate_column(self, query: Any, column: Column) -> list[float]:
+        """
+        Returns the similarities of a query value to all values of a column. The dictionary of the column is
+        interned once, so every case is a lookup of its dictionary code in the row of the query.
+        """
+        query_code = self.intern(query)
+        dictionary = column.dictionary
+        if query_code is None:
+            similarities = [self._evaluator(query, value) for value in dictionary]
+            return [similarities[code] for code in column.codes]
+        interned = self._interned
+        if interned[0] is not dictionary:
+            interned = self._interned = (dictionary, [self.intern(value) for value in dictionary])
+        row = self.matrix[query_code]
+        similarities = [
+            row[case_code] if case_code is not None else self._evaluator(query, value)
+            for case_code, value in zip(interned[1], dictionary)
+        ]
+        return [similarities[code] for code in column.codes]
+
+
+def tabulate(evaluator: Evaluator, domain: Iterable[Any]) -> SimilarityTable:
+    return SimilarityTable(evaluator, domain)
+
+
+def _evaluate_property(
+    property_name: str,
+    evaluator: Evaluator,
+    query_value: Any,
+    columns: Mapping[str, Sequence[Any]],
+    stats: Optional[ReasoningStats],
+) -> list[float]:
+    if stats is None:
+        return evaluate_column(evaluator, query_value, columns[property_name])
+    start = time.perf_counter()
+    values = columns[property_name]
+    similarities = evaluate_column(evaluator, query_value, values)
+    duration = time.perf_counter() - start
+    cache_hits = len(values) - values.cardinality if _evaluates_distinct(evaluator, values) else 0
+    instrumentation.add_evaluation(stats, property_name, len(similarities), duration, cache_hits)
+    return similarities
+
+
+def _weighted_similarity_columns(
+    mappings: Iterable[Union[PropertyEvaluatorMapping, WeightedPropertyEvaluatorMapping]],
+    query: Any,
+    columns: Mapping[str, Sequence[Any]],
+    getvalue: Callable[[Any, str], Any],
+) -> Iterator[tuple[float, list[float]]]:
+    stats = instrumentation.current()
+    for mapping in mappings:
+        property_name = mapping[0]
+        evaluator = mapping[1]
+        query_value = getvalue(query, property_name)
+        if query_value is None:
+            continue
+        weight = mapping[2] if len(mapping) > 2 else 1
+        yield weight, _evaluate_property(property_name, evaluator, query_value, columns, stats)
+
+
+def _average_columns(weighted_similarities: Iterable[tuple[float, Sequence[float]]], size: int) -> list[float]:
+    divider = 0
+    similarity_sums = [0] * size
+    for weight, similarities in weighted_similarities:
+        divider += weight
+        similarity_sums = [s + weight * similarity for s, similarity in zip(similarity_sums, similarities)]
+    if divider <= 0:
+        return [0] * size
+    return [s / divider for s in similarity_sums]
+
+
+def _median_columns(weighted_similarities: Iterable[tuple[float, Sequence[float]]], size: int) -> list[float]:
+    similarity_columns = [similarities for _, similarities in weighted_similarities]
+    if not similarity_columns:
+        return [0] * size
+    return [median(sorted(similarities)) for similarities in zip(*similarity_columns)]
+
+
+def _min_columns(weighted_similarities: Iterable[tuple[float, Sequence[float]]], size: int) -> list[float]:
+    similarity_columns = [similarities for _, similarities in weighted_similarities]
+    if not similarity_columns:
+        return [0] * size
+    return [min(similarities) for similarities in zip(*similarity_columns)]
+
+
+def _max_columns(weighted_similarities: Iterable[tuple[float, Sequence[float]]], size: int) -> list[float]:
+    similarity_columns = [similarities for _, similarities in weighted_similarities]
+    if not similarity_columns:
+        return [0] * size
+    return [max(similarities) for similarities in zip(*similarity_columns)]
+
+
+def _euclidean(similarities: Iterable[float]) -> float:
+    similarity_sum = 0
+    for similarity in similarities:
+        if similarity <= 0:
+            continue
+        similarity_sum += similarity**2
+    return math.sqrt(similarity_sum)
+
+
+def _euclidean_columns(weighted_similarities: Iterable[tuple[float, Sequence[float]]], size: int) -> list[float]:
+    similarity_columns = [similarities for _, similarities in weighted_similarities]
+    if not similarity_columns:
+        return [0.0] * size
+    return [_euclidean(similarities) for similarities in zip(*similarity_columns)]
+
+
+def columns_average(
+    mappings: Iterable[WeightedPropertyEvaluatorMapping],
+    query: Any,
+    columns: Mapping[str, Sequence[Any]],
+    size: int,
+    *,
+    getvalue: Callable[[Any, str], Any] = getattr
+) -> list[float]:
+    return _average_columns(_weighted_similarity_columns(mappings, query, columns, getvalue), size)
+
+
+def columns_median(
+    mappings: Iterable[PropertyEvaluatorMapping],
+    query: Any,
+    columns: Mapping[str, Sequence[Any]],
+    size: int,
+    *,
+    getvalue: Callable[[Any, str], Any] = getattr
+) -> list[float]:
+    return _median_columns(_weighted_similarity_columns(mappings, query, columns, getvalue), size)
+
+
+def columns_min(
+    mappings: Iterable[PropertyEvaluatorMapping],
+    query: Any,
+    columns: Mapping[str, Sequence[Any]],
+    size: int,
+    *,
+    getvalue: Callable[[Any, str], Any] = getattr
+) -> list[float]:
+    return _min_columns(_weighted_similarity_columns(mappings, query, columns, getvalue), size)
+
+
+def columns_max(
+    mappings: Iterable[PropertyEvaluatorMapping],
+    query: Any,
+    columns: Mapping[str, Sequence[Any]],
+    size: int,
+    *,
+    getvalue: Callable[[Any, str], Any] = getattr
+) -> list[float]:
+    return _max_columns(_weighted_similarity_columns(mappings, query, columns, getvalue), size)
+
+
+def columns_euclidean(
+    mappings: Iterable[PropertyEvaluatorMapping],
+    query: Any,
+    columns: Mapping[str, Sequence[Any]],
+    size: int,
+    getvalue: Callable[[object, str], Any] = getattr,
+) -> list[float]:
+    return _euclidean_columns(_weighted_similarity_columns(mappings, query, columns, getvalue), size)
+
+
+# aggregation of the similarity columns of the mappings with a query value, weighted in mapping order
+_similarity_aggregations = {
+    case_average: _average_columns,
+    case_median: _median_columns,
+    case_min: _min_columns,
+    case_max: _max_columns,
+    case_euclidean: _euclidean_columns,
+}
+
+_aggregation_keywords = {"getvalue", "threshold", "costs"}
+
+_column_aggregations = {
+    case_average: columns_average,
+    case_median: columns_median,
+    case_min: columns_min,
+    case_max: columns_max,
+    case_euclidean: columns_euclidean,
+}
+
+
+def as_column_evaluator(evaluator: Evaluator) -> Optional[ColumnEvaluator]:
+    """
+    Returns the column-wise counterpart of an evaluator built as ``functools.partial(case_*, mappings)``.
+
+    The returned function takes the query, a mapping from property name to the column of case values and the
+    number of cases and returns the similarity of every case. ``None`` is returned for any other evaluator.
+    """
+    if not isinstance(evaluator, functools.partial):
+        return None
+    aggregation = _column_aggregations.get(evaluator.func)
+    if aggregation is None or len(evaluator.args) != 1 or not set(evaluator.keywords) <= _aggregation_keywords:
+        return None
+    keywords = {k: v for k, v in evaluator.keywords.items() if k == "getvalue"}
+    return functools.partial(aggregation, *evaluator.args, **keywords)
+
+
+_threshold_aggregations = {case_average, case_min, case_max}
+
+
+def with_threshold(evaluator: Evaluator, threshold: Optional[float]) -> Evaluator:
+    """
+    Binds the threshold of a request to an evaluator built as ``functools.partial(case_*, mappings)``, if the
+    aggregator can use it to stop evaluating cases which can not reach the threshold anyway.
+
+    Any other evaluator is returned unchanged.
+    """
+    if (
+        threshold is None
+        or not isinstance(evaluator, functools.partial)
+        or evaluator.func not in _threshold_aggregations
+        or "threshold" in evaluator.keywords
+    ):
+        return evaluator
+    return functools.partial(evaluator, threshold=threshold)
+
+
+def measure_costs(
+    mappings: Iterable[PropertyEvaluatorMapping],
+    query: Any,
+    cases: Iterable[Any],
+    *,
+    getvalue: Callable[[Any, str], Any] = getattr,
+) -> dict[str, float]:
+    """
+    Measures the average time in seconds of every mapping's evaluator over the given sample of cases.
+
+    The result can be passed as ``costs`` to ``case_average``, ``case_min`` and ``case_max``.
+    """
+    cases = list(cases)
+    costs = {}
+    for mapping in mappings:
+        property_name = mapping[0]
+        evaluator = mapping[1]
+        query_value = getvalue(query, property_name)
+        if query_value is None or not cases:
+            continue
+        case_values = [getvalue(case, property_name) for case in cases]
+        start = time.perf_counter()
+        for case_value in case_values:
+            evaluator(query_value, case_value)
+        costs[property_name] = (time.perf_counter() - start) / len(case_values)
+    return costs
+
+
 def equality(query: Any, case: Any) -> float:
     if query != case:
         return 0
@@ -130,6 +681,54 @@ def total_order(ordering: Sequence[Any], evaluate: Evaluator, query: Any, case:
         return evaluate(query_index, case_index)
 
 
+class TotalOrder:
+    """
+    Evaluates the values of an ordered domain by their rank exactly like ``total_order``.
+
+    The ranks are looked up in a dict built once instead of scanning the ordering for every call. Unknown
+    values have no rank and a similarity of 0. The similarities of all ranks to the current query value are
+    cached as they are computed.
+    """
+
+    __slots__ = ("ordering", "evaluator", "_ranks", "_state")
+
+    def __init__(self, ordering: Sequence[Any], evaluator: Evaluator) -> None:
+        self.ordering = ordering
+        self.evaluator = evaluator
+        self._ranks: dict[Any, int] = {}
+        for rank, value in enumerate(ordering):
+            self._ranks.setdefault(value, rank)
+        self._state: tuple[Any, Optional[int], list[Optional[float]]] = (_NO_QUERY, None, [])
+
+    def rank(self, value: Any) -> Optional[int]:
+        """Returns the rank of a value like ``ordering.index`` or ``None``, if the value is not part of it."""
+        try:
+            return self._ranks.get(value)
+        except TypeError:
+            try:
+                return self.ordering.index(value)
+            except ValueError:
+                return None
+
+    def ranks(self, values: Iterable[Any]) -> list[Optional[int]]:
+        """Returns the ranks of all values, e.g. to use a column of an ordered domain as numeric column."""
+        return [self.rank(value) for value in values]
+
+    def __call__(self, query: Any, case: Any) -> float:
+        state = self._state
+        if state[0] is not query and state[0] != query:
+            state = self._state = (query, self.rank(query), [None] * len(self.ordering))
+        query_rank = state[1]
+        case_rank = self.rank(case)
+        if query_rank is None or case_rank is None:
+            return 0
+        similarities = state[2]
+        similarity = similarities[case_rank]
+        if similarity is None:
+            similarity = similarities[case_rank] = self.evaluator(query_rank, case_rank)
+        return similarity
+
+
 def table_lookup(lookup: Mapping[str, Mapping[str, float]], query: Any, case: Any) -> float:
     if query == case:
         return 1
@@ -155,10 +754,23 @@ def coverage(query: Any, bulk: Iterable[Any], evaluate: Evaluator = equality) ->
     return similarity_sum / element_count
 
 
+def _count_contained(elements: Iterable[Any], hashed: frozenset) -> Optional[int]:
+    try:
+        return sum(1 for element in elements if element in hashed)
+    except TypeError:
+        return None
+
+
 def set_query_inclusion(evaluator: Evaluator, query: Sequence[Any], case: Sequence[Any]) -> float:
     size_of_query = len(query)
     if size_of_query == 0:
         return 0
+    if evaluator is equality:
+        # coverage is 1 for every query element contained in the case and 0 otherwise
+        hashed = hashed_elements(case)
+        contained = _count_contained(query, hashed) if hashed is not None else None
+        if contained is not None:
+            return contained / size_of_query
     current = functools.reduce(lambda e1, e2: e1 + coverage(e2, case, evaluator), [0, *query])
     return current / size_of_query
 
@@ -173,6 +785,94 @@ def set_intermediate(evaluator: Evaluator, query: Sequence[Any], case: Sequence[
     return (sim_1 + sim_2) / 2
 
 
+_set_similarities = {set_query_inclusion, set_case_inclusion, set_intermediate}
+
+
+def _coverage_row(similarities: Sequence[float], codes: Iterable[int]) -> float:
+    similarity_sum = 0
+    element_count = 0
+    for code in codes:
+        similarity = similarities[code]
+        if similarity == 1:
+            return 1
+        similarity_sum += similarity
+        element_count += 1
+    if element_count == 0:
+        return 0
+    return similarity_sum / element_count
+
+
+def _query_inclusions(evaluator: Evaluator, query: Sequence[Any], values: Column) -> Optional[list[float]]:
+    size_of_query = len(query)
+    if size_of_query == 0:
+        return [0] * len(values)
+    if evaluator is equality:
+        element_sets = values.element_sets
+        if element_sets is None:
+            return None
+        contained = [_count_contained(query, elements) for elements in element_sets]
+        if any(count is None for count in contained):
+            return None
+        return [count / size_of_query for count in contained]
+    domain = values.element_domain
+    if domain is None:
+        return None
+    rows = [[evaluator(element, case_element) for case_element in domain] for element in query]
+    results = []
+    for codes in values.element_codes:
+        current = 0
+        for row in rows:
+            current = current + _coverage_row(row, codes)
+        results.append(current / size_of_query)
+    return results
+
+
+def _case_inclusions(evaluator: Evaluator, query: Sequence[Any], values: Column) -> Optional[list[float]]:
+    if evaluator is equality:
+        element_sets = values.element_sets
+        hashed = hashed_elements(query)
+        if element_sets is None or hashed is None:
+            return None
+        results = []
+        for value in values.values:
+            size_of_case = len(value)
+            results.append(_count_contained(value, hashed) / size_of_case if size_of_case > 0 else 0)
+        return results
+    domain = values.element_domain
+    if domain is None:
+        return None
+    # the coverage of a case element only depends on the query, so it is computed once per distinct element
+    coverages = [coverage(case_element, query, evaluator) for case_element in domain]
+    results = []
+    for codes in values.element_codes:
+        size_of_case = len(codes)
+        if size_of_case == 0:
+            results.append(0)
+            continue
+        current = 0
+        for code in codes:
+            current = current + coverages[code]
+        results.append(current / size_of_case)
+    return results
+
+
+def _evaluate_sets_column(evaluator: Evaluator, query_value: Any, values: Sequence[Any]) -> Optional[list[float]]:
+    if not isinstance(values, Column) or type(query_value) not in (list, tuple, set, frozenset):
+        return None
+    if len(evaluator.args) != 1 or evaluator.keywords:
+        return None
+    element_evaluator = evaluator.args[0]
+    if evaluator.func is set_query_inclusion:
+        return _query_inclusions(element_evaluator, query_value, values)
+    if evaluator.func is set_case_inclusion:
+        return _case_inclusions(element_evaluator, query_value, values)
+    query_inclusions = _query_inclusions(element_evaluator, query_value, values)
+    case_inclusions = _case_inclusions(element_evaluator, query_value, values)
+    if query_inclusions is None or case_inclusions is None:
+        return None
+    return [(sim_1 + sim_2) / 2 for sim_1, sim_2 in zip(query_inclusions, case_inclusions)]
+
+
 def _calculate_distance(v1: float, v2: float, max_distance: float, cyclic: bool) -> float:
     result = abs(v1 - v2)
     if cyclic and result > max_distance:
@@ -1,61 +1,280 @@
+import bisect
 import math
-from typing import Any, Callable, Iterable, Iterator, Optional
+import numbers
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Sequence
 
-from cbrlib.types import Facet, FacetConfig, FacetValueOrderCriteria, FacetValue, Result
+from cbrlib import vectorized
+from cbrlib.columns import Column
+from cbrlib.types import Facet, FacetBin, FacetBinning, FacetConfig, FacetValueOrderCriteria, FacetValue, Result
 
 
-class FacetCollectingIterator(Iterator):
+class _Tally:
+    """
+    The number of hits of a facet value, the sum of their similarities and the rank ``(similarity, -position)``
+    of its best hit.
+
+    The values are ordered by their best hit like they were, when the facets were collected while iterating
+    over the hits sorted by similarity. The state is of constant size, so the facets take memory in the number
+    of values, not of hits. The importance is summed up in the order the hits are collected, which may differ
+    in the last bits from summing them up in the order of their rank.
+    """
+
+    __slots__ = ("count", "importance", "best")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.importance = 0
+        self.best: Optional[tuple[float, int]] = None
+
+    def add(self, similarity: float, position: int) -> None:
+        self.count += 1
+        self.importance += similarity
+        rank = (similarity, -position)
+        if self.best is None or rank > self.best:
+            self.best = rank
+
+    def add_group(self, count: int, importance: float, best: tuple[float, int]) -> None:
+        self.count += count
+        self.importance += importance
+        if self.best is None or best > self.best:
+            self.best = best
+
+
+def _ranked_values(tallies: dict[Any, _Tally]) -> list[FacetValue]:
+    ranked = sorted(tallies.items(), key=lambda item: item[1].best, reverse=True)
+    return [FacetValue(value, tally.count, tally.importance) for value, tally in ranked]
+
+
+class _BinnedValues:
+    """
+    The counts and similarity sums of the bins of a numeric facet. Bins given by edges are kept in lists of
+    fixed size, bins of a fixed width in dicts of the bins seen so far.
+    """
+
+    def __init__(self, binning: FacetBinning) -> None:
+        self._binning = binning
+        if binning.edges is not None:
+            self._counts = [0] * (len(binning.edges) - 1)
+            self._sums = [0] * (len(binning.edges) - 1)
+        else:
+            self._counts = {}
+            self._sums = {}
+
+    def _index(self, value: float) -> int:
+        edges = self._binning.edges
+        if edges is None:
+            return math.floor((value - self._binning.origin) / self._binning.width)
+        return min(max(bisect.bisect_right(edges, value) - 1, 0), len(edges) - 2)
+
+    def _bin(self, index: int) -> FacetBin:
+        edges = self._binning.edges
+        if edges is None:
+            low = self._binning.origin + index * self._binning.width
+            return FacetBin(low, low + self._binning.width)
+        return FacetBin(edges[index], edges[index + 1])
+
+    def _add(self, index: int, count: int, importance: float) -> None:
+        if self._binning.edges is None and index not in self._counts:
+            self._counts[index] = 0
+            self._sums[index] = 0
+        self._counts[index] += count
+        self._sums[index] += importance
+
+    def add(self, value: Any, similarity: float) -> None:
+        # values which are not finite numbers have no bin and are left out like missing values
+        if not isinstance(value, numbers.Real) or not math.isfinite(value):
+            return
+        self._add(self._index(value), 1, similarity)
+
+    def merge(self, other: "_BinnedValues") -> None:
+        indexes = range(len(other._counts)) if self._binning.edges is not None else other._counts.keys()
+        for index in indexes:
+            if other._counts[index] > 0:
+                self._add(index, other._counts[index], other._sums[index])
+
+    def values(self) -> list[FacetValue]:
+        if self._binning.edges is not None:
+            indexes = range(len(self._counts))
+        else:
+            indexes = sorted(self._counts)
+        return [
+            FacetValue(self._bin(index), self._counts[index], self._sums[index])
+            for index in indexes
+            if self._counts[index] > 0
+        ]
+
+
+class FacetCollector:
     def __init__(
-        self,
-        iterable: Iterable[Result],
-        facets: Iterable[FacetConfig],
-        *,
-        getvalue: Callable[[Any, str, Optional[Any]], Any] = getattr
+        self, facets: Iterable[FacetConfig], *, getvalue: Callable[[Any, str, Optional[Any]], Any] = getattr
     ) -> None:
-        self._iterator = iter(iterable)
         self._facets = facets
         self._getvalue = getvalue
-        self._facet_names = [f.name for f in facets]
-        self._facet_collection = {}
+        self._facet_names = [f.name for f in facets if f.binning is None]
+        self._binned_values = {f.name: _BinnedValues(f.binning) for f in facets if f.binning is not None}
+        self._facet_collection: dict[str, dict[Any, _Tally]] = {}
         self._divider = 0
         self._value_statistics = {}
 
-    def __next__(self) -> Result:
-        result: Result = next(self._iterator)
+    @property
+    def getvalue(self) -> Callable[[Any, str, Optional[Any]], Any]:
+        return self._getvalue
+
+    def _tally(self, facet_name: str, value: Any) -> _Tally:
+        tallies = self._facet_collection.setdefault(facet_name, {})
+        tally = tallies.get(value)
+        if tally is None:
+            tally = tallies[value] = _Tally()
+        return tally
+
+    def collect(self, similarity: float, case: Any, position: Optional[int] = None) -> None:
+        """
+        Collects a hit at the given position of the casebase. Without a position the hits are taken to be
+        collected in the order of their rank.
+        """
+        if position is None:
+            position = self._divider
         self._divider += 1
-        weight = result.similarity
-        case = result.case
         for facet_name in self._facet_names:
             value = self._getvalue(case, facet_name)
             if value is None:
                 continue
-            value_cache: dict = self._facet_collection.setdefault(facet_name, {})
-            facet_value: FacetValue = value_cache.setdefault(value, FacetValue(value))
-            facet_value.count += 1
-            facet_value.importance += weight
-        return result
+            self._tally(facet_name, value).add(similarity, position)
+        for facet_name, binned_values in self._binned_values.items():
+            binned_values.add(self._getvalue(case, facet_name), similarity)
+
+    def collect_columns(
+        self,
+        columns: Mapping[str, Column],
+        positions: Sequence[int],
+        similarities: Sequence[float],
+        numbers: Optional[Sequence[int]] = None,
+    ) -> None:
+        """
+        Collects the hits at the given positions of the columns of a casebase. The hits are grouped per code
+        of the dictionary encoded column instead of per hit. ``numbers`` are the positions of the hits in the
+        whole casebase, if the columns hold only a part of it.
+        """
+        numbers = positions if numbers is None else numbers
+        self._divider += len(positions)
+        for facet_name in self._facet_names:
+            column = columns[facet_name]
+            if column.has_distinct_values:
+                self._collect_codes(facet_name, column, positions, similarities, numbers)
+            else:
+                self._collect_values(facet_name, [column.values[p] for p in positions], similarities, numbers)
+        for facet_name, binned_values in self._binned_values.items():
+            values = columns[facet_name].values
+            for position, similarity in zip(positions, similarities):
+                binned_values.add(values[position], similarity)
+
+    def _collect_values(
+        self,
+        facet_name: str,
+        values: Sequence[Any],
+        similarities: Sequence[float],
+        numbers: Sequence[int],
+    ) -> None:
+        for value, similarity, number in zip(values, similarities, numbers):
+            if value is None:
+                continue
+            self._tally(facet_name, value).add(similarity, number)
+
+    def _collect_codes(
+        self,
+        facet_name: str,
+        column: Column,
+        positions: Sequence[int],
+        similarities: Sequence[float],
+        numbers: Sequence[int],
+    ) -> None:
+        dictionary = column.dictionary
+        for code, count, importance, best in _group(column.codes, positions, similarities, numbers):
+            value = dictionary[code]
+            if value is None:
+                continue
+            self._tally(facet_name, value).add_group(count, importance, best)
+
+    def merge(self, other: "FacetCollector") -> None:
+        """Adds the values collected by another collector with the same facets."""
+        self._divider += other._divider
+        for facet_name, other_tallies in other._facet_collection.items():
+            for value, other_tally in other_tallies.items():
+                self._tally(facet_name, value).add_group(other_tally.count, other_tally.importance, other_tally.best)
+        for facet_name, binned_values in self._binned_values.items():
+            binned_values.merge(other._binned_values[facet_name])
+
+    def _collected_values(self, facet: FacetConfig) -> Iterable[FacetValue]:
+        if facet.binning is not None:
+            return self._binned_values[facet.name].values()
+        return _ranked_values(self._facet_collection.get(facet.name, {}))
 
     @property
     def facets(self) -> Iterable[Facet]:
+        collected_values = [(facet, self._collected_values(facet)) for facet in self._facets]
         return sorted(
             [
                 Facet(
                     facet.name,
                     _to_facet_values(
-                        self._facet_collection[facet.name].values(),
+                        values,
                         facet.order_by,
                         facet.max_count,
                     ),
-                    _calculate_entropy(self._facet_collection[facet.name].values(), self._divider),
+                    _calculate_entropy(values, self._divider),
                 )
-                for facet in self._facets
-                if facet.name in self._facet_collection
+                for facet, values in collected_values
+                if values
             ],
             key=lambda f: f.entropy,
             reverse=True,
         )
 
 
+class FacetCollectingIterator(FacetCollector, Iterator):
+    def __init__(
+        self,
+        iterable: Iterable[Result],
+        facets: Iterable[FacetConfig],
+        *,
+        getvalue: Callable[[Any, str, Optional[Any]], Any] = getattr
+    ) -> None:
+        super().__init__(facets, getvalue=getvalue)
+        self._iterator = iter(iterable)
+
+    def __next__(self) -> Result:
+        result: Result = next(self._iterator)
+        self.collect(result.similarity, result.case)
+        return result
+
+
+def _group(
+    codes: Sequence[int],
+    positions: Sequence[int],
+    similarities: Sequence[float],
+    numbers: Sequence[int],
+) -> list[tuple[int, int, float, tuple[float, int]]]:
+    """
+    Returns every code of the hits at the given positions together with the number of its hits, the sum of
+    their similarities and the rank ``(similarity, -number)`` of its best hit.
+    """
+    if vectorized.is_available() and len(positions) >= 64:
+        return vectorized.group(codes, positions, similarities, numbers)
+    groups: dict[int, list[Any]] = {}
+    for position, similarity, number in zip(positions, similarities, numbers):
+        code = codes[position]
+        group = groups.get(code)
+        rank = (similarity, -number)
+        if group is None:
+            groups[code] = [1, similarity, rank]
+            continue
+        group[0] += 1
+        group[1] += similarity
+        if rank > group[2]:
+            group[2] = rank
+    return [(code, count, importance, best) for code, (count, importance, best) in groups.items()]
+
+
 def _to_facet_values(
     values: Iterable[FacetValue],
     order_criteria: FacetValueOrderCriteria,
@@ -76,6 +295,10 @@ def _calculate_entropy(facet_values: Iterable[FacetValue], divider: int) -> floa
 def _apply_facet_value_importance(
     facet_values: Iterable[FacetValue],
 ) -> Iterator[FacetValue]:
+    # the collected values are left untouched, so the facets can be read again while collecting continues
     for facet_value in facet_values:
-        facet_value.importance /= facet_value.count
-        yield facet_value
+        yield FacetValue(
+            facet_value.value,
+            facet_value.count,
+            facet_value.importance / facet_value.count,
+        )
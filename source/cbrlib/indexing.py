@@ -0,0 +1,260 @@
+"""
+Attribute indexes of a ``CaseBase`` which are used to skip cases that can not reach the threshold.
+
+For some evaluators only a small, computable set of case values results in a similarity above 0, e.g. the
+query value itself for ``evaluate.equality``. An index returns the positions of those cases together with an
+upper bound of their similarity. All other cases are known to have a similarity of 0 for the attribute.
+"""
+
+import bisect
+import functools
+import math
+from typing import Any, Callable, Iterable, Mapping, Optional, Protocol, Sequence
+
+from cbrlib import evaluate
+from cbrlib.columns import Column
+from cbrlib.evaluate import Evaluator
+from cbrlib.types import NumericEvaluationOptions
+
+_PRUNING_TOLERANCE = 1e-9
+_WINDOW_TOLERANCE = 1e-9
+
+
+class IndexedCaseBase(Protocol):
+    def __len__(self) -> int: ...
+
+    def value_index(self, property_name: str) -> Optional["ValueIndex"]: ...
+
+    def numeric_index(self, property_name: str) -> Optional["NumericIndex"]: ...
+
+
+class ValueIndex:
+    """Inverted index from the values of a column to the positions of the cases having that value."""
+
+    __slots__ = ("_positions",)
+
+    def __init__(self, positions: dict[Any, list[int]]) -> None:
+        self._positions = positions
+
+    @staticmethod
+    def build(column: Column) -> Optional["ValueIndex"]:
+        """Builds the index of a column or returns ``None``, if the column contains unhashable values."""
+        positions: dict[Any, list[int]] = {}
+        try:
+            for position, value in enumerate(column.values):
+                positions.setdefault(value, []).append(position)
+        except TypeError:
+            return None
+        return ValueIndex(positions)
+
+    def positions(self, value: Any) -> Sequence[int]:
+        try:
+            return self._positions.get(value, ())
+        except TypeError:
+            return ()
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+
+class NumericIndex:
+    """
+    The positions of the cases with a numeric value sorted by that value.
+
+    Cases without a value or with NaN are not part of the index, they can not be similar to any query value.
+    """
+
+    __slots__ = ("_values", "_positions")
+
+    def __init__(self, values: list[float], positions: list[int]) -> None:
+        self._values = values
+        self._positions = positions
+
+    @staticmethod
+    def build(column: Column) -> Optional["NumericIndex"]:
+        """Builds the index of a column or returns ``None``, if the column contains non-numeric values."""
+        entries = []
+        for position, value in enumerate(column.values):
+            if value is None or value != value:
+                continue
+            if type(value) not in (int, float):
+                return None
+            entries.append((value, position))
+        entries.sort()
+        return NumericIndex([value for value, _ in entries], [position for _, position in entries])
+
+    def range(self, low: float, high: float) -> Sequence[int]:
+        """Returns the positions of all cases with a value between ``low`` and ``high`` (both included)."""
+        start = bisect.bisect_left(self._values, low)
+        stop = bisect.bisect_right(self._values, high)
+        return self._positions[start:stop]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+def numeric_window(options: NumericEvaluationOptions, query_value: float) -> Optional[list[tuple[float, float]]]:
+    """
+    Returns the ranges of case values which can have a similarity above 0 with ``evaluate.numeric``.
+
+    The ranges respect asymmetric tolerances, ``use_origin`` and cyclic domains and are slightly widened, so
+    rounding can never exclude a similar case. ``None`` is returned, if every case value is similar.
+    """
+    if options.use_origin:
+        max_distance = abs(query_value - options.origin)
+    else:
+        max_distance = options.max_distance
+    if max_distance == 0:
+        return None
+
+    def reach(parameters) -> float:
+        relative_distance = min(1.0, max(parameters.equal, parameters.tolerance))
+        return relative_distance * max_distance * (1 + _WINDOW_TOLERANCE) + _WINDOW_TOLERANCE
+
+    less_reach = reach(options.if_less)
+    more_reach = reach(options.if_more)
+    if not options.cyclic:
+        return [(query_value - less_reach, query_value + more_reach)]
+    # The direction of a cyclic distance depends on the shorter way around, so both sides use the wider
+    # reach. Distances larger than the domain wrap around to the other end.
+    distance = max(less_reach, more_reach)
+    wrap = 2 * options.max_distance - distance
+    return [
+        (-float("inf"), query_value - wrap),
+        (query_value - distance, query_value + distance),
+        (query_value + wrap, float("inf")),
+    ]
+
+
+def _numeric_candidates(index: NumericIndex, options: NumericEvaluationOptions, query_value: Any) -> Optional[dict]:
+    if type(query_value) not in (int, float) or query_value != query_value:
+        return None
+    window = numeric_window(options, query_value)
+    if window is None:
+        return None
+    candidates: dict[int, float] = {}
+    for low, high in window:
+        candidates.update(dict.fromkeys(index.range(low, high), 1.0))
+    return candidates
+
+
+def _total_order_candidates(index: ValueIndex, total_order: evaluate.TotalOrder, query_value: Any) -> Optional[dict]:
+    inner = total_order.evaluator
+    query_rank = total_order.rank(query_value)
+    if query_rank is None:
+        return {}
+    if inner is evaluate.equality:
+        window = [(query_rank, query_rank)]
+    elif isinstance(inner, functools.partial) and inner.func is evaluate.numeric and len(inner.args) == 1:
+        window = numeric_window(inner.args[0], query_rank)
+        if window is None:
+            return None
+    else:
+        return None
+    ordering = total_order.ordering
+    candidates: dict[int, float] = {}
+    for low, high in window:
+        for rank in range(math.ceil(max(0, low)), math.floor(min(len(ordering) - 1, high)) + 1):
+            value = ordering[rank]
+            if total_order.rank(value) == rank:
+                candidates.update(dict.fromkeys(index.positions(value), 1.0))
+    return candidates
+
+
+def _equality_candidates(index: ValueIndex, query_value: Any) -> dict[int, float]:
+    return dict.fromkeys(index.positions(query_value), 1.0)
+
+
+def _table_lookup_candidates(
+    index: ValueIndex,
+    lookup: Mapping[Any, Mapping[Any, float]],
+    query_value: Any,
+) -> dict[int, float]:
+    candidates: dict[int, float] = {}
+    try:
+        query_map = lookup.get(query_value, {})
+    except TypeError:
+        query_map = {}
+    for case_value, similarity in query_map.items():
+        if similarity <= 0:
+            continue
+        for position in index.positions(case_value):
+            candidates[position] = similarity
+    for position in index.positions(query_value):
+        candidates[position] = 1.0
+    return candidates
+
+
+def candidate_similarities(
+    casebase: IndexedCaseBase,
+    property_name: str,
+    evaluator: Evaluator,
+    query_value: Any,
+) -> Optional[dict[int, float]]:
+    """
+    Returns the positions of all cases which can have a similarity above 0 for the attribute, together with
+    an upper bound of that similarity. ``None`` is returned, if the evaluator can not be answered by an index.
+    """
+    if evaluator is evaluate.equality:
+        index = casebase.value_index(property_name)
+        return _equality_candidates(index, query_value) if index is not None else None
+    if isinstance(evaluator, evaluate.TotalOrder):
+        index = casebase.value_index(property_name)
+        return _total_order_candidates(index, evaluator, query_value) if index is not None else None
+    if isinstance(evaluator, functools.partial) and len(evaluator.args) == 1 and not evaluator.keywords:
+        if evaluator.func is evaluate.table_lookup:
+            index = casebase.value_index(property_name)
+            return _table_lookup_candidates(index, evaluator.args[0], query_value) if index is not None else None
+        if evaluator.func is evaluate.numeric:
+            index = casebase.numeric_index(property_name)
+            return _numeric_candidates(index, evaluator.args[0], query_value) if index is not None else None
+    return None
+
+
+def candidates(
+    casebase: IndexedCaseBase,
+    evaluator: Evaluator,
+    query: Any,
+    threshold: float,
+) -> Optional[list[int]]:
+    """
+    Returns the ascending positions of all cases which can reach the threshold with an evaluator built as
+    ``functools.partial(evaluate.case_average, mappings)``.
+
+    The weights of the indexed mappings give an upper bound of the similarity of every case. Cases which are
+    not returned are guaranteed to have a similarity below the threshold. ``None`` is returned, if the
+    evaluator is not supported or the indexes can not exclude any case.
+    """
+    if threshold is None or threshold <= 0 or not isinstance(evaluator, functools.partial):
+        return None
+    if evaluator.func is not evaluate.case_average or len(evaluator.args) != 1:
+        return None
+    getvalue: Callable[[Any, str], Any] = evaluator.keywords.get("getvalue", getattr)
+    mappings: Iterable = evaluator.args[0]
+
+    divider = 0
+    unbounded_weight = 0
+    bounds: list[tuple[float, dict[int, float]]] = []
+    for mapping in mappings:
+        property_name = mapping[0]
+        weight = mapping[2]
+        query_value = getvalue(query, property_name)
+        if query_value is None:
+            continue
+        divider += weight
+        similarities = candidate_similarities(casebase, property_name, mapping[1], query_value)
+        if similarities is None:
+            unbounded_weight += weight
+        else:
+            bounds.append((weight, similarities))
+    if divider <= 0:
+        return None
+    limit = (threshold - _PRUNING_TOLERANCE) * divider
+    if not bounds or unbounded_weight >= limit:
+        return None
+
+    reachable: dict[int, float] = {}
+    for weight, similarities in bounds:
+        for position, similarity in similarities.items():
+            reachable[position] = reachable.get(position, unbounded_weight) + weight * similarity
+    return sorted(position for position, similarity_sum in reachable.items() if similarity_sum >= limit)
@@ -0,0 +1,117 @@
+"""
+Opt-in timings and counters of a single ``casebase.infer`` call.
+
+The statistics of the running query are held in a context variable. The functions which can report
+something look it up once per query or column, so nothing is measured, and nearly nothing is paid, while no
+statistics are collected. Evaluators of the ``case_*`` aggregators are only wrapped for timing while
+collecting.
+"""
+
+import contextlib
+import functools
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from cbrlib.types import Evaluator, ReasoningStats
+
+_current_stats: ContextVar[Optional[ReasoningStats]] = ContextVar("cbrlib_reasoning_stats", default=None)
+
+
+def current() -> Optional[ReasoningStats]:
+    """Returns the statistics collected for the running query or ``None``, if none are collected."""
+    return _current_stats.get()
+
+
+@contextlib.contextmanager
+def collecting(stats: ReasoningStats) -> Iterator[ReasoningStats]:
+    """Collects the statistics of everything run inside the context into ``stats``."""
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def add_evaluation(
+    stats: ReasoningStats, property_name: str, calls: int, duration: float, cache_hits: int = 0
+) -> None:
+    stats.evaluator_calls[property_name] = stats.evaluator_calls.get(property_name, 0) + calls
+    if cache_hits:
+        stats.evaluator_cache_hits[property_name] = stats.evaluator_cache_hits.get(property_name, 0) + cache_hits
+    stats.evaluator_time[property_name] = stats.evaluator_time.get(property_name, 0.0) + duration
+
+
+@contextlib.contextmanager
+def phase(stats: ReasoningStats, name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.phase_time[name] = stats.phase_time.get(name, 0.0) + time.perf_counter() - start
+
+
+class TimedEvaluator:
+    """Counts the calls of an attribute evaluator and the time spent in it under the property name."""
+
+    __slots__ = ("property_name", "evaluator", "_stats")
+
+    def __init__(self, property_name: str, evaluator: Evaluator, stats: ReasoningStats) -> None:
+        self.property_name = property_name
+        self.evaluator = evaluator
+        self._stats = stats
+
+    def __call__(self, query: Any, case: Any) -> float:
+        start = time.perf_counter()
+        try:
+            return self.evaluator(query, case)
+        finally:
+            add_evaluation(self._stats, self.property_name, 1, time.perf_counter() - start)
+
+
+def timed_evaluator(evaluator: Evaluator, stats: ReasoningStats) -> Evaluator:
+    """
+    Returns an evaluator built as ``functools.partial(case_*, mappings)`` with every attribute evaluator timed.
+    Any other evaluator is timed as a whole under the name ``"*"``.
+    """
+    if isinstance(evaluator, functools.partial) and len(evaluator.args) == 1:
+        try:
+            mappings = tuple(
+                mapping._make((mapping[0], TimedEvaluator(mapping[0], mapping[1], stats), *mapping[2:]))
+                for mapping in evaluator.args[0]
+            )
+        except (AttributeError, TypeError, ValueError):
+            mappings = None
+        if mappings is not None:
+            return functools.partial(evaluator.func, mappings, **evaluator.keywords)
+    return TimedEvaluator("*", evaluator, stats)
+
+
+def counted(cases: Iterable[Any], stats: ReasoningStats) -> Iterator[Any]:
+    for case in cases:
+        stats.cases_scored += 1
+        yield case
+
+
+class TimedFacetCollector:
+    """Adds the time spent collecting facet values to the ``facet_collection`` phase."""
+
+    def __init__(self, facet_collector: Any, stats: ReasoningStats) -> None:
+        self._facet_collector = facet_collector
+        self._stats = stats
+
+    @property
+    def getvalue(self) -> Callable[..., Any]:
+        return self._facet_collector.getvalue
+
+    @property
+    def facets(self) -> Any:
+        return self._facet_collector.facets
+
+    def collect(self, *args: Any) -> None:
+        with phase(self._stats, "facet_collection"):
+            self._facet_collector.collect(*args)
+
+    def collect_columns(self, *args: Any) -> None:
+        with phase(self._stats, "facet_collection"):
+            self._facet_collector.collect_columns(*args)
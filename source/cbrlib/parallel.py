@@ -0,0 +1,93 @@
+"""
+Sharded inference on multiple processes.
+
+The casebase is split into contiguous shards and every shard lives in its own worker process. The shard and
+the pickled evaluator are sent to the worker only once when the worker is started, each request only
+transfers the request itself and the best hits of every shard.
+"""
+
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Generic, Iterable, Optional
+
+from cbrlib.casebase import CaseBase, HitCollector, collect
+from cbrlib.evaluate import Evaluator
+from cbrlib.types import C, ReasoningRequest, ReasoningResponse
+
+_shard: Optional[Iterable[Any]] = None
+_start: int = 0
+_evaluator: Optional[Evaluator] = None
+_getvalue: Callable[[Any, str, Optional[Any]], Any] = getattr
+
+
+def _initialize_worker(
+    shard: Iterable[Any],
+    start: int,
+    evaluator: Evaluator,
+    getvalue: Callable[[Any, str, Optional[Any]], Any],
+) -> None:
+    global _shard, _start, _evaluator, _getvalue
+    _shard = shard
+    _start = start
+    _evaluator = evaluator
+    _getvalue = getvalue
+
+
+def _infer_shard(request: ReasoningRequest) -> HitCollector:
+    collector = HitCollector(request, _getvalue)
+    collect(_shard, request, _evaluator, collector, start=_start)
+    return collector
+
+
+class ParallelCaseBase(Generic[C]):
+    """
+    Scores a casebase split into ``shards`` on the same number of worker processes.
+
+    The response of ``infer`` is the same as the one of ``casebase.infer`` for the whole casebase. The
+    evaluator and ``getvalue`` have to be picklable, e.g. ``functools.partial`` objects of module-level
+    functions.
+    """
+
+    def __init__(
+        self,
+        casebase: Iterable[C],
+        evaluator: Evaluator,
+        *,
+        shards: Optional[int] = None,
+        getvalue: Callable[[Any, str, Optional[Any]], Any] = getattr,
+        mp_context: Optional[Any] = None,
+    ) -> None:
+        if not isinstance(casebase, CaseBase):
+            casebase = list(casebase)
+        size = len(casebase)
+        shards = max(1, min(shards or os.cpu_count() or 1, size))
+        self._getvalue = getvalue
+        self._executors: list[Executor] = []
+        for index in range(shards):
+            start = size * index // shards
+            stop = size * (index + 1) // shards
+            shard = casebase.slice(start, stop) if isinstance(casebase, CaseBase) else casebase[start:stop]
+            executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=mp_context,
+                initializer=_initialize_worker,
+                initargs=(shard, start, evaluator, getvalue),
+            )
+            self._executors.append(executor)
+
+    def infer(self, request: ReasoningRequest[C]) -> ReasoningResponse[C]:
+        futures = [executor.submit(_infer_shard, request) for executor in self._executors]
+        collector = HitCollector(request, self._getvalue)
+        for future in futures:
+            collector.merge(future.result())
+        return collector.response()
+
+    def shutdown(self) -> None:
+        for executor in self._executors:
+            executor.shutdown()
+
+    def __enter__(self) -> "ParallelCaseBase[C]":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
@@ -0,0 +1,199 @@
+"""
+Retrieval sessions for interactive refinement of a query, e.g. by selecting facet values one at a time.
+
+A session keeps the similarity column of every mapping for the query value it was last evaluated with. A
+refined query only evaluates the columns of the properties whose value changed, the others are reused and
+aggregated again. The responses are exactly those of ``casebase.infer``.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Union
+
+from cbrlib import evaluate
+from cbrlib.casebase import CaseBase, CaseBaseSnapshot, HitCollector, MutableCaseBase, collect, snapshot_of
+from cbrlib.columns import value_key
+from cbrlib.evaluate import Evaluator
+from cbrlib.types import C, ReasoningRequest, ReasoningResponse
+
+
+class RetrievalSession:
+    """
+    Answers a sequence of requests against a ``CaseBase`` or ``MutableCaseBase`` with an evaluator built as
+    ``functools.partial(case_*, mappings)``.
+
+    At most one similarity column per mapping is kept, so a session holds no more than ``len(mappings)``
+    floats per case. The columns of a ``MutableCaseBase`` are kept for the casebases its snapshot is made
+    of, so after a change only the columns of the recently added cases are evaluated again. If the evaluator
+    reads the cases with another ``getvalue`` than the casebase, the columns do not hold its values and every
+    request is scored case by case like ``casebase.infer`` does.
+    """
+
+    def __init__(
+        self,
+        casebase: Union[CaseBase[C], MutableCaseBase[C]],
+        evaluator: Evaluator,
+        *,
+        getvalue: Callable[[Any, str, Optional[Any]], Any] = getattr,
+    ) -> None:
+        if not isinstance(casebase, (CaseBase, MutableCaseBase)):
+            raise TypeError(f"Sessions need a CaseBase or MutableCaseBase, not {type(casebase).__name__}")
+        if evaluate.as_column_evaluator(evaluator) is None:
+            raise ValueError(f"Evaluator {evaluator!r} is not built from the mappings of a case_* aggregator")
+        self.casebase = casebase
+        self.evaluator = evaluator
+        self.getvalue = getvalue
+        self.last_used = time.monotonic()
+        self.evaluations = 0
+        self._mappings = tuple(evaluator.args[0])
+        self._query_getvalue = evaluator.keywords.get("getvalue", getattr)
+        self._aggregate = evaluate._similarity_aggregations[evaluator.func]
+        # the similarity columns of every casebase of the last snapshot by mapping index
+        self._similarities: list[tuple[CaseBase[C], dict[int, tuple[Any, list[float]]]]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cached_floats(self) -> int:
+        """The number of similarities kept for the next request."""
+        return sum(len(cached[1]) for _, columns in self._similarities for cached in columns.values())
+
+    def _segments(self, collector: HitCollector[C]) -> list[tuple[CaseBase[C], Any, int]]:
+        casebase = snapshot_of(self.casebase)
+        if isinstance(casebase, CaseBaseSnapshot):
+            return casebase.segments(collector)
+        return [(casebase, collector, 0)]
+
+    def _similarity_columns(
+        self, casebase: CaseBase[C], columns: dict[int, tuple[Any, list[float]]], query: Any
+    ) -> list[tuple[float, list[float]]]:
+        weighted_similarities = []
+        for index, mapping in enumerate(self._mappings):
+            property_name = mapping[0]
+            query_value = self._query_getvalue(query, property_name)
+            if query_value is None:
+                continue
+            key = value_key(query_value)
+            cached = columns.get(index)
+            if cached is None or cached[0] != key:
+                similarities = evaluate._evaluate_property(
+                    property_name, mapping[1], query_value, casebase.columns, None
+                )
+                cached = columns[index] = (key, similarities)
+                self.evaluations += 1
+            weighted_similarities.append((mapping[2] if len(mapping) > 2 else 1, cached[1]))
+        return weighted_similarities
+
+    def infer(self, request: ReasoningRequest[C]) -> ReasoningResponse[C]:
+        """Returns the same response as ``casebase.infer(casebase, request, evaluator)``."""
+        with self._lock:
+            self.last_used = time.monotonic()
+            collector = HitCollector(request, self.getvalue)
+            if self._query_getvalue is not self.casebase._getvalue:
+                collect(self.casebase, request, self.evaluator, collector)
+                return collector.response()
+            segments = self._segments(collector)
+            previous = self._similarities
+            self._similarities = []
+            for casebase, segment_collector, start in segments:
+                columns = next((columns for cached, columns in previous if cached is casebase), {})
+                self._similarities.append((casebase, columns))
+                size = len(casebase)
+                similarities = self._aggregate(self._similarity_columns(casebase, columns, request.query), size)
+                segment_collector.collect_columns(casebase, range(size), similarities, start)
+            return collector.response()
+
+    def clear(self) -> None:
+        """Drops the similarity columns."""
+        with self._lock:
+            self._similarities = []
+
+
+class SessionPool:
+    """
+    Keeps the sessions of many users against the same casebase and evaluator.
+
+    Sessions which were not used for ``idle_timeout`` seconds are evicted, and the least recently used ones
+    are evicted when there are more than ``maxsize``. If ``max_floats`` is given, the least recently used
+    sessions are also evicted while all sessions keep more similarities than that, so the memory stays
+    bounded no matter how large the casebase is.
+    """
+
+    def __init__(
+        self,
+        casebase: Union[CaseBase[C], MutableCaseBase[C]],
+        evaluator: Evaluator,
+        *,
+        maxsize: int = 64,
+        idle_timeout: float = 300.0,
+        max_floats: Optional[int] = None,
+        getvalue: Callable[[Any, str, Optional[Any]], Any] = getattr,
+    ) -> None:
+        self.casebase = casebase
+        self.evaluator = evaluator
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.max_floats = max_floats
+        self.getvalue = getvalue
+        self._sessions: OrderedDict[Hashable, RetrievalSession] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._sessions
+
+    def _evict_idle(self, now: float) -> int:
+        idle = [key for key, session in self._sessions.items() if now - session.last_used > self.idle_timeout]
+        for key in idle:
+            del self._sessions[key]
+        return len(idle)
+
+    def evict_idle(self) -> int:
+        """Removes the sessions which were idle for longer than ``idle_timeout`` and returns their number."""
+        with self._lock:
+            return self._evict_idle(time.monotonic())
+
+    def session(self, key: Hashable) -> RetrievalSession:
+        """Returns the session of a key, which is created if there is none."""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = RetrievalSession(self.casebase, self.evaluator, getvalue=self.getvalue)
+                while len(self._sessions) > self.maxsize:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(key)
+            return session
+
+    def cached_floats(self) -> int:
+        """The number of similarities kept by all sessions."""
+        with self._lock:
+            return sum(session.cached_floats for session in self._sessions.values())
+
+    def _evict_to_max_floats(self, key: Hashable) -> None:
+        # the session of the key is the most recently used one and is only cleared, if it exceeds the limit alone
+        with self._lock:
+            sessions = self._sessions
+            cached = {other: session.cached_floats for other, session in sessions.items()}
+            total = sum(cached.values())
+            for other in list(sessions):
+                if total <= self.max_floats:
+                    return
+                if other != key:
+                    total -= cached[other]
+                    del sessions[other]
+            session = sessions.get(key)
+        if total > self.max_floats and session is not None:
+            session.clear()
+
+    def infer(self, key: Hashable, request: ReasoningRequest[C]) -> ReasoningResponse[C]:
+        response = self.session(key).infer(request)
+        if self.max_floats is not None:
+            self._evict_to_max_floats(key)
+        return response
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._sessions.pop(key, None)
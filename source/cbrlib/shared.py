@@ -0,0 +1,202 @@
+"""
+Casebases in shared memory, published by one process and attached read only by any number of others.
+
+A ``SharedCaseBasePublisher`` encodes the cases in the format of ``cbrlib.storage`` into a block of shared memory
+and announces it by incrementing a generation counter, which is stored in a small control block under the name
+of the publisher. A ``SharedCaseBase`` attaches to the block of the latest generation and switches to a newly
+published one on its next call to ``current``, keeping previous generations attached while they are in ``use``.
+The block also holds the dictionaries and indexes of the number and category columns, and ``to_casebase`` of
+the casebase returned wraps the shared pages in a ``CaseBase`` whose cases, columns, dictionaries and indexes are
+views. So a host keeps one copy of the casebase with its indexes however many workers use it.
+"""
+
+import contextlib
+import os
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from cbrlib import storage
+from cbrlib.storage import StoredCaseBase
+
+_CONTROL_SIZE = 8
+
+# Only POSIX shared memory is registered with the resource tracker.
+_TRACKED = os.name == "posix"
+
+
+def _block_name(name: str, generation: int) -> str:
+    return f"{name}-{generation}"
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Attaching registers the block with the resource tracker, which would unlink it when this process exits
+    # although the publisher owns it, so the registration is dropped again.
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        pass
+    block = shared_memory.SharedMemory(name)
+    if _TRACKED:
+        resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+def _unlink(block: shared_memory.SharedMemory) -> None:
+    # Processes started by the publisher share its resource tracker, so attaching there dropped the registration
+    # of the publisher, which unlinking removes again.
+    if _TRACKED:
+        resource_tracker.register(block._name, "shared_memory")
+    block.unlink()
+
+
+def _read_generation(control: shared_memory.SharedMemory) -> int:
+    return int.from_bytes(control.buf[:_CONTROL_SIZE], "little")
+
+
+class SharedCaseBasePublisher:
+    """
+    Publishes casebases under a name. Every call to ``publish`` creates a new generation, the block of the
+    previous one is unlinked but stays readable for processes which are still attached to it.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._control = shared_memory.SharedMemory(name, create=True, size=_CONTROL_SIZE)
+        self._control.buf[:_CONTROL_SIZE] = bytes(_CONTROL_SIZE)
+        self._block: Optional[shared_memory.SharedMemory] = None
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """The generation of the casebase published last, 0 if none was published yet."""
+        return _read_generation(self._control)
+
+    def publish(
+        self,
+        cases: Iterable[Any],
+        properties: Iterable[str],
+        *,
+        getvalue: Callable[[Any, str], Any] = getattr,
+        indexes: bool = True,
+    ) -> int:
+        """Publishes the given properties of the cases like ``storage.write`` and returns the new generation."""
+        _, parts = storage._encode(cases, properties, getvalue, indexes)
+        size = sum(len(part) for part in parts)
+        with self._lock:
+            generation = self.generation + 1
+            block = shared_memory.SharedMemory(_block_name(self.name, generation), create=True, size=size)
+            offset = 0
+            for part in parts:
+                block.buf[offset : offset + len(part)] = part  # noqa: E203
+                offset += len(part)
+            self._control.buf[:_CONTROL_SIZE] = generation.to_bytes(_CONTROL_SIZE, "little")
+            previous, self._block = self._block, block
+            if previous is not None:
+                previous.close()
+                _unlink(previous)
+        return generation
+
+    def close(self) -> None:
+        """Unlinks the published casebase and the generation counter."""
+        with self._lock:
+            for block in (self._block, self._control):
+                if block is not None:
+                    block.close()
+                    _unlink(block)
+            self._block = None
+
+    def __enter__(self) -> "SharedCaseBasePublisher":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+class SharedCaseBase:
+    """
+    The read only side of a ``SharedCaseBasePublisher`` with the same name.
+
+    ``current`` returns the casebase of the latest generation, which can be passed to ``casebase.infer`` as it
+    is or, to evaluate it column by column, as ``current().to_casebase(mappings)``. Inside
+    ``use`` the generation returned stays attached, even when a newer one is published in the meantime, so an
+    infer and its hits can read their cases until the context is left. A generation which is not used anymore is
+    closed when a newer one is returned, so cases of a casebase returned by ``current`` outside of ``use`` must
+    not be kept beyond the next switch.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._control = _attach(name)
+        self._generation = 0
+        self._casebase: Optional[StoredCaseBase] = None
+        self._users: dict[int, int] = {}
+        self._retired: dict[int, StoredCaseBase] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """The generation of the casebase returned by ``current`` last."""
+        return self._generation
+
+    def current(self) -> StoredCaseBase:
+        with self._lock:
+            return self._current()
+
+    @contextlib.contextmanager
+    def use(self) -> Iterator[StoredCaseBase]:
+        """Returns the casebase of the latest generation, which is not closed before the context is left."""
+        with self._lock:
+            casebase = self._current()
+            generation = self._generation
+            self._users[generation] = self._users.get(generation, 0) + 1
+        try:
+            yield casebase
+        finally:
+            with self._lock:
+                self._users[generation] -= 1
+                if self._users[generation] == 0:
+                    del self._users[generation]
+                    retired = self._retired.pop(generation, None)
+                    if retired is not None:
+                        retired.close()
+
+    def _current(self) -> StoredCaseBase:
+        while True:
+            generation = _read_generation(self._control)
+            if generation == 0:
+                raise LookupError(f"No casebase was published as {self.name!r} yet")
+            if generation == self._generation:
+                return self._casebase
+            try:
+                block = _attach(_block_name(self.name, generation))
+            except FileNotFoundError:
+                # A newer generation may have been published and unlinked this one in the meantime.
+                if _read_generation(self._control) == generation:
+                    raise
+                continue
+            previous, previous_generation = self._casebase, self._generation
+            self._casebase = StoredCaseBase.from_buffer(block.buf, block.close)
+            self._generation = generation
+            if previous is not None:
+                if previous_generation in self._users:
+                    self._retired[previous_generation] = previous
+                else:
+                    previous.close()
+            return self._casebase
+
+    def close(self) -> None:
+        """Closes all generations, also those still in use, and detaches from the generation counter."""
+        with self._lock:
+            for casebase in (self._casebase, *self._retired.values()):
+                if casebase is not None:
+                    casebase.close()
+            self._casebase = None
+            self._retired.clear()
+            self._control.close()
+
+    def __enter__(self) -> "SharedCaseBase":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
@@ -0,0 +1,754 @@
+"""
+A binary casebase format which is opened with ``mmap`` instead of being parsed.
+
+The file starts with a small JSON header describing the columns followed by their data, every section aligned
+to 8 bytes and stored little endian:
+
+* ``int`` and ``float`` columns: one int64 or float64 per case and one byte per case marking missing values.
+* ``category`` columns: one int32 code per case into a dictionary of values, which contains ``None`` for missing
+  values, and one byte per case marking missing values.
+* ``set`` columns for lists, tuples and sets: int64 offsets of every case into one int32 array of element
+  codes into a dictionary of the elements and one byte per case marking missing values.
+* dictionaries: one byte per value for its type, int64 offsets of every value into the UTF-8 text of all
+  values, which is the string itself or the ``repr`` of a number.
+
+Files written with ``indexes`` also contain what a ``CaseBase`` derives from number and category columns for
+``infer``: the dictionary and the int32 codes of the numbers, the codes of every dictionary sorted by value, the
+int64 positions of the cases grouped by code (the ``ValueIndex``) and those of the numbers sorted by value (the
+``NumericIndex``).
+
+Opening a file only reads the header, whose size does not depend on the number of cases or distinct values.
+The cases are views which read their values from the mapped pages on access, and dictionary values are decoded
+on first access, so the pages are loaded lazily and shared by every process opening the same file.
+"""
+
+import bisect
+import csv
+import itertools
+import json
+import mmap
+import sys
+from array import array
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Sequence, Union
+
+from cbrlib import indexing
+from cbrlib.casebase import CaseBase
+from cbrlib.columns import _MAX_EXACT_INTEGER, _UNSET, Column
+from cbrlib.types import PropertyEvaluatorMapping, WeightedPropertyEvaluatorMapping
+
+MAGIC = b"CBRLIB\x00\x03"
+
+_ALIGNMENT = 8
+_SET_TYPES = {"list": list, "tuple": tuple, "set": set, "frozenset": frozenset}
+_INT64_RANGE = (-(2**63), 2**63 - 1)
+_DICTIONARY_TYPES = (str, bool, int, float, type(None))
+_UNDECODED = object()
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+class _ColumnBuilder:
+    # Collects the values of a property into typed arrays. The kind is taken from the first value which is
+    # not None, int columns become float columns when a float follows.
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.kind: Optional[str] = None
+        self.size = 0
+        self.missing = bytearray()
+        self.values: Optional[array] = None
+        self.codes: dict[Any, int] = {}
+        self.offsets = array("q", [0])
+        self.set_type: Optional[str] = None
+
+    def _start(self, value: Any) -> None:
+        value_type = type(value)
+        if value_type is int:
+            self.kind = "int"
+            self.values = array("q", [0] * self.size)
+        elif value_type is float:
+            self.kind = "float"
+            self.values = array("d", [0.0] * self.size)
+        elif value_type in (str, bool):
+            self.kind = "category"
+            self.values = array("i", [self._code(None)] * self.size if self.size else ())
+        elif value_type in _SET_TYPES.values():
+            self.kind = "set"
+            self.set_type = value_type.__name__
+            self.values = array("i")
+            self.offsets = array("q", [0] * (self.size + 1))
+        else:
+            raise TypeError(f"Values of type {value_type.__name__} of {self.name!r} can not be stored")
+
+    def _code(self, value: Any) -> int:
+        if type(value) not in _DICTIONARY_TYPES:
+            raise TypeError(f"Value {value!r} of {self.name!r} can not be stored in a dictionary")
+        key = (type(value), value)
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.codes)
+        return code
+
+    def add(self, value: Any) -> None:
+        if value is not None and self.kind is None:
+            self._start(value)
+        self.size += 1
+        self.missing.append(value is None)
+        if self.kind is None:
+            return
+        if self.kind == "set":
+            if value is not None:
+                if type(value).__name__ != self.set_type:
+                    raise TypeError(f"Value {value!r} of {self.name!r} is not a {self.set_type}")
+                self.values.extend(self._code(element) for element in value)
+            self.offsets.append(len(self.values))
+        elif self.kind == "category":
+            if value is not None and type(value) not in (str, bool):
+                raise TypeError(f"Value {value!r} of {self.name!r} is not a category")
+            self.values.append(self._code(value))
+        elif value is None:
+            self.values.append(0)
+        elif type(value) is int and self.kind == "int":
+            if not _INT64_RANGE[0] <= value <= _INT64_RANGE[1]:
+                raise OverflowError(f"Value {value} of {self.name!r} exceeds 64 bit")
+            self.values.append(value)
+        elif type(value) in (int, float):
+            if self.kind == "int":
+                self.kind = "float"
+                self.values = array("d", self.values)
+            self.values.append(value)
+        else:
+            raise TypeError(f"Value {value!r} of {self.name!r} is not a number")
+
+    def dictionary(self) -> list[Any]:
+        return [value for _, value in self.codes]
+
+    def description(self) -> dict[str, Any]:
+        description: dict[str, Any] = {
+            "name": self.name,
+            "kind": self.kind or "empty",
+            "missing": self.missing.count(1),
+        }
+        if self.kind == "set":
+            description["set_type"] = self.set_type
+        if self.kind == "int":
+            description["exact"] = not self.values or (
+                -_MAX_EXACT_INTEGER <= min(self.values) and max(self.values) <= _MAX_EXACT_INTEGER
+            )
+        return description
+
+    def sections(self, indexes: bool) -> dict[str, bytes]:
+        if self.kind is None:
+            return {"missing": bytes(self.missing)}
+        sections = {"values": _little_endian(self.values), "missing": bytes(self.missing)}
+        if self.kind == "set":
+            sections["offsets"] = _little_endian(self.offsets)
+        if self.kind in ("category", "set"):
+            sections.update(_encode_dictionary(self.dictionary()))
+        if indexes and self.kind != "set":
+            sections.update(self._index_sections())
+        return sections
+
+    def _index_sections(self) -> dict[str, bytes]:
+        sections = {}
+        if self.kind == "category":
+            codes, dictionary = self.values, self.dictionary()
+        else:
+            # numbers are encoded once all of them are known, because an int column may have become a float column
+            keys: dict[Any, int] = {}
+            dictionary = []
+            codes = array("i")
+            for value, missing in zip(self.values, self.missing):
+                value = None if missing else value
+                code = keys.get((type(value), value))
+                if code is None:
+                    code = keys[(type(value), value)] = len(dictionary)
+                    dictionary.append(value)
+                codes.append(code)
+            sections["codes"] = _little_endian(codes)
+            sections.update(_encode_dictionary(dictionary))
+            # like a NumericIndex without missing values and NaN, sorted by value and then by position
+            numbers = [
+                position for position, value in enumerate(self.values) if not self.missing[position] and value == value
+            ]
+            numbers.sort(key=self.values.__getitem__)
+            sections["sorted_positions"] = _little_endian(array("q", numbers))
+        # NaN can not be found, so it is left out of the sorted codes
+        order = [code for code, value in enumerate(dictionary) if value == value]
+        order.sort(key=lambda code: (_DICTIONARY_TYPES.index(type(dictionary[code])), dictionary[code]))
+        sections["dictionary_order"] = _little_endian(array("i", order))
+        offsets = array("q", itertools.accumulate(itertools.chain([0], _counts(codes, len(dictionary)))))
+        positions = array("q", bytes(8 * len(codes)))
+        ends = offsets[:-1]
+        for position, code in enumerate(codes):
+            positions[ends[code]] = position
+            ends[code] += 1
+        sections["index_offsets"] = _little_endian(offsets)
+        sections["index_positions"] = _little_endian(positions)
+        return sections
+
+
+def _counts(codes: Iterable[int], size: int) -> list[int]:
+    counts = [0] * size
+    for code in codes:
+        counts[code] += 1
+    return counts
+
+
+def _encode_dictionary(values: Iterable[Any]) -> dict[str, bytes]:
+    types = bytearray()
+    offsets = array("q", [0])
+    text = bytearray()
+    for value in values:
+        value_type = type(value)
+        types.append(_DICTIONARY_TYPES.index(value_type))
+        if value_type is str:
+            text.extend(value.encode("utf-8", "surrogatepass"))
+        else:
+            text.extend(repr(int(value) if value_type is bool else value).encode("ascii"))
+        offsets.append(len(text))
+    return {
+        "dictionary_types": bytes(types),
+        "dictionary_offsets": _little_endian(offsets),
+        "dictionary_text": bytes(text),
+    }
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "little":
+        return values.tobytes()
+    swapped = array(values.typecode, values)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _encode(
+    cases: Iterable[Any], properties: Iterable[str], getvalue: Callable[[Any, str], Any], indexes: bool = False
+) -> tuple[int, list[bytes]]:
+    builders = [_ColumnBuilder(property_name) for property_name in dict.fromkeys(properties)]
+    count = 0
+    for case in cases:
+        for builder in builders:
+            builder.add(getvalue(case, builder.name))
+        count += 1
+
+    columns = []
+    data = bytearray()
+    for builder in builders:
+        sections = {}
+        for section_name, section in builder.sections(indexes).items():
+            offset = _align(len(data))
+            data.extend(bytes(offset - len(data)))
+            data.extend(section)
+            sections[section_name] = [offset, len(section)]
+        columns.append({**builder.description(), "sections": sections})
+    header = json.dumps({"count": count, "columns": columns}).encode("utf-8")
+    header_end = len(MAGIC) + 8 + len(header)
+    return count, [MAGIC, len(header).to_bytes(8, "little"), header, bytes(_align(header_end) - header_end), data]
+
+
+def write(
+    path: str,
+    cases: Iterable[Any],
+    properties: Iterable[str],
+    *,
+    getvalue: Callable[[Any, str], Any] = getattr,
+    indexes: bool = False,
+) -> int:
+    """
+    Writes the given properties of the cases to a file and returns the number of cases written.
+
+    Properties of int, float, str or bool values and lists, tuples or sets of those are supported. ``None`` is
+    stored as missing value. With ``indexes`` the dictionaries and indexes of number and category columns are
+    written, too, so ``StoredCaseBase.to_casebase`` does not need to derive them.
+    """
+    count, parts = _encode(cases, properties, getvalue, indexes)
+    with open(path, "wb") as fd:
+        for part in parts:
+            fd.write(part)
+    return count
+
+
+def write_csv(
+    path: str,
+    csv_path: str,
+    *,
+    converters: Optional[Mapping[str, Callable[[str], Any]]] = None,
+    properties: Optional[Iterable[str]] = None,
+    **reader_options: Any,
+) -> int:
+    """
+    Writes the rows of a CSV file with a header line to a file. Values are converted with the ``converters`` of
+    their column (``str`` by default), empty values are stored as missing. ``reader_options`` are passed to
+    ``csv.DictReader``.
+    """
+    converters = converters or {}
+    with open(csv_path, "r", newline="") as fd:
+        reader = csv.DictReader(fd, **reader_options)
+        names = list(properties) if properties is not None else list(reader.fieldnames or ())
+
+        def rows() -> Iterator[dict[str, Any]]:
+            for row in reader:
+                yield {
+                    name: converters.get(name, str)(row[name]) if row.get(name) not in (None, "") else None
+                    for name in names
+                }
+
+        return write(path, rows(), names, getvalue=dict.get)
+
+
+def _view(buffer: memoryview, section: Sequence[int], typecode: str) -> Union[memoryview, array]:
+    data = buffer[section[0] : section[0] + section[1]]  # noqa: E203
+    if typecode == "B":
+        return data
+    if sys.byteorder == "little":
+        return data.cast(typecode)
+    values = array(typecode, data.tobytes())
+    values.byteswap()
+    return values
+
+
+def _optional_view(
+    buffer: memoryview, sections: dict[str, Sequence[int]], name: str, typecode: str
+) -> Union[memoryview, array, None]:
+    return _view(buffer, sections[name], typecode) if name in sections else None
+
+
+def _lookup_keys(value: Any) -> list[tuple[int, Any]]:
+    # the keys of the sorted dictionary which are equal to a value for a dict, e.g. True, 1 and 1.0 for 1
+    if value is None:
+        return [(_DICTIONARY_TYPES.index(type(None)), None)]
+    if isinstance(value, str):
+        return [(0, str(value))]
+    if not isinstance(value, (int, float)) or value != value:
+        return []
+    keys = []
+    if value == 0 or value == 1:
+        keys.append((1, bool(value)))
+    if isinstance(value, int) or value.is_integer():
+        keys.append((2, int(value)))
+    try:
+        if float(value) == value:
+            keys.append((3, float(value)))
+    except OverflowError:
+        pass
+    return keys
+
+
+class _StoredDictionary(Sequence[Any]):
+    # The distinct values of a column, which are decoded from the file on first access.
+    __slots__ = ("_types", "_offsets", "_text", "_order", "_decoded")
+
+    def __init__(self, buffer: memoryview, sections: dict[str, Sequence[int]]) -> None:
+        self._types = _view(buffer, sections["dictionary_types"], "B")
+        self._offsets = _view(buffer, sections["dictionary_offsets"], "q")
+        self._text = _view(buffer, sections["dictionary_text"], "B")
+        self._order = _optional_view(buffer, sections, "dictionary_order", "i")
+        self._decoded: dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def __getitem__(self, code: int) -> Any:
+        value = self._decoded.get(code, _UNDECODED)
+        if value is _UNDECODED:
+            value_type = _DICTIONARY_TYPES[self._types[code]]
+            start, end = self._offsets[code], self._offsets[code + 1]
+            text = str(self._text[start:end], "utf-8", "surrogatepass")
+            if value_type is bool:
+                value = text == "1"
+            elif value_type is type(None):
+                value = None
+            else:
+                value = value_type(text)
+            self._decoded[code] = value
+        return value
+
+    def __iter__(self) -> Iterator[Any]:
+        for code in range(len(self)):
+            yield self[code]
+
+    def _key(self, code: int) -> tuple[int, Any]:
+        return self._types[code], self[code]
+
+    def codes_of(self, value: Any) -> list[int]:
+        """Returns the codes of the values which are equal to a value for a dict, by bisecting the sorted codes."""
+        codes = []
+        order = self._order
+        for key in _lookup_keys(value):
+            index = bisect.bisect_left(order, key, key=self._key)
+            if index < len(order) and self._key(order[index]) == key:
+                codes.append(order[index])
+        return codes
+
+    def release(self) -> None:
+        for view in (self._types, self._offsets, self._text, self._order):
+            if isinstance(view, memoryview):
+                view.release()
+
+
+class _StoredValues(Sequence[Any]):
+    # The values of a stored column, read from the file on access.
+    __slots__ = ("_column", "_count")
+
+    def __init__(self, column: "_StoredColumn", count: int) -> None:
+        self._column = column
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._column.value(i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self._column.value(index)
+
+    def __iter__(self) -> Iterator[Any]:
+        column = self._column
+        if column.kind == "category":
+            dictionary = column.dictionary
+            return (dictionary[code] for code in column.values)
+        return (column.value(index) for index in range(self._count))
+
+
+class _StoredElementCodes(Sequence[tuple[int, ...]]):
+    # The element codes of every value of a set column, as ``Column.element_codes``.
+    __slots__ = ("_column",)
+
+    def __init__(self, column: "_StoredColumn") -> None:
+        self._column = column
+
+    def __len__(self) -> int:
+        return len(self._column.offsets) - 1
+
+    def __getitem__(self, index: int) -> tuple[int, ...]:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        offsets = self._column.offsets
+        return tuple(self._column.values[offsets[index] : offsets[index + 1]])  # noqa: E203
+
+
+class _SortedValues(Sequence[Any]):
+    # The values of a number column in the order of its sorted positions, which are bisected by a NumericIndex.
+    __slots__ = ("_values", "_positions")
+
+    def __init__(self, values: Sequence[Any], positions: Sequence[int]) -> None:
+        self._values = values
+        self._positions = positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __getitem__(self, index: int) -> Any:
+        return self._values[self._positions[index]]
+
+
+class _StoredPositions(Mapping[Any, Sequence[int]]):
+    # The positions of the cases per value of a stored column, which a ValueIndex looks up like a dict.
+    __slots__ = ("_column",)
+
+    def __init__(self, column: "_StoredColumn") -> None:
+        self._column = column
+
+    def __getitem__(self, value: Any) -> Sequence[int]:
+        column = self._column
+        offsets, positions = column.index_offsets, column.index_positions
+        parts = [positions[offsets[code] : offsets[code + 1]] for code in column.dictionary.codes_of(value)]  # noqa
+        if not parts:
+            raise KeyError(value)
+        return parts[0] if len(parts) == 1 else sorted(itertools.chain(*parts))
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._column.dictionary)
+
+    def __len__(self) -> int:
+        return len(self._column.dictionary)
+
+
+class _StoredColumn:
+    __slots__ = (
+        "name",
+        "kind",
+        "values",
+        "missing",
+        "missing_count",
+        "exact",
+        "offsets",
+        "dictionary",
+        "set_type",
+        "codes",
+        "index_offsets",
+        "index_positions",
+        "sorted_positions",
+    )
+
+    def __init__(self, buffer: memoryview, description: dict[str, Any]) -> None:
+        sections = description["sections"]
+        self.name: str = description["name"]
+        self.kind: str = description["kind"]
+        self.values = None
+        self.offsets = None
+        self.missing = _view(buffer, sections["missing"], "B")
+        self.missing_count: int = description["missing"]
+        self.exact: bool = description.get("exact", False)
+        self.dictionary: Sequence[Any] = _StoredDictionary(buffer, sections) if "dictionary_types" in sections else ()
+        self.set_type = _SET_TYPES[description["set_type"]] if self.kind == "set" else None
+        if self.kind == "int":
+            self.values = _view(buffer, sections["values"], "q")
+        elif self.kind == "float":
+            self.values = _view(buffer, sections["values"], "d")
+        elif self.kind in ("category", "set"):
+            self.values = _view(buffer, sections["values"], "i")
+        if self.kind == "set":
+            self.offsets = _view(buffer, sections["offsets"], "q")
+        self.codes = self.values if self.kind == "category" else _optional_view(buffer, sections, "codes", "i")
+        self.index_offsets = _optional_view(buffer, sections, "index_offsets", "q")
+        self.index_positions = _optional_view(buffer, sections, "index_positions", "q")
+        self.sorted_positions = _optional_view(buffer, sections, "sorted_positions", "q")
+
+    def value(self, index: int) -> Any:
+        kind = self.kind
+        if kind == "category":
+            return self.dictionary[self.values[index]]
+        if kind == "empty" or self.missing[index]:
+            return None
+        if kind == "set":
+            dictionary = self.dictionary
+            codes = self.values[self.offsets[index] : self.offsets[index + 1]]  # noqa: E203
+            return self.set_type(dictionary[code] for code in codes)
+        return self.values[index]
+
+    def to_list(self, count: int) -> list[Any]:
+        if self.kind == "empty":
+            return [None] * count
+        if self.kind == "category":
+            dictionary = list(self.dictionary)
+            return [dictionary[code] for code in self.values.tolist()]
+        if self.kind == "set":
+            return [self.value(index) for index in range(count)]
+        missing = bytes(self.missing)
+        values = self.values.tolist()
+        if any(missing):
+            return [None if m else value for value, m in zip(values, missing)]
+        return values
+
+    def to_column(self, count: int) -> Column:
+        """Returns a column which reads the values, dictionary and codes from the views of this column."""
+        kind = self.kind
+        numbers: Any = _UNSET
+        element_domain: Any = _UNSET
+        element_codes: Any = _UNSET
+        if kind in ("int", "float") and self.missing_count == 0:
+            values: Sequence[Any] = self.values
+            numbers = self.values if kind == "float" or self.exact else None
+        else:
+            values = _StoredValues(self, count)
+        if kind == "set" and self.missing_count == 0 and self.set_type in (list, tuple):
+            # sets are decoded in another iteration order than the one of their stored element codes
+            element_domain, element_codes = self.dictionary, _StoredElementCodes(self)
+        return Column.wrap(
+            self.name,
+            values,
+            self.missing,
+            dictionary=self.dictionary if self.codes is not None else None,
+            codes=self.codes,
+            numbers=numbers,
+            element_domain=element_domain,
+            element_codes=element_codes,
+        )
+
+    def value_index(self) -> Optional[indexing.ValueIndex]:
+        if self.index_offsets is None:
+            return None
+        return indexing.ValueIndex(_StoredPositions(self))
+
+    def numeric_index(self) -> Optional[indexing.NumericIndex]:
+        if self.sorted_positions is None:
+            return None
+        return indexing.NumericIndex(_SortedValues(self.values, self.sorted_positions), self.sorted_positions)
+
+    def release(self) -> None:
+        views = (self.values, self.missing, self.offsets, self.codes, self.index_offsets, self.index_positions)
+        for view in (*views, self.sorted_positions):
+            if isinstance(view, memoryview):
+                view.release()
+        if isinstance(self.dictionary, _StoredDictionary):
+            self.dictionary.release()
+
+
+class StoredCase:
+    """
+    A case of a ``StoredCaseBase`` which reads its values from the file on access, both as attributes (for
+    ``getattr``) and by item.
+    """
+
+    __slots__ = ("_casebase", "_index")
+
+    def __init__(self, casebase: "StoredCaseBase", index: int) -> None:
+        self._casebase = casebase
+        self._index = index
+
+    def __getattr__(self, name: str) -> Any:
+        # private names are never properties, e.g. the slots before they are set while a case is copied
+        if name.startswith("_"):
+            raise AttributeError(name)
+        column = self._casebase._columns.get(name)
+        if column is None:
+            raise AttributeError(name)
+        return column.value(self._index)
+
+    def __getitem__(self, name: str) -> Any:
+        column = self._casebase._columns.get(name)
+        if column is None:
+            raise KeyError(name)
+        return column.value(self._index)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        column = self._casebase._columns.get(name)
+        return column.value(self._index) if column is not None else default
+
+    def as_dict(self) -> dict[str, Any]:
+        return {name: column.value(self._index) for name, column in self._casebase._columns.items()}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, StoredCase):
+            return NotImplemented
+        return self._casebase is other._casebase and self._index == other._index
+
+    def __hash__(self) -> int:
+        return hash((id(self._casebase), self._index))
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={value!r}" for name, value in self.as_dict().items())
+        return f"StoredCase({values})"
+
+
+class StoredCaseBase(Sequence[StoredCase]):
+    """
+    A casebase written by ``write``, mapped into memory read only. ``from_buffer`` reads it from any other
+    buffer.
+
+    The casebase can be passed to ``casebase.infer`` as it is. ``to_casebase`` returns a ``CaseBase`` whose
+    columns and indexes read the file in place instead of case by case. A casebase opened from a path is pickled
+    as its path, so it and its cases can be sent to other processes, e.g. by ``ParallelCaseBase``, which map the
+    same file.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as fd:
+            mapped = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        self._path: Optional[str] = path
+        self._load(mapped, mapped.close, path)
+
+    @classmethod
+    def from_buffer(cls, buffer: Any, release: Optional[Callable[[], None]] = None) -> "StoredCaseBase":
+        """
+        Returns the casebase encoded in a buffer, e.g. a block of shared memory, with the layout of a file
+        written by ``write``. ``release`` is called on ``close``, after all views of the buffer are released.
+        """
+        casebase = cls.__new__(cls)
+        casebase._path = None
+        casebase._load(buffer, release, "buffer")
+        return casebase
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        if self._path is None:
+            raise TypeError("A casebase read from a buffer can not be pickled")
+        return StoredCaseBase, (self._path,)
+
+    def _load(self, source: Any, release: Optional[Callable[[], None]], name: str) -> None:
+        self._release = release
+        view = memoryview(source)
+        try:
+            if view[: len(MAGIC)] != MAGIC:
+                raise ValueError(f"{name} is not a cbrlib casebase")
+            header_length = int.from_bytes(view[len(MAGIC) : len(MAGIC) + 8], "little")  # noqa: E203
+            header_start = len(MAGIC) + 8
+            header = json.loads(bytes(view[header_start : header_start + header_length]))  # noqa: E203
+            self._buffer = view[_align(header_start + header_length) :]  # noqa: E203
+        except Exception:
+            view.release()
+            if release is not None:
+                release()
+            raise
+        view.release()
+        self._count: int = header["count"]
+        self._columns = {column["name"]: _StoredColumn(self._buffer, column) for column in header["columns"]}
+        self._wrapped: dict[str, Column] = {}
+
+    @property
+    def properties(self) -> list[str]:
+        return list(self._columns)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [StoredCase(self, i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return StoredCase(self, index)
+
+    def __iter__(self) -> Iterator[StoredCase]:
+        for index in range(self._count):
+            yield StoredCase(self, index)
+
+    def values(self, property_name: str) -> list[Any]:
+        """Returns the values of a property of all cases."""
+        return self._columns[property_name].to_list(self._count)
+
+    def to_casebase(
+        self,
+        mappings: Iterable[Union[PropertyEvaluatorMapping, WeightedPropertyEvaluatorMapping]] = (),
+        *,
+        properties: Iterable[str] = (),
+    ) -> CaseBase[StoredCase]:
+        """
+        Returns a ``CaseBase`` of the cases with the columns of the mapped properties.
+
+        The cases, the columns and their dictionaries are views of the file or buffer, and so are the indexes of
+        a file written with ``indexes``. Nothing is copied, so the pages are shared with every other process
+        which maps them. What the file does not contain, e.g. the indexes of set columns, is derived on first use
+        in the memory of this process. The columns are kept until ``close`` and reused by every call.
+        """
+        casebase: CaseBase[StoredCase] = CaseBase(())
+        # the cases are created on access like the values, they are not copied into a list
+        casebase._cases = self
+        for property_name in dict.fromkeys([*(m[0] for m in mappings), *properties]):
+            stored = self._columns[property_name]
+            column = self._wrapped.get(property_name)
+            if column is None:
+                column = self._wrapped[property_name] = stored.to_column(self._count)
+            casebase._columns[property_name] = column
+            if stored.index_offsets is not None:
+                casebase._value_indexes[property_name] = stored.value_index()
+                casebase._numeric_indexes[property_name] = stored.numeric_index()
+        return casebase
+
+    def close(self) -> None:
+        """Unmaps the file. Cases, columns and indexes of the casebase must not be used anymore."""
+        self._wrapped.clear()
+        for column in self._columns.values():
+            column.release()
+        self._buffer.release()
+        if self._release is not None:
+            self._release()
+
+    def __enter__(self) -> "StoredCaseBase":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+def open_casebase(path: str) -> StoredCaseBase:
+    return StoredCaseBase(path)
@@ -69,11 +69,64 @@ class FacetValueOrderCriteria:
         return FacetValueOrderCriteria(FacetValueProperty.COUNT, FacetValueOrder.DESCENDING)
 
 
+@dataclass(slots=True, frozen=True, order=True)
+class FacetBin:
+    low: float
+    high: float
+
+
+@dataclass(slots=True, frozen=True)
+class FacetBinning:
+    """
+    Groups the numeric values of a facet into bins. The bins are either given by their ascending ``edges``,
+    where values outside of the edges belong to the first or last bin, or have a fixed ``width`` starting at
+    ``origin``.
+    """
+
+    edges: Optional[tuple[float, ...]] = None
+    width: Optional[float] = None
+    origin: float = dataclasses.field(default=0)
+
+    def __post_init__(self) -> None:
+        if self.edges is not None:
+            edges = tuple(self.edges)
+            if len(edges) < 2 or any(low >= high for low, high in zip(edges, edges[1:])):
+                raise ValueError("The edges of a facet binning must be at least two ascending values")
+            object.__setattr__(self, "edges", edges)
+        elif self.width is None or self.width <= 0:
+            raise ValueError("A facet binning needs edges or a width above 0")
+
+    @staticmethod
+    def from_options(options: NumericEvaluationOptions, count: int) -> FacetBinning:
+        """
+        Returns ``count`` bins of equal width between the ``min_`` and ``max_`` of the options or a single bin
+        of width 1, if both are the same.
+        """
+        if options.max_ == options.min_:
+            return FacetBinning(edges=(options.min_, options.min_ + 1))
+        width = (options.max_ - options.min_) / count
+        return FacetBinning(edges=(*(options.min_ + i * width for i in range(count)), options.max_))
+
+    @staticmethod
+    def from_quantiles(values: Iterable[float], count: int) -> FacetBinning:
+        """Returns up to ``count`` bins which hold about the same number of the given values each."""
+        ordered = sorted(v for v in values if v is not None and v == v)
+        if not ordered:
+            raise ValueError("Quantiles need at least one value")
+        edges = [ordered[(len(ordered) - 1) * i // count] for i in range(count)]
+        edges.append(ordered[-1])
+        edges = sorted(set(edges))
+        if len(edges) < 2:
+            edges.append(edges[0] + 1)
+        return FacetBinning(edges=tuple(edges))
+
+
 @dataclass(slots=True, frozen=True)
 class FacetConfig:
     name: str
     max_count: Optional[int] = dataclasses.field(default=5)
     order_by: Optional[FacetValueOrderCriteria] = dataclasses.field(default_factory=FacetValueOrderCriteria.importance)
+    binning: Optional[FacetBinning] = None
 
 
 @dataclass(slots=True, frozen=True)
@@ -94,11 +147,29 @@ class ReasoningRequest(Generic[C]):
     facets: Optional[Iterable[FacetConfig]] = None
 
 
+@dataclass(slots=True)
+class ReasoningStats:
+    cases_scored: int = 0
+    cases_above_threshold: int = 0
+    evaluator_calls: dict[str, int] = dataclasses.field(default_factory=dict)
+    evaluator_cache_hits: dict[str, int] = dataclasses.field(default_factory=dict)
+    evaluator_time: dict[str, float] = dataclasses.field(default_factory=dict)
+    phase_time: dict[str, float] = dataclasses.field(default_factory=dict)
+
+
 @dataclass(slots=True, frozen=True)
 class ReasoningResponse(Generic[C]):
     total_number_of_hits: int
     hits: Iterable[Result]
     facets: Optional[Iterable[Facet]]
+    stats: Optional[ReasoningStats] = None
+
+
+@dataclass(slots=True, frozen=True)
+class ReasoningProgress(Generic[C]):
+    number_of_cases: int
+    response: ReasoningResponse[C]
+    complete: bool = False
 
 
 Evaluator = Callable[[Any, Any], float]
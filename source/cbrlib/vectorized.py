@@ -0,0 +1,153 @@
+"""
+Optional NumPy backend which evaluates one query value against a whole column of case values at once.
+
+All functions return exactly the same similarities as their scalar counterparts in ``cbrlib.evaluate``. The
+backend is only used if NumPy is installed, see ``is_available``.
+"""
+
+from typing import Any, Sequence
+
+from cbrlib.types import FunctionCalculationParameter, NumericEvaluationOptions, NumericInterpolation
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def is_available() -> bool:
+    return np is not None
+
+
+def _pow(base: Any, exponent: float) -> Any:
+    # NumPy's SIMD power may differ from the C library in the last bit, therefore the remaining elements are
+    # raised one by one exactly like the scalar interpolation functions do.
+    return np.fromiter((pow(b, exponent) for b in base.tolist()), dtype=np.float64, count=len(base))
+
+
+def _interpolate_polynom(stretched_distance: Any, linearity: float) -> Any:
+    if linearity == 0:
+        return np.zeros_like(stretched_distance)
+    elif linearity == 1:
+        return 1 - stretched_distance
+    return _pow(1 - stretched_distance, 1 / linearity)
+
+
+def _interpolate_root(stretched_distance: Any, linearity: float) -> Any:
+    if linearity == 0:
+        return np.ones_like(stretched_distance)
+    elif linearity == 1:
+        return 1 - stretched_distance
+    return _pow(1 - stretched_distance, linearity)
+
+
+def _interpolate_sigmoid(stretched_distance: Any, linearity: float) -> Any:
+    if linearity == 1:
+        return 1 - stretched_distance
+    result = np.empty_like(stretched_distance)
+    lower = stretched_distance < 0.5
+    upper = ~lower
+    if linearity == 0:
+        result[lower] = 1.0
+        result[upper] = 0.0
+        return result
+    result[lower] = 1 - _pow(2 * stretched_distance[lower], 1 / linearity) / 2
+    result[upper] = _pow(2 - 2 * stretched_distance[upper], 1 / linearity) / 2
+    return result
+
+
+_interpolations = {
+    NumericInterpolation.POLYNOM: _interpolate_polynom,
+    NumericInterpolation.ROOT: _interpolate_root,
+    NumericInterpolation.SIGMOID: _interpolate_sigmoid,
+}
+
+
+def _calculate_distance(query: float, cases: Any, max_distance: float, cyclic: bool) -> Any:
+    result = np.abs(query - cases)
+    if cyclic:
+        result = np.where(result > max_distance, 2 * max_distance - result, result)
+    return result
+
+
+def _is_less(cases: Any, query: float, max_distance: float, cyclic: bool) -> Any:
+    if not cyclic:
+        return cases < query
+    left_distance = np.where(cases < query, query - cases, 2 * max_distance - cases + query)
+    right_distance = 2 * max_distance - left_distance
+    return left_distance < right_distance
+
+
+def _apply_parameters(
+    result: Any,
+    relative_distance: Any,
+    selection: Any,
+    parameters: FunctionCalculationParameter,
+) -> None:
+    relative_distance = relative_distance[selection]
+    similarities = np.zeros_like(relative_distance)
+    similarities[relative_distance <= parameters.equal] = 1.0
+    interpolate = (relative_distance > parameters.equal) & (relative_distance < parameters.tolerance)
+    if interpolate.any():
+        stretched_distance = (relative_distance[interpolate] - parameters.equal) / (
+            parameters.tolerance - parameters.equal
+        )
+        interpolation = _interpolations[parameters.interpolation]
+        similarities[interpolate] = interpolation(stretched_distance, parameters.linearity)
+    result[selection] = similarities
+
+
+def is_finite(values: Sequence[float]) -> bool:
+    """Whether all values are neither NaN nor infinite."""
+    return bool(np.isfinite(np.asarray(values, dtype=np.float64)).all())
+
+
+def numeric(options: NumericEvaluationOptions, query: float, cases: Sequence[float]) -> Any:
+    """
+    Vectorized ``cbrlib.evaluate.numeric`` which returns the similarities of all ``cases`` as NumPy array.
+
+    The query and ``cases`` must be finite, see ``is_finite``. NumPy compares NaN and infinite values unlike
+    the scalar function, which e.g. returns NaN for a NaN case value.
+    """
+    cases = np.asarray(cases, dtype=np.float64)
+    max_distance = abs(query - options.origin) if options.use_origin else options.max_distance
+    if max_distance == 0:
+        return np.ones_like(cases)
+
+    distance = _calculate_distance(query, cases, options.max_distance, options.cyclic)
+    relative_distance = distance / max_distance
+    result = np.zeros_like(cases)
+    in_range = relative_distance < 1
+    less = _is_less(cases, query, options.max_distance, options.cyclic)
+    _apply_parameters(result, relative_distance, in_range & less, options.if_less)
+    _apply_parameters(result, relative_distance, in_range & ~less, options.if_more)
+    return result
+
+
+def group(
+    codes: Sequence[int], positions: Sequence[int], weights: Sequence[float], numbers: Sequence[int]
+) -> list[tuple[int, int, float, tuple[float, int]]]:
+    """
+    Returns every code at the given positions together with the number of its positions, the sum of their
+    weights and the pair ``(weight, -number)`` of its greatest weight with the lowest number. ``bincount`` adds
+    the weights in the order of the positions, so the sums are the same as from a loop.
+    """
+    hit_codes = np.asarray(codes)[np.asarray(positions, dtype=np.intp)]
+    hit_weights = np.asarray(weights, dtype=np.float64)
+    hit_numbers = np.asarray(numbers, dtype=np.int64)
+    counts = np.bincount(hit_codes)
+    sums = np.bincount(hit_codes, weights=hit_weights)
+    # sorted by code, the greatest weight and the lowest number first, so the first entry of a code is its best
+    order = np.lexsort((hit_numbers, -hit_weights, hit_codes))
+    distinct, firsts = np.unique(hit_codes[order], return_index=True)
+    best = order[firsts]
+    return [
+        (code, count, importance, (weight, -number))
+        for code, count, importance, weight, number in zip(
+            distinct.tolist(),
+            counts[distinct].tolist(),
+            sums[distinct].tolist(),
+            hit_weights[best].tolist(),
+            hit_numbers[best].tolist(),
+        )
+    ]
@@ -0,0 +1,75 @@
+import functools
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+from cbrlib import casebase, evaluate
+from cbrlib.caching import ResultCache, query_key
+from cbrlib.types import FacetConfig, ReasoningRequest, WeightedPropertyEvaluatorMapping
+
+
+@dataclass
+class DataObject:
+    color: Optional[str] = None
+    shape: Optional[str] = None
+
+
+mappings = (
+    WeightedPropertyEvaluatorMapping("color", evaluate.equality, 1),
+    WeightedPropertyEvaluatorMapping("shape", evaluate.equality, 1),
+)
+evaluator = functools.partial(evaluate.case_average, mappings)
+
+
+def _cases(count: int) -> list[DataObject]:
+    generator = random.Random(3)
+    return [
+        DataObject(generator.choice(["red", "green", "blue"]), generator.choice(["round", "square"]))
+        for _ in range(count)
+    ]
+
+
+def test_result_cache_pages() -> None:
+    cases = _cases(200)
+    cache = ResultCache(depth=20)
+    facets = [FacetConfig("color"), FacetConfig("shape")]
+    for offset in (0, 10, 20, 10, 50, 0):
+        request = ReasoningRequest(DataObject(color="red", shape="round"), offset=offset, limit=10, facets=facets)
+        assert cache.infer(cases, request, evaluator) == casebase.infer(cases, request, evaluator)
+    assert cache.misses == 2
+    assert cache.hits == 4
+    assert len(cache) == 1
+
+
+def test_result_cache_keys() -> None:
+    cases = _cases(50)
+    cache = ResultCache()
+    cache.infer(cases, ReasoningRequest(DataObject(color="red")), evaluator)
+    cache.infer(cases, ReasoningRequest(DataObject(color="red")), evaluator)
+    cache.infer(cases, ReasoningRequest(DataObject(color="red"), threshold=0.6), evaluator)
+    cache.infer(cases, ReasoningRequest(DataObject(color="blue")), evaluator)
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert query_key(DataObject(color="red")) == query_key(DataObject(color="red"))
+    assert query_key(DataObject(color="red")) != query_key(DataObject(shape="red"))
+
+
+def test_result_cache_eviction_and_invalidation() -> None:
+    cases = _cases(50)
+    cache = ResultCache(maxsize=2)
+    for color in ("red", "green", "blue"):
+        cache.infer(cases, ReasoningRequest(DataObject(color=color)), evaluator)
+    assert len(cache) == 2
+    cache.infer(cases, ReasoningRequest(DataObject(color="red")), evaluator)
+    assert cache.misses == 4
+    cache.invalidate(cases)
+    assert len(cache) == 0
+
+
+def test_result_cache_casebase_version() -> None:
+    cb = casebase.CaseBase(_cases(50), mappings)
+    cache = ResultCache()
+    request = ReasoningRequest(DataObject(color="red"))
+    assert cache.infer(cb, request, evaluator) == casebase.infer(cb, request, evaluator)
+    cb._version += 1
+    cache.infer(cb, request, evaluator)
+    assert (cache.hits, cache.misses) == (0, 2)
@@ -0,0 +1,221 @@
+import functools
+import random
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import pytest
+
+from cbrlib import casebase, evaluate
+from cbrlib.casebase import CaseBase
+from cbrlib.columns import Column
+from cbrlib.types import (
+    Facet,
+    FacetConfig,
+    FacetValue,
+    NumericEvaluationOptions,
+    ReasoningRequest,
+    ReasoningResponse,
+)
+
+
+@dataclass
+class DataObject:
+    color: Optional[str] = None
+    shape: Optional[str] = None
+    size: Optional[int] = None
+
+
+lookup = {
+    "red": {"red": 1, "orange": 0.8, "yellow": 0.4},
+    "orange": {"orange": 1, "red": 0.8, "yellow": 0.8},
+}
+
+mappings = (
+    evaluate.WeightedPropertyEvaluatorMapping("color", functools.partial(evaluate.table_lookup, lookup), 2),
+    evaluate.WeightedPropertyEvaluatorMapping("shape", evaluate.equality, 1),
+    evaluate.WeightedPropertyEvaluatorMapping(
+        "size", functools.partial(evaluate.numeric, NumericEvaluationOptions(0, 100)), 1
+    ),
+)
+
+cases = [
+    DataObject("red", "triangle", 20),
+    DataObject("orange", "circle", 70),
+    DataObject("yellow", "square", 50),
+    DataObject("red", "circle", 40),
+    DataObject(None, "triangle", 10),
+    DataObject("orange", None, 90),
+]
+
+
+def test_casebase_columns() -> None:
+    cb = CaseBase(cases, mappings)
+    assert len(cb) == len(cases)
+    assert list(cb) == cases
+    assert cb[1] is cases[1]
+    assert set(cb.columns) == {"color", "shape", "size"}
+    assert list(cb.columns["color"]) == ["red", "orange", "yellow", "red", None, "orange"]
+    assert cb.columns["shape"].missing == bytearray([0, 0, 0, 0, 0, 1])
+
+
+def test_casebase_column_on_demand() -> None:
+    cb = CaseBase(cases)
+    assert len(cb.columns) == 0
+    assert list(cb.column("size")) == [20, 70, 50, 40, 10, 90]
+    assert "size" in cb.columns
+
+
+@pytest.mark.parametrize(
+    "aggregation",
+    [
+        evaluate.case_average,
+        evaluate.case_median,
+        evaluate.case_min,
+        evaluate.case_max,
+        evaluate.case_euclidean,
+    ],
+)
+def test_column_evaluator_matches_case_evaluator(aggregation) -> None:
+    evaluator = functools.partial(aggregation, mappings)
+    column_evaluator = evaluate.as_column_evaluator(evaluator)
+    cb = CaseBase(cases, mappings)
+    for query in [DataObject("red", "circle", 30), DataObject(size=60), DataObject()]:
+        expected = [evaluator(query, case) for case in cases]
+        assert column_evaluator(query, cb.columns, len(cb)) == expected
+
+
+def test_as_column_evaluator_unknown_evaluator() -> None:
+    assert evaluate.as_column_evaluator(evaluate.equality) is None
+    assert evaluate.as_column_evaluator(functools.partial(evaluate.case_average, mappings, DataObject())) is None
+
+
+def test_infer_columnar_casebase() -> None:
+    evaluator = functools.partial(evaluate.case_average, mappings)
+    request = ReasoningRequest(
+        query=DataObject("red", "circle", 30),
+        threshold=0.2,
+        limit=3,
+        facets=(FacetConfig("shape"),),
+    )
+    expected = casebase.infer(cases, request, evaluator)
+    response = casebase.infer(CaseBase(cases, mappings), request, evaluator)
+    assert response == expected
+
+
+def test_infer_many_matches_infer() -> None:
+    requests = [
+        ReasoningRequest(query=DataObject("red", "circle", 30), threshold=0.2, limit=3),
+        ReasoningRequest(query=DataObject(size=60), offset=1, facets=(FacetConfig("color"),)),
+        ReasoningRequest(query=DataObject()),
+    ]
+    for aggregation in (evaluate.case_average, evaluate.case_max):
+        evaluator = functools.partial(aggregation, mappings)
+        expected = [casebase.infer(cases, request, evaluator) for request in requests]
+        assert casebase.infer_many(cases, requests, evaluator, chunk_size=4) == expected
+        assert casebase.infer_many(iter(cases), requests, evaluator) == expected
+        assert casebase.infer_many(CaseBase(cases, mappings), requests, evaluator) == expected
+        assert casebase.infer_many(cases, requests, lambda q, c: evaluator(q, c)) == expected
+
+
+def test_column_dictionary_encoding() -> None:
+    column = Column("tags", [["a", "b"], "red", ["a", "b"], None, "red", ("a", "b"), 1, 1.0, {"x"}, {"x"}])
+    assert column.dictionary == [["a", "b"], "red", None, ("a", "b"), 1, 1.0, {"x"}]
+    assert list(column.codes) == [0, 1, 0, 2, 1, 3, 4, 5, 6, 6]
+    assert column.cardinality == 7
+    part = column.take([4, 0])
+    assert list(part) == ["red", ["a", "b"]]
+    assert part.dictionary is column.dictionary
+    assert list(part.codes) == [1, 0]
+
+
+def test_column_take_shares_dictionary() -> None:
+    column = Column("color", ["red", "green", "red", "blue"])
+    first, second = column.take([0, 2]), column.take([1, 3])
+    assert first.dictionary is second.dictionary is column.dictionary
+    assert first.distinct() is second.distinct() is column.distinct()
+    assert list(second.codes) == [1, 2]
+
+
+def test_column_has_distinct_values() -> None:
+    column = Column("color", ["red", None, "blue", "red"])
+    assert column.has_distinct_values
+    assert column.take([0, 2]).has_distinct_values
+    assert not Column("size", [1, 1.0, True, 2]).has_distinct_values
+    assert not Column("tags", [["a"], ["b"]]).has_distinct_values
+
+
+def test_evaluate_column_distinct_values() -> None:
+    calls = []
+
+    def evaluator(query, case):
+        calls.append(case)
+        return evaluate.set_intermediate(evaluate.equality, query, case)
+
+    values = [["a", "b"], ["b"], ["a", "b"], ["b"], ["c"], ["a", "b"]]
+    similarities = evaluate.evaluate_column(evaluator, ["a"], Column("tags", values))
+    assert similarities == [evaluate.set_intermediate(evaluate.equality, ["a"], value) for value in values]
+    assert calls == [["a", "b"], ["b"], ["c"]]
+
+
+def test_memoized_evaluator() -> None:
+    evaluator = evaluate.memoize(functools.partial(evaluate.set_intermediate, evaluate.equality))
+    values = [["a", "b"], ["b"], ["a", "b"], ["b"]]
+    assert [evaluator(["a"], value) for value in values] == [
+        evaluate.set_intermediate(evaluate.equality, ["a"], value) for value in values
+    ]
+    assert (evaluator.hits, evaluator.misses) == (2, 2)
+    assert evaluator.hit_rate == 0.5
+    assert evaluator(["b"], ["b"]) == 1
+    assert (evaluator.hits, evaluator.misses) == (2, 3)
+    evaluator.reset_statistics()
+    assert evaluator.hit_rate == 0
+
+
+def _approximately(response: ReasoningResponse) -> ReasoningResponse:
+    # importance is summed up in the order the hits are collected, which may differ in the last bits between paths
+    if response.facets is None:
+        return response
+    facets = [
+        Facet(f.name, [FacetValue(v.value, v.count, pytest.approx(v.importance)) for v in f.values], f.entropy)
+        for f in response.facets
+    ]
+    return replace(response, facets=facets)
+
+
+@pytest.mark.parametrize("count", [10, 500])
+def test_infer_columnar_facets(count) -> None:
+    generator = random.Random(count)
+    sizes = [1, 1.0, True, 2, 3.5, 7]
+    many_cases = [
+        DataObject(generator.choice([*lookup, "yellow", None]), generator.choice(["circle", "square"]), size)
+        for size in (generator.choice(sizes) for _ in range(count))
+    ]
+    evaluator = functools.partial(evaluate.case_average, mappings)
+    request = ReasoningRequest(
+        query=DataObject("red", "circle", 3),
+        threshold=0.05,
+        facets=(FacetConfig("color"), FacetConfig("shape"), FacetConfig("size")),
+    )
+    expected = casebase.infer(many_cases, request, evaluator)
+    assert casebase.infer(CaseBase(many_cases, mappings), request, evaluator) == _approximately(expected)
+    assert casebase.infer_many(many_cases, [request], evaluator, chunk_size=64)[0] == _approximately(expected)
+
+
+def _upper(case: dict, name: str, default=None):
+    return case.get(name.upper(), default)
+
+
+def test_infer_reads_cases_with_getvalue_of_evaluator() -> None:
+    records = [
+        {"color": case.color, "shape": case.shape, "size": case.size, "COLOR": other.color, "SIZE": other.size}
+        for case, other in zip(cases, reversed(cases))
+    ]
+    evaluator = functools.partial(evaluate.case_average, mappings, getvalue=_upper)
+    requests = [
+        ReasoningRequest(query={"COLOR": "red", "SIZE": 30}, threshold=0.2, limit=3),
+        ReasoningRequest(query={"COLOR": "orange"}, threshold=0.5),
+    ]
+    expected = [casebase.infer(records, request, evaluator) for request in requests]
+    cb = CaseBase(records, mappings, getvalue=dict.get)
+    assert [casebase.infer(cb, request, evaluator) for request in requests] == expected
+    assert casebase.infer_many(cb, requests, evaluator) == expected
@@ -0,0 +1,89 @@
+import functools
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+import pytest
+
+from cbrlib import casebase, compiling, evaluate
+from cbrlib.casebase import CaseBase
+from cbrlib.types import FacetConfig, NumericEvaluationOptions, ReasoningRequest, WeightedPropertyEvaluatorMapping
+
+
+@dataclass
+class DataObject:
+    id: int
+    color: Optional[str] = None
+    size: Optional[int] = None
+    tags: tuple[str, ...] = ()
+
+
+mappings = (
+    WeightedPropertyEvaluatorMapping("color", evaluate.equality, 2),
+    WeightedPropertyEvaluatorMapping("size", functools.partial(evaluate.numeric, NumericEvaluationOptions(0, 5)), 1),
+    WeightedPropertyEvaluatorMapping("tags", functools.partial(evaluate.set_intermediate, evaluate.equality), 1),
+)
+
+
+def _cases(count: int) -> list[DataObject]:
+    generator = random.Random(11)
+    return [
+        DataObject(
+            id=index,
+            color=generator.choice([None, "red", "green"]),
+            size=generator.randint(0, 5),
+            tags=generator.choice([(), ("a",), ("a", "b"), ("b", "a")]),
+        )
+        for index in range(count)
+    ]
+
+
+evaluators = [
+    functools.partial(evaluate.case_average, mappings),
+    functools.partial(evaluate.case_max, mappings),
+    compiling.compile_evaluator(mappings),
+]
+
+
+@pytest.mark.parametrize("evaluator", evaluators)
+@pytest.mark.parametrize("threshold, offset", [(0, 0), (0.5, 0), (0.7, 15)])
+def test_infer_deduplicated(evaluator, threshold, offset) -> None:
+    cases = _cases(400)
+    deduplicated = CaseBase(cases, mappings, deduplicate=True)
+    assert len(deduplicated.groups()) < 100
+    request = ReasoningRequest(
+        DataObject(id=-1, color="red", size=3, tags=("a",)),
+        offset=offset,
+        limit=25,
+        threshold=threshold,
+        facets=[FacetConfig("color"), FacetConfig("id")],
+    )
+    expected = casebase.infer(cases, request, evaluator)
+    response = casebase.infer(deduplicated, request, evaluator, stats=True)
+    assert response.stats.cases_scored <= len(deduplicated.groups())
+    assert response.total_number_of_hits == expected.total_number_of_hits
+    assert response.hits == expected.hits
+    assert response.facets == expected.facets
+
+
+def test_groups_by_projection() -> None:
+    cases = [
+        DataObject(0, "red", 1, ("a", "b")),
+        DataObject(1, "red", 1, ("a", "b")),
+        DataObject(2, "red", 1, ("b", "a")),
+        DataObject(3, "red", 2, ("a", "b")),
+        DataObject(4, "red", 1, ("a", "b")),
+    ]
+    groups = CaseBase(cases, mappings, deduplicate=True).groups()
+    assert [list(members) for members in groups.members] == [[0, 1, 4], [2], [3]]
+    assert CaseBase(cases, mappings).groups() is None
+
+
+def test_deduplicate_needs_projected_properties() -> None:
+    cases = _cases(50)
+    deduplicated = CaseBase(cases, mappings[:2], deduplicate=True)
+    evaluator = functools.partial(evaluate.case_average, mappings)
+    request = ReasoningRequest(DataObject(id=-1, color="red", size=3, tags=("a",)), limit=10)
+    response = casebase.infer(deduplicated, request, evaluator, stats=True)
+    assert response.stats.cases_scored == len(cases)
+    assert response.hits == casebase.infer(cases, request, evaluator).hits
@@ -0,0 +1,150 @@
+import functools
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+from cbrlib import casebase, evaluate, indexing
+from cbrlib.casebase import CaseBase
+from cbrlib.columns import Column
+from cbrlib.types import FacetConfig, FunctionCalculationParameter, NumericEvaluationOptions, ReasoningRequest
+
+
+@dataclass(frozen=True)
+class DataObject:
+    color: Optional[str] = None
+    shape: Optional[str] = None
+    size: Optional[int] = None
+
+
+lookup = {
+    "red": {"red": 1, "orange": 0.8, "yellow": 0.4, "green": 0},
+    "orange": {"orange": 1, "red": 0.8, "yellow": 0.8},
+}
+lookup_evaluator = functools.partial(evaluate.table_lookup, lookup)
+
+calls = []
+
+
+def counting_size_evaluator(query, case):
+    calls.append(case)
+    return evaluate.numeric(NumericEvaluationOptions(0, 100), query, case)
+
+
+mappings = (
+    evaluate.WeightedPropertyEvaluatorMapping("color", lookup_evaluator, 4),
+    evaluate.WeightedPropertyEvaluatorMapping("shape", evaluate.equality, 3),
+    evaluate.WeightedPropertyEvaluatorMapping("size", counting_size_evaluator, 1),
+)
+evaluator = functools.partial(evaluate.case_average, mappings)
+
+colors = ("red", "orange", "yellow", "green", "blue", None)
+shapes = ("circle", "square", "triangle")
+cases = [DataObject(colors[i % 6], shapes[i % 7 % 3], (i * 13) % 100) for i in range(300)]
+
+
+def test_value_index() -> None:
+    index = indexing.ValueIndex.build(Column("color", ["red", "green", "red", None]))
+    assert list(index.positions("red")) == [0, 2]
+    assert list(index.positions(None)) == [3]
+    assert list(index.positions("blue")) == []
+    assert list(index.positions(["unhashable"])) == []
+    assert indexing.ValueIndex.build(Column("tags", [["a"], ["b"]])) is None
+
+
+def test_candidate_similarities() -> None:
+    cb = CaseBase(cases[:12], mappings)
+    assert indexing.candidate_similarities(cb, "shape", evaluate.equality, "circle") == {
+        i: 1.0 for i in range(12) if shapes[i % 7 % 3] == "circle"
+    }
+    assert indexing.candidate_similarities(cb, "color", lookup_evaluator, "red") == {
+        0: 1.0,
+        1: 0.8,
+        2: 0.4,
+        6: 1.0,
+        7: 0.8,
+        8: 0.4,
+    }
+    assert indexing.candidate_similarities(cb, "size", counting_size_evaluator, 10) is None
+
+
+def test_candidates() -> None:
+    cb = CaseBase(cases, mappings)
+    query = DataObject("red", "circle", 50)
+    positions = indexing.candidates(cb, evaluator, query, 0.5)
+    assert positions == sorted(positions)
+    expected = [i for i, case in enumerate(cases) if evaluator(query, case) >= 0.5]
+    assert set(expected) <= set(positions)
+    assert len(positions) < len(cases)
+    assert indexing.candidates(cb, evaluator, query, 0) is None
+    assert indexing.candidates(cb, evaluator, DataObject(size=50), 0.5) is None
+    assert indexing.candidates(cb, functools.partial(evaluate.case_max, mappings), query, 0.5) is None
+
+
+def test_infer_indexed_matches_infer() -> None:
+    cb = CaseBase(cases, mappings)
+    for query in (DataObject("red", "circle", 50), DataObject("orange", size=20), DataObject(shape="square")):
+        for threshold in (0.1, 0.5, 0.7, 0.95):
+            request = ReasoningRequest(query, threshold=threshold, limit=20, facets=(FacetConfig("size"),))
+            expected = casebase.infer(cases, request, evaluator)
+            calls.clear()
+            assert casebase.infer(cb, request, evaluator) == expected
+            if threshold >= 0.5:
+                assert len(calls) < len(cases)
+
+
+def test_numeric_index_range() -> None:
+    index = indexing.NumericIndex.build(Column("size", [5, None, 1.5, float("nan"), 3, 5]))
+    assert len(index) == 4
+    assert list(index.range(2, 5)) == [4, 0, 5]
+    assert list(index.range(6, 7)) == []
+    assert indexing.NumericIndex.build(Column("color", ["red"])) is None
+
+
+def test_numeric_candidates_cover_similar_cases() -> None:
+    rnd = random.Random(7)
+    values = [rnd.choice([rnd.randint(-30, 130), rnd.uniform(-30, 130)]) for _ in range(400)]
+    cb = CaseBase([DataObject(size=value) for value in values], properties=("size",))
+    for _ in range(200):
+        options = NumericEvaluationOptions(
+            min_=0,
+            max_=rnd.choice([10, 50, 100]),
+            origin=rnd.choice([0, 20]),
+            use_origin=rnd.random() < 0.3,
+            cyclic=rnd.random() < 0.4,
+            if_less=FunctionCalculationParameter(equal=rnd.choice([0, 0.1]), tolerance=rnd.choice([0.05, 0.3, 1])),
+            if_more=FunctionCalculationParameter(equal=rnd.choice([0, 0.2]), tolerance=rnd.choice([0.1, 0.5, 2])),
+        )
+        evaluator = functools.partial(evaluate.numeric, options)
+        query = rnd.choice([rnd.randint(0, 100), rnd.uniform(0, 100), values[0]])
+        candidates = indexing.candidate_similarities(cb, "size", evaluator, query)
+        similar = {i for i, value in enumerate(values) if evaluator(query, value) > 0}
+        if candidates is None:
+            assert options.use_origin and query == options.origin
+        else:
+            assert similar <= set(candidates)
+
+
+def test_infer_numeric_indexed_matches_infer() -> None:
+    numeric_mappings = (
+        evaluate.WeightedPropertyEvaluatorMapping("color", evaluate.equality, 1),
+        evaluate.WeightedPropertyEvaluatorMapping(
+            "size",
+            functools.partial(
+                evaluate.numeric,
+                NumericEvaluationOptions(
+                    0,
+                    100,
+                    cyclic=True,
+                    if_less=FunctionCalculationParameter(tolerance=0.1),
+                    if_more=FunctionCalculationParameter(tolerance=0.3),
+                ),
+            ),
+            4,
+        ),
+    )
+    numeric_evaluator = functools.partial(evaluate.case_average, numeric_mappings)
+    cb = CaseBase(cases, numeric_mappings)
+    for query in (DataObject("red", size=50), DataObject(size=95), DataObject(size=3)):
+        request = ReasoningRequest(query, threshold=0.5, limit=50, facets=(FacetConfig("color"),))
+        assert indexing.candidates(cb, numeric_evaluator, query, 0.5) is not None
+        assert casebase.infer(cb, request, numeric_evaluator) == casebase.infer(cases, request, numeric_evaluator)
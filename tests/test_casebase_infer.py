@@ -1,10 +1,25 @@
+import asyncio
 import functools
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Optional
 
+import pytest
+
 from cbrlib import casebase, evaluate
-from cbrlib.casebase import ReasoningRequest, ReasoningResponse
-from cbrlib.types import FacetConfig, FacetValueProperty, FacetValueOrderCriteria, FacetValueOrder, FacetValue
+from cbrlib.casebase import CaseBase, ReasoningRequest, ReasoningResponse
+from cbrlib.facetting import FacetCollectingIterator
+from cbrlib.types import (
+    Facet,
+    FacetConfig,
+    FacetValueProperty,
+    FacetValueOrderCriteria,
+    FacetValueOrder,
+    FacetValue,
+    Result,
+)
 
 
 @dataclass
@@ -128,3 +143,162 @@ def test_casebase_facetvalue_order_criteria_as_key() -> None:
     key_func = order_criteria.as_key_function()
     assert key_func(FacetValue(value="red", count=5, importance=0.8)) == "red"
     assert not order_criteria.is_reverse()
+
+
+def test_evaluate_casebase_paging() -> None:
+    cases = [DataObject(another_color=c) for c in ("yellow", "red", "green", "orange", "red", "yellow")]
+    request = ReasoningRequest(query=DataObject(another_color="red"), offset=1, limit=2)
+    response = casebase.infer(cases, request, dataobject_equality_evaluator)
+    assert response.total_number_of_hits == 5
+    assert [r.similarity for r in response.hits] == [1, 0.8]
+    assert response.hits[0].case is cases[4]
+    assert response.hits[1].case is cases[3]
+
+
+def test_evaluate_casebase_ties_keep_casebase_order() -> None:
+    cases = [DataObject(another_color="yellow") for _ in range(5)]
+    request = ReasoningRequest(query=DataObject(another_color="red"), limit=3)
+    response = casebase.infer(iter(cases), request, dataobject_equality_evaluator)
+    assert response.total_number_of_hits == 5
+    assert [r.case for r in response.hits] == cases[:3]
+    assert all(r.case is c for r, c in zip(response.hits, cases))
+
+
+def test_infer_iter_streams_progress() -> None:
+    colors = ("yellow", "red", "green", "orange", "red", "yellow", "blue")
+    cases = [DataObject(another_color=c) for c in colors * 3]
+    request = ReasoningRequest(
+        query=DataObject(another_color="red"),
+        limit=4,
+        facets=(FacetConfig("another_color"),),
+    )
+    expected = casebase.infer(cases, request, dataobject_equality_evaluator)
+    for source in (iter(cases), casebase.CaseBase(cases, mapping)):
+        progress = list(casebase.infer_iter(source, request, dataobject_equality_evaluator, every=5))
+        assert [p.number_of_cases for p in progress] == [5, 10, 15, 20, 21, 21]
+        assert [p.complete for p in progress] == [False] * 5 + [True]
+        assert progress[-1].response == expected
+        assert progress[0].response.total_number_of_hits == 4
+
+
+def test_infer_iter_facets_are_snapshots() -> None:
+    cases = [DataObject(color=c) for c in ("red", "red", "green", "red")]
+    request = ReasoningRequest(query=DataObject(color="red"), threshold=0, facets=(FacetConfig("color"),))
+    progress = list(casebase.infer_iter(cases, request, dataobject_equality_evaluator, every=2))
+    assert progress[0].response.facets[0].values[0] == FacetValue("red", 2, 1.0)
+    assert progress[-1].response.facets[0].values[0] == FacetValue("red", 3, 1.0)
+
+
+def test_infer_async() -> None:
+    colors = ("yellow", "red", "green", "orange", "red", "yellow", "blue")
+    cases = [DataObject(another_color=c) for c in colors * 3]
+    request = ReasoningRequest(query=DataObject(another_color="red"), limit=4, facets=(FacetConfig("another_color"),))
+    expected = casebase.infer(cases, request, dataobject_equality_evaluator)
+
+    async def stream():
+        for case in cases:
+            yield case
+
+    async def ticker(ticks: list[int]) -> None:
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0)
+
+    async def run(source, **kwargs):
+        ticks = []
+        task = asyncio.create_task(ticker(ticks))
+        await asyncio.sleep(0)
+        response = await casebase.infer_async(source, request, dataobject_equality_evaluator, every=5, **kwargs)
+        task.cancel()
+        return response, len(ticks)
+
+    response, ticks = asyncio.run(run(stream()))
+    assert response == expected
+    assert ticks >= 5
+    assert asyncio.run(run(cases))[0] == expected
+    with ThreadPoolExecutor(1) as executor:
+        assert asyncio.run(run(stream(), executor=executor))[0] == expected
+    with ProcessPoolExecutor(1) as executor:
+        assert asyncio.run(run(stream(), executor=executor))[0] == expected
+
+
+@pytest.mark.parametrize("size", [0, -1])
+def test_infer_chunk_sizes_must_be_positive(size) -> None:
+    cases = [DataObject(color="red")] * 3
+    request = ReasoningRequest(query=DataObject(color="red"))
+    with pytest.raises(ValueError):
+        casebase.infer_iter(cases, request, dataobject_equality_evaluator, every=size)
+    with pytest.raises(ValueError):
+        asyncio.run(casebase.infer_async(cases, request, dataobject_equality_evaluator, every=size))
+    with pytest.raises(ValueError):
+        casebase.infer_many(cases, [request], dataobject_equality_evaluator, chunk_size=size)
+
+
+def _ranked_facets(cases, request, evaluator):
+    # the facets collected over all hits sorted by similarity, like infer did before hits were kept in a heap
+    results = sorted(
+        (Result(evaluator(request.query, case), case) for case in cases), key=lambda r: r.similarity, reverse=True
+    )
+    hits = FacetCollectingIterator((r for r in results if r.similarity >= request.threshold), request.facets)
+    list(hits)
+    return hits.facets
+
+
+def _approximately(facets: list[Facet]) -> list[Facet]:
+    # importance is summed up in the order the hits are collected instead of the order of their rank
+    return [
+        Facet(f.name, [FacetValue(v.value, v.count, pytest.approx(v.importance)) for v in f.values], f.entropy)
+        for f in facets
+    ]
+
+
+def test_infer_facet_ties_follow_rank() -> None:
+    cases = [DataObject(color="yellow", shape="square"), DataObject(color="red", shape="round")]
+    order_by_count = FacetValueOrderCriteria(FacetValueProperty.COUNT, FacetValueOrder.DESCENDING)
+    request = ReasoningRequest(
+        query=DataObject(color="red", shape="triangle"), threshold=0, facets=[FacetConfig("shape", 1, order_by_count)]
+    )
+    for source in (cases, CaseBase(cases, mapping)):
+        response = casebase.infer(source, request, dataobject_equality_evaluator)
+        assert [value.value for value in response.facets[0].values] == ["round"]
+
+
+def test_infer_facets_follow_rank_order() -> None:
+    generator = random.Random(7)
+    weighted = tuple(
+        evaluate.WeightedPropertyEvaluatorMapping(m[0], m[1], weight) for m, weight in zip(mapping, (0.7, 1.3, 0.9))
+    )
+    evaluator = functools.partial(evaluate.case_average, weighted)
+    colors = ["red", "orange", "yellow", "blue"]
+    cases = [
+        DataObject(generator.choice(colors), generator.choice(["round", "square"]), None, generator.choice(colors))
+        for _ in range(500)
+    ]
+    request = ReasoningRequest(
+        query=DataObject(color="red", shape="round", another_color="orange"),
+        limit=5,
+        threshold=0.1,
+        facets=[FacetConfig("color"), FacetConfig("shape"), FacetConfig("another_color")],
+    )
+    expected = _approximately(_ranked_facets(cases, request, evaluator))
+    for source in (cases, CaseBase(cases, weighted)):
+        assert casebase.infer(source, request, evaluator).facets == expected
+    assert [progress.response.facets for progress in casebase.infer_iter(cases, request, evaluator, every=64)][
+        -1
+    ] == expected
+
+
+def test_infer_skips_nan_similarities() -> None:
+    @dataclass
+    class Sized:
+        size: Optional[float] = None
+
+    numeric = functools.partial(evaluate.numeric, evaluate.NumericEvaluationOptions(min_=0, max_=10))
+    evaluator = functools.partial(
+        evaluate.case_average, (evaluate.WeightedPropertyEvaluatorMapping("size", numeric, 1),)
+    )
+    cases = [Sized(1), Sized(math.nan), Sized(2)]
+    request = ReasoningRequest(query=Sized(1), threshold=0)
+    response = casebase.infer(cases, request, evaluator)
+    assert response.total_number_of_hits == 2
+    assert [hit.case for hit in response.hits] == [Sized(1), Sized(2)]
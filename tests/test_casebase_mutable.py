@@ -0,0 +1,139 @@
+import functools
+import random
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import pytest
+
+from cbrlib import casebase, evaluate
+from cbrlib.caching import ResultCache
+from cbrlib.types import (
+    Facet,
+    FacetConfig,
+    FacetValue,
+    NumericEvaluationOptions,
+    ReasoningRequest,
+    ReasoningResponse,
+    WeightedPropertyEvaluatorMapping,
+)
+
+
+@dataclass(frozen=True)
+class DataObject:
+    color: Optional[str] = None
+    size: Optional[int] = None
+
+
+mappings = (
+    WeightedPropertyEvaluatorMapping("color", evaluate.equality, 2),
+    WeightedPropertyEvaluatorMapping("size", functools.partial(evaluate.numeric, NumericEvaluationOptions(0, 20)), 1),
+)
+evaluator = functools.partial(evaluate.case_average, mappings)
+colors = ["red", "green", "blue", "yellow"]
+
+
+def _case(generator: random.Random) -> DataObject:
+    return DataObject(generator.choice(colors), generator.randint(0, 20))
+
+
+def _requests() -> list[ReasoningRequest]:
+    return [
+        ReasoningRequest(DataObject(color="red", size=4), limit=5, threshold=0.1, facets=(FacetConfig("color"),)),
+        ReasoningRequest(DataObject(color="blue"), limit=5, threshold=0.9),
+        ReasoningRequest(DataObject(size=10), offset=2, limit=3, threshold=0.5),
+    ]
+
+
+def _approximately(response: ReasoningResponse) -> ReasoningResponse:
+    # importance is summed up in the order the hits are collected, which may differ in the last bits between paths
+    if response.facets is None:
+        return response
+    facets = [
+        Facet(f.name, [FacetValue(v.value, v.count, pytest.approx(v.importance)) for v in f.values], f.entropy)
+        for f in response.facets
+    ]
+    return replace(response, facets=facets)
+
+
+def test_mutable_casebase_matches_list() -> None:
+    generator = random.Random(5)
+    cb = casebase.MutableCaseBase([_case(generator) for _ in range(100)], mappings)
+    cases = {key: case for key, case in enumerate(cb.snapshot())}
+    for step in range(300):
+        operation = generator.random()
+        if operation < 0.4:
+            case = _case(generator)
+            cases[cb.add(case)] = case
+        elif operation < 0.7 and cases:
+            key = generator.choice(list(cases))
+            cases[key] = _case(generator)
+            cb.update(key, cases[key])
+        elif cases:
+            key = generator.choice(list(cases))
+            del cases[key]
+            cb.remove(key)
+        assert cb.version == step + 1
+        snapshot = cb.snapshot()
+        assert sorted(map(repr, snapshot)) == sorted(map(repr, cases.values()))
+        if step % 10 == 0:
+            for request in _requests():
+                expected = casebase.infer(list(snapshot), request, evaluator)
+                assert casebase.infer(cb, request, evaluator) == _approximately(expected)
+
+
+def test_mutable_casebase_snapshot_isolation() -> None:
+    cb = casebase.MutableCaseBase([DataObject("red", 1), DataObject("blue", 2)], mappings)
+    snapshot = cb.snapshot()
+    cb.remove(0)
+    key = cb.add(DataObject("green", 3))
+    cb.update(key, DataObject("red", 4))
+    assert list(snapshot) == [DataObject("red", 1), DataObject("blue", 2)]
+    assert snapshot.version == 0
+    assert list(cb.snapshot()) == [DataObject("blue", 2), DataObject("red", 4)]
+    assert cb.snapshot()[-1] == DataObject("red", 4)
+    assert len(cb) == 2
+    with pytest.raises(KeyError):
+        cb.remove(0)
+
+
+def test_mutable_casebase_appends_in_place() -> None:
+    cb = casebase.MutableCaseBase([DataObject("red", 1)], mappings, compaction_ratio=1000)
+    snapshots = [cb.snapshot()]
+    for size in range(2, 50):
+        cb.add(DataObject("blue", size))
+        snapshots.append(cb.snapshot())
+    request = ReasoningRequest(DataObject(color="blue", size=3), limit=3)
+    for count, snapshot in enumerate(snapshots, 1):
+        assert len(snapshot) == count
+        assert list(snapshot) == [DataObject("red", 1), *(DataObject("blue", size) for size in range(2, count + 1))]
+        assert casebase.infer(snapshot, request, evaluator) == casebase.infer(list(snapshot), request, evaluator)
+    assert list(cb) == list(snapshots[-1])
+    with pytest.raises(IndexError):
+        snapshots[2][3]
+
+
+def test_mutable_casebase_removes_in_place() -> None:
+    cb = casebase.MutableCaseBase([DataObject("red", size) for size in range(20)], mappings, compaction_ratio=1000)
+    snapshots = [cb.snapshot()]
+    for key in (7, 0, 19, 8, 12):
+        cb.remove(key)
+        snapshots.append(cb.snapshot())
+    removed: set[int] = set()
+    for snapshot, key in zip(snapshots, (None, 7, 0, 19, 8, 12)):
+        removed.add(key)
+        expected = [DataObject("red", size) for size in range(20) if size not in removed]
+        assert list(snapshot) == expected
+        assert [snapshot[index] for index in range(len(snapshot))] == expected
+        request = ReasoningRequest(DataObject(color="red", size=10), limit=4, facets=(FacetConfig("size"),))
+        assert casebase.infer(snapshot, request, evaluator) == casebase.infer(expected, request, evaluator)
+
+
+def test_mutable_casebase_result_cache() -> None:
+    cb = casebase.MutableCaseBase([DataObject("red", 1), DataObject("blue", 2)], mappings)
+    cache = ResultCache()
+    request = ReasoningRequest(DataObject(color="red"))
+    assert cache.infer(cb, request, evaluator).total_number_of_hits == 1
+    cb.add(DataObject("red", 5))
+    assert cache.infer(cb, request, evaluator).total_number_of_hits == 2
+    assert cache.infer(cb, request, evaluator).total_number_of_hits == 2
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,131 @@
+import functools
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+import pytest
+
+from cbrlib import evaluate
+from cbrlib.compiling import compile_attribute, compile_evaluator
+from cbrlib.types import (
+    FunctionCalculationParameter,
+    NumericEvaluationOptions,
+    NumericInterpolation,
+    PropertyEvaluatorMapping,
+    WeightedPropertyEvaluatorMapping,
+)
+
+colours = ["straw", "pale-gold", "peat", "amber", "dark"]
+lookup = {
+    "red": {"orange": 0.8, "yellow": 0.4},
+    "orange": {"red": 0.8, "yellow": 0.8},
+}
+
+
+@dataclass(frozen=True)
+class Item:
+    colour: Optional[str] = None
+    age: Optional[int] = None
+    rating: Optional[float] = None
+    hue: Optional[str] = None
+
+
+def rating_evaluator() -> evaluate.Evaluator:
+    options = NumericEvaluationOptions(
+        min_=0,
+        max_=10,
+        if_less=FunctionCalculationParameter(tolerance=1.0, linearity=0.5),
+        if_more=FunctionCalculationParameter(equal=0.1, tolerance=0.8, interpolation=NumericInterpolation.SIGMOID),
+    )
+    return functools.partial(evaluate.numeric, options)
+
+
+colour_evaluator = functools.partial(
+    evaluate.total_order,
+    colours,
+    functools.partial(evaluate.numeric, NumericEvaluationOptions(0, len(colours) - 1)),
+)
+
+weighted_mappings = (
+    WeightedPropertyEvaluatorMapping("colour", colour_evaluator, 2),
+    WeightedPropertyEvaluatorMapping("age", functools.partial(evaluate.numeric, NumericEvaluationOptions(0, 100)), 1),
+    WeightedPropertyEvaluatorMapping("rating", rating_evaluator(), 3),
+    WeightedPropertyEvaluatorMapping("hue", functools.partial(evaluate.table_lookup, lookup), 1),
+)
+
+mappings = tuple(PropertyEvaluatorMapping(m[0], m[1]) for m in weighted_mappings)
+
+
+def _items(count: int, seed: int) -> list[Item]:
+    generator = random.Random(seed)
+
+    def maybe(value):
+        return None if generator.random() < 0.2 else value
+
+    return [
+        Item(
+            colour=maybe(generator.choice([*colours, "unknown"])),
+            age=maybe(generator.randint(0, 100)),
+            rating=maybe(generator.uniform(0, 10)),
+            hue=maybe(generator.choice(["red", "orange", "yellow", "green"])),
+        )
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize(
+    "aggregation",
+    [evaluate.case_average, evaluate.case_median, evaluate.case_min, evaluate.case_max, evaluate.case_euclidean],
+)
+def test_compiled_evaluator_matches_aggregation(aggregation) -> None:
+    aggregation_mappings = weighted_mappings if aggregation is evaluate.case_average else mappings
+    expected_evaluator = functools.partial(aggregation, aggregation_mappings)
+    compiled = compile_evaluator(aggregation_mappings, aggregation)
+    cases = [case for case in _items(300, 1) if None not in (case.age, case.rating)]
+    for query in _items(20, 2):
+        assert [compiled(query, case) for case in cases] == [expected_evaluator(query, case) for case in cases]
+
+
+def test_compiled_evaluator_getvalue() -> None:
+    def getvalue(obj, name, default=None):
+        return obj.get(name, default)
+
+    expected_evaluator = functools.partial(evaluate.case_average, weighted_mappings, getvalue=getvalue)
+    compiled = compile_evaluator(weighted_mappings, getvalue=getvalue)
+    query = {"colour": "peat", "rating": 4.5}
+    cases = [{"colour": colour, "rating": rating / 2} for colour in colours for rating in range(21)]
+    assert [compiled(query, case) for case in cases] == [expected_evaluator(query, case) for case in cases]
+
+
+def test_compiled_evaluator_without_query_values() -> None:
+    compiled = compile_evaluator(weighted_mappings)
+    assert compiled(Item(), Item(colour="peat")) == 0
+
+
+def test_compiled_evaluator_query_changed_in_place() -> None:
+    def getvalue(obj, name, default=None):
+        return obj.get(name, default)
+
+    expected_evaluator = functools.partial(evaluate.case_average, weighted_mappings, getvalue=getvalue)
+    compiled = compile_evaluator(weighted_mappings, getvalue=getvalue)
+    cases = [{"colour": colour, "rating": rating / 2} for colour in colours for rating in range(21)]
+    query = {"colour": "peat", "rating": 2.5}
+    assert [compiled(query, case) for case in cases] == [expected_evaluator(query, case) for case in cases]
+    query.update(colour="amber", rating=4.0)
+    assert [compiled(query, case) for case in cases] == [expected_evaluator(query, case) for case in cases]
+    bound = compiled.bind(query)
+    assert [bound(query, case) for case in cases] == [expected_evaluator(query, case) for case in cases]
+
+
+def test_compile_attribute() -> None:
+    assert compile_attribute(evaluate.equality, "a")("a") == 1
+    assert compile_attribute(evaluate.equality, "a")("b") == 0
+    total_order = evaluate.TotalOrder(colours, colour_evaluator.args[1])
+    for query in [*colours, "unknown"]:
+        score = compile_attribute(total_order, query)
+        assert [score(case) for case in colours] == [colour_evaluator(query, case) for case in colours]
+
+
+def test_compile_evaluator_unknown_aggregation() -> None:
+    with pytest.raises(ValueError):
+        compile_evaluator(mappings, sum)
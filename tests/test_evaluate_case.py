@@ -258,3 +258,90 @@ def test_case_euclidean_missing_properties() -> None:
         )
         == 0
     )
+
+
+def _counting(evaluator, calls: list):
+    def counting_evaluator(query, case):
+        calls.append((query, case))
+        return evaluator(query, case)
+
+    return counting_evaluator
+
+
+def test_case_average_threshold_stops_early() -> None:
+    calls = []
+    mapping = (
+        evaluate.WeightedPropertyEvaluatorMapping("color", _counting(evaluate.equality, calls), 1),
+        evaluate.WeightedPropertyEvaluatorMapping("shape", _counting(evaluate.equality, calls), 3),
+        evaluate.WeightedPropertyEvaluatorMapping("pattern", _counting(evaluate.equality, calls), 1),
+    )
+    query = DataObject(color="red", shape="triangle", pattern="dashed")
+    similarity = evaluate.case_average(mapping, query, DataObject(color="red", shape="square"), threshold=0.5)
+    assert similarity < 0.5
+    assert calls == [("triangle", "square")]
+
+
+def test_case_average_threshold_exact_above_threshold() -> None:
+    mapping = (
+        evaluate.WeightedPropertyEvaluatorMapping("color", lookup_evaluator, 0.3),
+        evaluate.WeightedPropertyEvaluatorMapping("shape", evaluate.equality, 0.7),
+        evaluate.WeightedPropertyEvaluatorMapping("another_color", lookup_evaluator, 0.1),
+    )
+    query = DataObject(color="red", shape="triangle", another_color="orange")
+    cases = [
+        DataObject(color=color, shape=shape, another_color=another_color)
+        for color in ("red", "orange", "yellow", None)
+        for shape in ("triangle", "square")
+        for another_color in ("red", "orange", "yellow")
+    ]
+    for threshold in (0, 0.2, 0.5, 0.8, 1):
+        for case in cases:
+            expected = evaluate.case_average(mapping, query, case)
+            similarity = evaluate.case_average(mapping, query, case, threshold=threshold)
+            if expected >= threshold:
+                assert similarity == expected
+            else:
+                assert similarity < threshold
+
+
+def test_case_average_costs_order() -> None:
+    calls = []
+    mapping = (
+        evaluate.WeightedPropertyEvaluatorMapping("color", _counting(evaluate.equality, calls), 1),
+        evaluate.WeightedPropertyEvaluatorMapping("shape", _counting(evaluate.equality, calls), 1),
+    )
+    query = DataObject(color="red", shape="triangle")
+    costs = {"color": 10.0, "shape": 1.0}
+    evaluate.case_average(mapping, query, DataObject(color="blue", shape="square"), threshold=0.6, costs=costs)
+    assert calls == [("triangle", "square")]
+
+
+def test_case_min_max_threshold() -> None:
+    calls = []
+    mapping = (
+        evaluate.PropertyEvaluatorMapping("color", _counting(evaluate.equality, calls)),
+        evaluate.PropertyEvaluatorMapping("shape", _counting(evaluate.equality, calls)),
+    )
+    query = DataObject(color="red", shape="triangle")
+    assert evaluate.case_min(mapping, query, DataObject(color="blue", shape="triangle"), threshold=0) == 0
+    assert len(calls) == 1
+    calls.clear()
+    assert evaluate.case_max(mapping, query, DataObject(color="red", shape="square"), threshold=0.5) == 1
+    assert len(calls) == 1
+    assert evaluate.case_min(mapping4, DataObject(color="red"), DataObject(color="orange"), threshold=0.5) == 0.8
+    assert evaluate.case_max(mapping4, DataObject(), DataObject(color="orange"), threshold=0.5) == 0
+
+
+def test_with_threshold() -> None:
+    evaluator = functools.partial(evaluate.case_average, mapping1)
+    bound = evaluate.with_threshold(evaluator, 0.4)
+    assert bound.keywords == {"threshold": 0.4}
+    assert evaluate.with_threshold(bound, 0.8) is bound
+    assert evaluate.with_threshold(evaluate.equality, 0.4) is evaluate.equality
+    assert evaluate.with_threshold(functools.partial(evaluate.case_median, mapping3), 0.4).keywords == {}
+
+
+def test_measure_costs() -> None:
+    costs = evaluate.measure_costs(mapping1, DataObject(color="red"), [DataObject(color="red"), DataObject()])
+    assert set(costs) == {"color"}
+    assert costs["color"] >= 0
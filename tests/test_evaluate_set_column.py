@@ -0,0 +1,75 @@
+import functools
+import random
+
+import pytest
+
+from cbrlib import evaluate
+from cbrlib.columns import Column
+
+lookup = {
+    "red": {"orange": 0.8, "yellow": 0.4},
+    "orange": {"red": 0.8, "yellow": 0.8},
+    "yellow": {"orange": 0.8},
+}
+colours = ["red", "orange", "yellow", "green", "blue"]
+
+
+def _query_inclusion(evaluator, query, case) -> float:
+    if len(query) == 0:
+        return 0
+    current = functools.reduce(lambda e1, e2: e1 + evaluate.coverage(e2, case, evaluator), [0, *query])
+    return current / len(query)
+
+
+def _reference(func, evaluator, query, case) -> float:
+    if func is evaluate.set_query_inclusion:
+        return _query_inclusion(evaluator, query, case)
+    if func is evaluate.set_case_inclusion:
+        return _query_inclusion(evaluator, case, query)
+    return (_query_inclusion(evaluator, query, case) + _query_inclusion(evaluator, case, query)) / 2
+
+
+def _random_sets(count: int, seed: int) -> list[list[str]]:
+    generator = random.Random(seed)
+    return [generator.sample(colours, generator.randint(0, 4)) for _ in range(count)]
+
+
+element_evaluators = [
+    evaluate.equality,
+    functools.partial(evaluate.table_lookup, lookup),
+]
+
+
+@pytest.mark.parametrize(
+    "func", [evaluate.set_query_inclusion, evaluate.set_case_inclusion, evaluate.set_intermediate]
+)
+@pytest.mark.parametrize("element_evaluator", element_evaluators)
+def test_set_similarity_column(func, element_evaluator) -> None:
+    cases = _random_sets(200, 1)
+    evaluator = functools.partial(func, element_evaluator)
+    for query in _random_sets(20, 2):
+        expected = [_reference(func, element_evaluator, query, case) for case in cases]
+        assert evaluate.evaluate_column(evaluator, query, Column("colours", cases)) == expected
+        assert [evaluator(query, case) for case in cases] == expected
+
+
+def test_set_query_inclusion_equality_unhashable() -> None:
+    query = [[1], [2], 3]
+    case = [[1], 3, float("nan")]
+    assert evaluate.set_query_inclusion(evaluate.equality, query, case) == _query_inclusion(
+        evaluate.equality, query, case
+    )
+    evaluator = functools.partial(evaluate.set_intermediate, evaluate.equality)
+    cases = [case, [[2]], []]
+    assert evaluate.evaluate_column(evaluator, query, Column("values", cases)) == [
+        _reference(evaluate.set_intermediate, evaluate.equality, query, case) for case in cases
+    ]
+
+
+def test_column_element_encoding() -> None:
+    column = Column("colours", [["red", "blue"], ("blue",), set(), None])
+    assert column.element_domain is None
+    column = Column("colours", [["red", "blue"], ("blue",), set()])
+    assert column.element_domain == ["red", "blue"]
+    assert column.element_codes == [(0, 1), (1,), ()]
+    assert column.element_sets == [frozenset({"red", "blue"}), frozenset({"blue"}), frozenset()]
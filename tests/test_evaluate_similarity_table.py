@@ -0,0 +1,73 @@
+import functools
+
+from cbrlib import evaluate
+from cbrlib.columns import Column
+from cbrlib.types import FunctionCalculationParameter, NumericEvaluationOptions
+
+colours = ["straw", "pale-gold", "peat", "amber", "dark"]
+lookup = {
+    "red": {"orange": 0.8, "yellow": 0.4},
+    "orange": {"red": 0.8, "yellow": 0.8},
+}
+
+
+def test_tabulate_numeric() -> None:
+    options = NumericEvaluationOptions(
+        min_=0,
+        max_=10,
+        if_less=FunctionCalculationParameter(tolerance=1.0),
+        if_more=FunctionCalculationParameter(tolerance=1.0, linearity=0.5),
+    )
+    evaluator = functools.partial(evaluate.numeric, options)
+    table = evaluate.tabulate(evaluator, range(11))
+    assert len(table.matrix) == 11
+    for query in range(11):
+        for case in range(11):
+            assert table(query, case) == evaluator(query, case)
+    assert table(3, 12.5) == evaluator(3, 12.5)
+    assert table.intern(4) == 4
+    assert table.intern(42) is None
+    assert table.row(2) == [evaluator(2, case) for case in range(11)]
+
+
+def test_tabulate_total_order() -> None:
+    evaluator = functools.partial(
+        evaluate.total_order,
+        colours,
+        functools.partial(evaluate.numeric, NumericEvaluationOptions(0, len(colours) - 1)),
+    )
+    table = evaluate.tabulate(evaluator, colours)
+    for query in colours:
+        for case in [*colours, "unknown"]:
+            assert table(query, case) == evaluator(query, case)
+
+
+def test_tabulate_table_lookup() -> None:
+    evaluator = functools.partial(evaluate.table_lookup, lookup)
+    table = evaluate.tabulate(evaluator, ["red", "orange", "yellow", "red"])
+    assert table.domain == ["red", "orange", "yellow"]
+    assert table("red", "orange") == 0.8
+    assert table("orange", "orange") == 1
+    assert table("yellow", "red") == 0
+    assert table("green", "green") == 1
+    assert table.row("blue") is None
+
+
+def test_tabulate_as_mapping_evaluator() -> None:
+    table = evaluate.tabulate(functools.partial(evaluate.table_lookup, lookup), ["red", "orange", "yellow"])
+    mapping = (evaluate.WeightedPropertyEvaluatorMapping("color", table, 1),)
+    assert evaluate.case_average(mapping, {"color": "red"}, {"color": "yellow"}, getvalue=dict.get) == 0.4
+
+
+def test_tabulate_evaluate_column() -> None:
+    evaluator = functools.partial(evaluate.table_lookup, lookup)
+    table = evaluate.tabulate(evaluator, ["red", "orange", "yellow"])
+    column = Column("color", ["red", "green", "yellow", "red", None, "orange", "green"])
+    for query in ["red", "orange", "green", None]:
+        expected = [evaluator(query, value) for value in column]
+        assert evaluate.evaluate_column(table, query, column) == expected
+        assert evaluate.evaluate_column(table, query, column.take([5, 1, 0])) == [
+            expected[5],
+            expected[1],
+            expected[0],
+        ]
@@ -0,0 +1,58 @@
+import functools
+import random
+
+import pytest
+
+from cbrlib import casebase, evaluate, indexing
+from cbrlib.casebase import CaseBase
+from cbrlib.columns import Column
+from cbrlib.types import FunctionCalculationParameter, NumericEvaluationOptions, ReasoningRequest
+
+ordering = ["straw", "pale-gold", "peat", "amber", "straw", "dark", "gold", "honey"]
+options = NumericEvaluationOptions(0, len(ordering) - 1, if_more=FunctionCalculationParameter(tolerance=0.3))
+numeric_evaluator = functools.partial(evaluate.numeric, options)
+values = [*ordering, "unknown", None]
+
+
+def test_total_order_ranks_match_total_order() -> None:
+    evaluator = evaluate.TotalOrder(ordering, numeric_evaluator)
+    for query in values:
+        for case in values:
+            assert evaluator(query, case) == evaluate.total_order(ordering, numeric_evaluator, query, case)
+
+
+def test_total_order_rank() -> None:
+    evaluator = evaluate.TotalOrder(ordering, evaluate.equality)
+    assert evaluator.rank("straw") == 0
+    assert evaluator.rank("honey") == 7
+    assert evaluator.rank("unknown") is None
+    assert evaluator.rank(["unhashable"]) is None
+    assert evaluator.ranks(["peat", "unknown", "straw"]) == [2, None, 0]
+    assert evaluator("peat", "peat") == 1
+    assert evaluator("peat", "unknown") == 0
+    assert evaluator("unknown", "unknown") == 0
+
+
+def test_total_order_column() -> None:
+    pytest.importorskip("numpy")
+    evaluator = evaluate.TotalOrder(ordering, numeric_evaluator)
+    rnd = random.Random(3)
+    column = Column("colour", [rnd.choice(values) for _ in range(20)] + [f"other-{i}" for i in range(30)])
+    for query in values:
+        assert evaluate.evaluate_column(evaluator, query, column) == [evaluator(query, case) for case in column]
+
+
+def test_total_order_candidates() -> None:
+    evaluator = evaluate.TotalOrder(ordering, numeric_evaluator)
+    cases = [{"colour": colour} for colour in values * 3]
+    cb = CaseBase(cases, properties=("colour",), getvalue=dict.get)
+    for query in values:
+        candidates = indexing.candidate_similarities(cb, "colour", evaluator, query)
+        similar = {i for i, case in enumerate(cases) if evaluator(query, case["colour"]) > 0}
+        assert similar <= set(candidates)
+        assert len(candidates) < len(cases)
+    mappings = (evaluate.WeightedPropertyEvaluatorMapping("colour", evaluator, 1),)
+    case_evaluator = functools.partial(evaluate.case_average, mappings, getvalue=dict.get)
+    request = ReasoningRequest({"colour": "peat"}, threshold=0.5)
+    expected = casebase.infer(cases, request, case_evaluator, getvalue=dict.get)
+    assert casebase.infer(cb, request, case_evaluator, getvalue=dict.get) == expected
@@ -0,0 +1,101 @@
+import functools
+from dataclasses import dataclass
+from typing import Optional
+
+import pytest
+
+from cbrlib import casebase, evaluate
+from cbrlib.casebase import CaseBase
+from cbrlib.facetting import FacetCollector
+from cbrlib.types import (
+    FacetBin,
+    FacetBinning,
+    FacetConfig,
+    FacetValue,
+    FacetValueOrderCriteria,
+    NumericEvaluationOptions,
+    ReasoningRequest,
+    WeightedPropertyEvaluatorMapping,
+)
+
+
+@dataclass(frozen=True)
+class Bottle:
+    proof: Optional[float] = None
+
+
+options = NumericEvaluationOptions(40, 60)
+mappings = (WeightedPropertyEvaluatorMapping("proof", functools.partial(evaluate.numeric, options), 1),)
+evaluator = functools.partial(evaluate.case_average, mappings)
+bottles = [Bottle(40 + i * 0.137) for i in range(150)]
+
+
+def _collect(binning: FacetBinning, values: list[Optional[float]]) -> list[FacetValue]:
+    collector = FacetCollector([FacetConfig("proof", 10, FacetValueOrderCriteria.value(), binning)])
+    for value in values:
+        collector.collect(0.5, Bottle(value))
+    return list(collector.facets)[0].values
+
+
+def test_binning_edges() -> None:
+    values = _collect(FacetBinning(edges=(0, 10, 20)), [-5, 0, 9.9, 10, 20, 25, None])
+    assert values == [FacetValue(FacetBin(0, 10), 3, 0.5), FacetValue(FacetBin(10, 20), 3, 0.5)]
+
+
+def test_binning_width() -> None:
+    values = _collect(FacetBinning(width=5, origin=1), [1, 5.9, 6, 30])
+    assert [(v.value, v.count) for v in values] == [(FacetBin(1, 6), 2), (FacetBin(6, 11), 1), (FacetBin(26, 31), 1)]
+
+
+def test_binning_skips_infinite_values() -> None:
+    for binning in (FacetBinning(width=5), FacetBinning(edges=(0, 10))):
+        values = _collect(binning, [3, float("inf"), float("-inf")])
+        assert [(v.value, v.count) for v in values] == [(FacetBin(0, 5 if binning.width else 10), 1)]
+
+
+def test_binning_from_options_and_quantiles() -> None:
+    assert FacetBinning.from_options(options, 4).edges == (40, 45, 50, 55, 60)
+    binning = FacetBinning.from_quantiles(range(100), 4)
+    assert binning.edges == (0, 24, 49, 74, 99)
+    assert [v.count for v in _collect(binning, list(range(100)))] == [24, 25, 25, 26]
+
+
+def test_binning_from_options_without_range() -> None:
+    binning = FacetBinning.from_options(NumericEvaluationOptions(5, 5), 4)
+    assert binning.edges == (5, 6)
+    assert _collect(binning, [5, 5, 7]) == [FacetValue(FacetBin(5, 6), 3, 0.5)]
+
+
+def test_binning_skips_values_which_are_not_numbers() -> None:
+    values = _collect(FacetBinning(edges=(0, 10, 20)), [5, "high", 15, None, float("nan"), [1]])
+    assert values == [FacetValue(FacetBin(0, 10), 1, 0.5), FacetValue(FacetBin(10, 20), 1, 0.5)]
+    cases = [Bottle(45), Bottle("strong"), Bottle(55)]
+    mixed = (WeightedPropertyEvaluatorMapping("proof", evaluate.equality, 1),)
+    request = ReasoningRequest(
+        Bottle(45), threshold=0, facets=[FacetConfig("proof", binning=FacetBinning(edges=(40, 50, 60)))]
+    )
+    for source in (cases, CaseBase(cases, mixed)):
+        response = casebase.infer(source, request, functools.partial(evaluate.case_average, mixed))
+        assert list(response.facets)[0].values == [
+            FacetValue(FacetBin(40, 50), 1, 1),
+            FacetValue(FacetBin(50, 60), 1, 0),
+        ]
+
+
+def test_binning_invalid() -> None:
+    with pytest.raises(ValueError):
+        FacetBinning()
+    with pytest.raises(ValueError):
+        FacetBinning(edges=(1, 1))
+
+
+def test_infer_binned_facets() -> None:
+    request = ReasoningRequest(
+        Bottle(50),
+        threshold=0,
+        facets=(FacetConfig("proof", binning=FacetBinning.from_options(options, 5)),),
+    )
+    expected = casebase.infer(bottles, request, evaluator)
+    assert len(expected.facets[0].values) == 5
+    assert sum(v.count for v in expected.facets[0].values) == expected.total_number_of_hits
+    assert casebase.infer(CaseBase(bottles, mappings), request, evaluator) == expected
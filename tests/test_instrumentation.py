@@ -0,0 +1,56 @@
+import functools
+from dataclasses import dataclass
+from typing import Optional
+
+from cbrlib import casebase, evaluate, instrumentation
+from cbrlib.casebase import CaseBase
+from cbrlib.types import FacetConfig, ReasoningRequest, ReasoningStats, WeightedPropertyEvaluatorMapping
+
+
+@dataclass(frozen=True)
+class DataObject:
+    color: Optional[str] = None
+    shape: Optional[str] = None
+
+
+mappings = (
+    WeightedPropertyEvaluatorMapping("color", evaluate.equality, 1),
+    WeightedPropertyEvaluatorMapping("shape", evaluate.equality, 1),
+)
+evaluator = functools.partial(evaluate.case_average, mappings)
+cases = [DataObject(color, shape) for color in ("red", "green", "blue") for shape in ("round", "square")] * 5
+request = ReasoningRequest(DataObject("red", "round"), threshold=0.5, facets=(FacetConfig("color"),))
+
+
+def test_infer_without_stats() -> None:
+    assert casebase.infer(cases, request, evaluator).stats is None
+    assert instrumentation.current() is None
+
+
+def test_infer_stats_iterable() -> None:
+    expected = casebase.infer(cases, request, evaluator)
+    response = casebase.infer(iter(cases), request, evaluator, stats=True)
+    assert (response.total_number_of_hits, response.hits, response.facets) == (
+        expected.total_number_of_hits,
+        expected.hits,
+        expected.facets,
+    )
+    stats = response.stats
+    assert stats.cases_scored == len(cases)
+    assert stats.cases_above_threshold == expected.total_number_of_hits
+    assert stats.evaluator_calls == {"color": len(cases), "shape": len(cases)}
+    assert set(stats.evaluator_time) == {"color", "shape"}
+    assert {"scoring", "ranking", "facets", "facet_collection"} <= set(stats.phase_time)
+    assert instrumentation.current() is None
+
+
+def test_infer_stats_casebase_callback() -> None:
+    collected: list[ReasoningStats] = []
+    cb = CaseBase(cases, mappings)
+    response = casebase.infer(cb, ReasoningRequest(DataObject("red")), evaluator, on_stats=collected.append)
+    assert response.stats is None
+    assert len(collected) == 1
+    assert collected[0].cases_scored == collected[0].cases_above_threshold == 10
+    assert collected[0].evaluator_calls == {"color": 10}
+    # the three colors of the casebase are evaluated once, the other seven cases reuse their similarity
+    assert collected[0].evaluator_cache_hits == {"color": 7}
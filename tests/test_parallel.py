@@ -0,0 +1,57 @@
+import functools
+from dataclasses import dataclass
+from typing import Optional
+
+from cbrlib import casebase, evaluate
+from cbrlib.casebase import CaseBase
+from cbrlib.parallel import ParallelCaseBase
+from cbrlib.types import FacetConfig, NumericEvaluationOptions, ReasoningRequest
+
+
+@dataclass(frozen=True)
+class DataObject:
+    color: Optional[str] = None
+    size: Optional[int] = None
+
+
+mappings = (
+    evaluate.WeightedPropertyEvaluatorMapping("color", evaluate.equality, 1),
+    evaluate.WeightedPropertyEvaluatorMapping(
+        "size", functools.partial(evaluate.numeric, NumericEvaluationOptions(0, 100)), 2
+    ),
+)
+evaluator = functools.partial(evaluate.case_average, mappings)
+
+cases = [DataObject(color=("red", "green", "blue")[i % 3], size=(i * 7) % 100) for i in range(200)]
+
+
+def _assert_same_response(expected, response) -> None:
+    assert response.total_number_of_hits == expected.total_number_of_hits
+    assert response.hits == expected.hits
+    assert [(f.name, f.entropy) for f in response.facets] == [(f.name, f.entropy) for f in expected.facets]
+    for facet, expected_facet in zip(response.facets, expected.facets):
+        assert [(v.value, v.count) for v in facet.values] == [(v.value, v.count) for v in expected_facet.values]
+
+
+def test_parallel_infer_matches_infer() -> None:
+    requests = [
+        ReasoningRequest(DataObject(color="red", size=50), threshold=0.3, facets=(FacetConfig("color"),)),
+        ReasoningRequest(DataObject(size=10), offset=5, limit=20, facets=(FacetConfig("size"),)),
+    ]
+    for base in (cases, CaseBase(cases, mappings)):
+        with ParallelCaseBase(base, evaluator, shards=3) as parallel_casebase:
+            for request in requests:
+                _assert_same_response(casebase.infer(base, request, evaluator), parallel_casebase.infer(request))
+
+
+def test_parallel_infer_more_shards_than_cases() -> None:
+    request = ReasoningRequest(DataObject(color="red"), threshold=0, facets=())
+    with ParallelCaseBase(cases[:2], evaluator, shards=4) as parallel_casebase:
+        _assert_same_response(casebase.infer(cases[:2], request, evaluator), parallel_casebase.infer(request))
+
+
+def test_casebase_slice() -> None:
+    cb = CaseBase(cases, mappings)
+    part = cb.slice(10, 20)
+    assert list(part) == cases[10:20]
+    assert list(part.columns["size"]) == [c.size for c in cases[10:20]]
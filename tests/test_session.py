@@ -0,0 +1,113 @@
+import functools
+import random
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import pytest
+
+from cbrlib import casebase, evaluate
+from cbrlib.casebase import CaseBase, MutableCaseBase
+from cbrlib.session import RetrievalSession, SessionPool
+from cbrlib.types import FacetConfig, NumericEvaluationOptions, ReasoningRequest, WeightedPropertyEvaluatorMapping
+
+
+@dataclass
+class DataObject:
+    color: Optional[str] = None
+    shape: Optional[str] = None
+    size: Optional[int] = None
+
+
+mappings = (
+    WeightedPropertyEvaluatorMapping("color", evaluate.equality, 2),
+    WeightedPropertyEvaluatorMapping("shape", evaluate.equality, 1),
+    WeightedPropertyEvaluatorMapping("size", functools.partial(evaluate.numeric, NumericEvaluationOptions(0, 20)), 1),
+)
+
+cases = [
+    DataObject(
+        random.Random(index).choice(["red", "green", "blue"]),
+        random.Random(-index).choice(["round", "square", None]),
+        index % 21,
+    )
+    for index in range(300)
+]
+
+facets = [FacetConfig("color"), FacetConfig("shape")]
+
+
+@pytest.mark.parametrize(
+    "aggregation",
+    [evaluate.case_average, evaluate.case_median, evaluate.case_min, evaluate.case_max, evaluate.case_euclidean],
+)
+def test_session_refinement(aggregation) -> None:
+    evaluator = functools.partial(aggregation, mappings)
+    session = RetrievalSession(CaseBase(cases, mappings), evaluator)
+    queries = [DataObject(size=10)]
+    queries.append(replace(queries[-1], color="red"))
+    queries.append(replace(queries[-1], shape="round"))
+    queries.append(replace(queries[-1], color="blue"))
+    queries.append(replace(queries[-1], shape=None))
+    for query in queries:
+        request = ReasoningRequest(query, limit=15, threshold=0.3, facets=facets)
+        assert session.infer(request) == casebase.infer(cases, request, evaluator)
+    # one evaluation per changed value, the others are reused
+    assert session.evaluations == 4
+
+
+def test_session_on_mutable_casebase() -> None:
+    evaluator = functools.partial(evaluate.case_average, mappings)
+    mutable = MutableCaseBase(cases, mappings)
+    session = RetrievalSession(mutable, evaluator)
+    request = ReasoningRequest(DataObject("red", "round", 3), limit=10, threshold=0.3, facets=facets)
+    assert session.infer(request) == casebase.infer(cases, request, evaluator)
+    keys = mutable.add_all([DataObject("red", "round", 3), DataObject("blue", "round", 4)])
+    mutable.remove(5)
+    mutable.update(keys[1], DataObject("red", "square", 3))
+    assert session.infer(request) == casebase.infer(list(mutable.snapshot()), request, evaluator)
+    # the columns of the base cases are reused, only the added cases are evaluated again
+    assert session.evaluations == 6
+    assert session.cached_floats == 3 * len(cases) + 3 * 2
+
+
+def test_session_needs_column_evaluator() -> None:
+    with pytest.raises(ValueError):
+        RetrievalSession(CaseBase(cases), lambda query, case: 1.0)
+    with pytest.raises(TypeError):
+        RetrievalSession(cases, functools.partial(evaluate.case_average, mappings))
+
+
+def test_session_pool_eviction() -> None:
+    evaluator = functools.partial(evaluate.case_average, mappings)
+    pool = SessionPool(CaseBase(cases, mappings), evaluator, maxsize=2, idle_timeout=60)
+    request = ReasoningRequest(DataObject("red"), limit=5)
+    for key in ("a", "b", "a", "c"):
+        assert pool.infer(key, request) == casebase.infer(cases, request, evaluator)
+    assert "a" in pool and "c" in pool and "b" not in pool
+    pool.session("a").last_used -= 120
+    assert pool.evict_idle() == 1
+    assert len(pool) == 1
+    pool.discard("c")
+    assert len(pool) == 0
+
+
+def test_session_pool_max_floats() -> None:
+    evaluator = functools.partial(evaluate.case_average, mappings)
+    pool = SessionPool(CaseBase(cases, mappings), evaluator, max_floats=len(cases) + 10)
+    request = ReasoningRequest(DataObject("red"), limit=5)
+    for key in ("a", "b"):
+        assert pool.infer(key, request) == casebase.infer(cases, request, evaluator)
+    assert "b" in pool and "a" not in pool
+    assert pool.cached_floats() == len(cases)
+    pool.infer("b", ReasoningRequest(DataObject("red", "round", 3), limit=5))
+    assert pool.cached_floats() == 0
+
+
+def test_session_with_other_getvalue() -> None:
+    records = [{"color": case.color, "SHAPE": case.shape, "size": case.size} for case in cases]
+    evaluator = functools.partial(
+        evaluate.case_average, mappings, getvalue=lambda case, name, default=None: case.get(name.upper(), default)
+    )
+    session = RetrievalSession(CaseBase(records, mappings, getvalue=dict.get), evaluator)
+    request = ReasoningRequest({"SHAPE": "round"}, limit=10, threshold=0.3)
+    assert session.infer(request) == casebase.infer(records, request, evaluator)
@@ -0,0 +1,92 @@
+import functools
+import multiprocessing
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+import pytest
+
+from cbrlib import casebase, evaluate
+from cbrlib.shared import SharedCaseBase, SharedCaseBasePublisher
+from cbrlib.types import ReasoningRequest, WeightedPropertyEvaluatorMapping
+
+
+@dataclass
+class DataObject:
+    color: Optional[str] = None
+    size: Optional[int] = None
+
+
+mappings = (
+    WeightedPropertyEvaluatorMapping("color", evaluate.equality, 1),
+    WeightedPropertyEvaluatorMapping("size", evaluate.equality, 1),
+)
+evaluator = functools.partial(evaluate.case_average, mappings)
+request = ReasoningRequest(DataObject("red", 2), limit=5, threshold=0.5)
+
+
+def _name() -> str:
+    return f"cbrlib-test-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def _infer(name: str, columnar: bool = False) -> list[tuple[float, dict]]:
+    with SharedCaseBase(name) as shared, shared.use() as cases:
+        response = casebase.infer(cases.to_casebase(mappings) if columnar else cases, request, evaluator)
+        return [(hit.similarity, hit.case.as_dict()) for hit in response.hits]
+
+
+def test_publish_and_attach() -> None:
+    cases = [DataObject(color, size) for color in ("red", "green", "blue") for size in range(4)]
+    name = _name()
+    with SharedCaseBasePublisher(name) as publisher:
+        with SharedCaseBase(name) as shared:
+            with pytest.raises(LookupError):
+                shared.current()
+            assert publisher.publish(cases, ["color", "size"]) == 1
+            first = shared.current()
+            assert shared.generation == 1
+            assert shared.current() is first
+            expected = casebase.infer(cases, request, evaluator)
+            response = casebase.infer(first, request, evaluator)
+            assert [hit.similarity for hit in response.hits] == [hit.similarity for hit in expected.hits]
+            assert [hit.case.as_dict() for hit in response.hits] == [vars(hit.case) for hit in expected.hits]
+            columnar = first.to_casebase(mappings)
+            assert isinstance(columnar.columns["color"].codes, memoryview)
+            assert list(columnar.value_index("size").positions(2)) == [2, 6, 10]
+            assert casebase.infer(columnar, request, evaluator) == response
+
+            assert publisher.publish(cases[:3], ["color", "size"]) == 2
+            second = shared.current()
+            assert shared.generation == 2
+            assert len(second) == 3
+
+
+def test_attach_from_other_process() -> None:
+    cases = [DataObject(color, size) for color in ("red", "green") for size in range(3)]
+    name = _name()
+    with SharedCaseBasePublisher(name) as publisher:
+        publisher.publish(cases, ["color", "size"])
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            hits = pool.apply(_infer, (name,))
+            columnar_hits = pool.apply(_infer, (name, True))
+    expected = casebase.infer(cases, request, evaluator)
+    assert hits == columnar_hits == [(hit.similarity, vars(hit.case)) for hit in expected.hits]
+
+
+def test_generation_in_use_stays_attached() -> None:
+    cases = [DataObject(color, size) for color in ("red", "green") for size in range(3)]
+    name = _name()
+    with SharedCaseBasePublisher(name) as publisher, SharedCaseBase(name) as shared:
+        publisher.publish(cases, ["color", "size"])
+        with shared.use() as first:
+            hits = casebase.infer(first, request, evaluator).hits
+            publisher.publish(cases[:2], ["color", "size"])
+            with shared.use() as second:
+                assert len(second) == 2
+            assert shared.current() is second
+            expected = casebase.infer(cases, request, evaluator)
+            assert [hit.case.as_dict() for hit in hits] == [vars(hit.case) for hit in expected.hits]
+        with pytest.raises(ValueError):
+            hits[0].case.as_dict()
+        assert len(shared.current()) == 2
@@ -0,0 +1,226 @@
+import copy
+import functools
+import json
+import math
+import pickle
+import random
+from dataclasses import asdict, dataclass, replace
+from typing import Optional
+
+import pytest
+
+from cbrlib import casebase, evaluate, storage
+from cbrlib.parallel import ParallelCaseBase
+from cbrlib.types import FacetConfig, ReasoningRequest, WeightedPropertyEvaluatorMapping
+
+
+@dataclass
+class Product:
+    price: Optional[float] = None
+    rating: Optional[int] = None
+    colour: Optional[str] = None
+    available: Optional[bool] = None
+    tags: Optional[tuple[str, ...]] = None
+
+
+def _products(count: int) -> list[Product]:
+    generator = random.Random(5)
+    return [
+        Product(
+            price=generator.choice([None, round(generator.uniform(1, 100), 2), 7]),
+            rating=generator.randint(-3, 10),
+            colour=generator.choice([None, "red", "green", "blue"]),
+            available=generator.choice([None, True, False]),
+            tags=generator.choice([None, (), tuple(generator.sample("abcdef", generator.randint(1, 4)))]),
+        )
+        for _ in range(count)
+    ]
+
+
+properties = ["price", "rating", "colour", "available", "tags"]
+
+
+def test_write_and_open(tmp_path) -> None:
+    products = _products(300)
+    path = str(tmp_path / "products.cbr")
+    assert storage.write(path, products, properties) == len(products)
+    with storage.StoredCaseBase(path) as stored:
+        assert len(stored) == len(products)
+        assert stored.properties == properties
+        assert [case.as_dict() for case in stored] == [asdict(product) for product in products]
+        assert stored[-1].price == products[-1].price
+        assert stored[3]["tags"] == products[3].tags
+        assert [case.as_dict() for case in stored[10:20:3]] == [asdict(p) for p in products[10:20:3]]
+        assert stored.values("price") == [product.price for product in products]
+        with pytest.raises(AttributeError):
+            stored[0].weight
+        with pytest.raises(IndexError):
+            stored[len(products)]
+
+
+def test_write_special_values(tmp_path) -> None:
+    path = str(tmp_path / "special.cbr")
+    cases = [
+        {"number": None, "set": None, "empty": None},
+        {"number": 2**62, "set": frozenset({1.5, "x"}), "empty": None},
+        {"number": float("nan"), "set": frozenset(), "empty": None},
+    ]
+    storage.write(path, cases, ["number", "set", "empty"], getvalue=dict.get)
+    with storage.StoredCaseBase(path) as stored:
+        assert stored.values("number")[:2] == [None, 2**62]
+        assert math.isnan(stored[2].number)
+        assert stored.values("set") == [None, frozenset({1.5, "x"}), frozenset()]
+        assert stored.values("empty") == [None, None, None]
+
+
+def test_dictionaries_are_not_in_the_header(tmp_path) -> None:
+    header_lengths = []
+    section_numbers = 0
+    for count in (10, 10000):
+        path = str(tmp_path / f"names-{count}.cbr")
+        names = [f"name-{index}" for index in range(count)]
+        cases = [{"name": name, "flag": index % 2 == 0} for index, name in enumerate(names)]
+        storage.write(path, cases, ["name", "flag"], getvalue=dict.get)
+        with open(path, "rb") as fd:
+            fd.seek(len(storage.MAGIC))
+            header_lengths.append(int.from_bytes(fd.read(8), "little"))
+            section_numbers = 2 * sum(
+                len(column["sections"]) for column in json.loads(fd.read(header_lengths[-1]))["columns"]
+            )
+        with storage.StoredCaseBase(path) as stored:
+            assert stored[count - 1].name == names[-1]
+            assert stored.values("name") == names
+            assert stored.values("flag")[:3] == [True, False, True]
+    # only the numbers of the sizes and offsets grow, by three digits for 1000 times as many cases
+    assert header_lengths[1] <= header_lengths[0] + 3 * section_numbers
+
+
+def test_write_rejects_unsupported_values(tmp_path) -> None:
+    path = str(tmp_path / "invalid.cbr")
+    with pytest.raises(TypeError):
+        storage.write(path, [{"value": 1}, {"value": "a"}], ["value"], getvalue=dict.get)
+    with pytest.raises(TypeError):
+        storage.write(path, [{"value": object()}], ["value"], getvalue=dict.get)
+    with pytest.raises(OverflowError):
+        storage.write(path, [{"value": 2**64}], ["value"], getvalue=dict.get)
+    with open(path, "wb") as fd:
+        fd.write(b"not a casebase")
+    with pytest.raises(ValueError):
+        storage.StoredCaseBase(path)
+
+
+def test_write_csv(tmp_path) -> None:
+    csv_path = tmp_path / "products.csv"
+    csv_path.write_text("name;price;colour\nA;1.5;red\nB;;blue\nC;3;\n")
+    path = str(tmp_path / "products.cbr")
+    storage.write_csv(path, str(csv_path), converters={"price": float}, delimiter=";")
+    with storage.StoredCaseBase(path) as stored:
+        assert [case.as_dict() for case in stored] == [
+            {"name": "A", "price": 1.5, "colour": "red"},
+            {"name": "B", "price": None, "colour": "blue"},
+            {"name": "C", "price": 3.0, "colour": None},
+        ]
+
+
+def test_infer_stored(tmp_path) -> None:
+    products = [replace(product, tags=product.tags or ()) for product in _products(500)]
+    path = str(tmp_path / "products.cbr")
+    storage.write(path, products, properties)
+    mappings = (
+        WeightedPropertyEvaluatorMapping(
+            "rating",
+            functools.partial(evaluate.numeric, evaluate.NumericEvaluationOptions(min_=-3, max_=10)),
+            2,
+        ),
+        WeightedPropertyEvaluatorMapping("colour", evaluate.equality, 1),
+        WeightedPropertyEvaluatorMapping("tags", functools.partial(evaluate.set_intermediate, evaluate.equality), 1),
+    )
+    evaluator = functools.partial(evaluate.case_average, mappings)
+    request = ReasoningRequest(
+        Product(rating=4, colour="red", tags=("a", "b")), limit=20, facets=[FacetConfig("colour")]
+    )
+    expected = casebase.infer(products, request, evaluator)
+    with storage.StoredCaseBase(path) as stored:
+        for source in (stored, stored.to_casebase(mappings)):
+            response = casebase.infer(source, request, evaluator)
+            assert response.total_number_of_hits == expected.total_number_of_hits
+            assert [hit.similarity for hit in response.hits] == [hit.similarity for hit in expected.hits]
+            assert [hit.case.as_dict() for hit in response.hits] == [asdict(hit.case) for hit in expected.hits]
+            assert response.facets == expected.facets
+
+
+def test_pickle_stored(tmp_path) -> None:
+    products = [replace(product, tags=product.tags or ()) for product in _products(200)]
+    path = str(tmp_path / "products.cbr")
+    storage.write(path, products, properties)
+    mappings = (
+        WeightedPropertyEvaluatorMapping("colour", evaluate.equality, 1),
+        WeightedPropertyEvaluatorMapping("tags", functools.partial(evaluate.set_intermediate, evaluate.equality), 1),
+    )
+    evaluator = functools.partial(evaluate.case_average, mappings)
+    request = ReasoningRequest(Product(colour="red", tags=("a", "b")), limit=10)
+    with storage.StoredCaseBase(path) as stored:
+        assert copy.copy(stored[3]).as_dict() == asdict(products[3])
+        case = pickle.loads(pickle.dumps(stored[5]))
+        assert case.as_dict() == asdict(products[5])
+        with pickle.loads(pickle.dumps(stored)) as unpickled:
+            assert [case.as_dict() for case in unpickled] == [asdict(product) for product in products]
+        expected = casebase.infer(stored, request, evaluator)
+        with ParallelCaseBase(stored, evaluator, shards=2) as parallel_casebase:
+            response = parallel_casebase.infer(request)
+        assert response.total_number_of_hits == expected.total_number_of_hits
+        assert [hit.similarity for hit in response.hits] == [hit.similarity for hit in expected.hits]
+        assert [hit.case.as_dict() for hit in response.hits] == [hit.case.as_dict() for hit in expected.hits]
+
+
+def test_to_casebase_wraps_columns_and_indexes(tmp_path) -> None:
+    products = [replace(product, tags=product.tags or ()) for product in _products(500)]
+    products.append(Product(rating=2**62, tags=("a",)))
+    path = str(tmp_path / "products.cbr")
+    storage.write(path, products, properties, indexes=True)
+    mappings = (
+        WeightedPropertyEvaluatorMapping(
+            "rating", functools.partial(evaluate.numeric, evaluate.NumericEvaluationOptions(min_=-3, max_=10)), 1
+        ),
+        WeightedPropertyEvaluatorMapping("colour", evaluate.equality, 2),
+        WeightedPropertyEvaluatorMapping("available", evaluate.equality, 1),
+        WeightedPropertyEvaluatorMapping("tags", functools.partial(evaluate.set_intermediate, evaluate.equality), 1),
+    )
+    expected = casebase.CaseBase(products, mappings, properties=properties)
+    with storage.StoredCaseBase(path) as stored:
+        wrapped = stored.to_casebase(mappings, properties=properties)
+        assert stored.to_casebase(mappings).columns["colour"] is wrapped.columns["colour"]
+        assert isinstance(wrapped.columns["rating"].values, memoryview)
+        assert isinstance(wrapped.columns["colour"].codes, memoryview)
+        for name in properties:
+            assert list(wrapped.columns[name]) == list(expected.columns[name])
+            assert list(wrapped.columns[name].missing) == list(expected.columns[name].missing)
+        for name in ("rating", "colour", "available"):
+            assert list(wrapped.columns[name].dictionary) == expected.columns[name].dictionary
+            assert list(wrapped.columns[name].codes) == list(expected.columns[name].codes)
+        assert wrapped.columns["tags"].element_codes[3] == expected.columns["tags"].element_codes[3]
+
+        values = (None, 0, 1, 1.0, True, False, 7, 2**62, "red", "purple", 3.5, float("nan"), ("a",), [1])
+        for name in ("price", "rating", "colour", "available"):
+            for value in values:
+                positions = wrapped.value_index(name).positions(value)
+                assert list(positions) == list(expected.value_index(name).positions(value))
+        for name in ("price", "rating"):
+            for low, high in ((-10, 3), (5, 50.5), (7, 7), (2**61, 2**63)):
+                assert list(wrapped.numeric_index(name).range(low, high)) == list(
+                    expected.numeric_index(name).range(low, high)
+                )
+        assert wrapped.numeric_index("colour") is None
+
+        evaluator = functools.partial(evaluate.case_average, mappings)
+        request = ReasoningRequest(
+            Product(rating=4, colour="red", available=True, tags=("a", "b")),
+            threshold=0.6,
+            facets=[FacetConfig("colour")],
+        )
+        response = casebase.infer(wrapped, request, evaluator)
+        expected_response = casebase.infer(products, request, evaluator)
+        assert response.total_number_of_hits == expected_response.total_number_of_hits
+        assert [hit.similarity for hit in response.hits] == [hit.similarity for hit in expected_response.hits]
+        assert [hit.case.as_dict() for hit in response.hits] == [asdict(hit.case) for hit in expected_response.hits]
+        assert response.facets == expected_response.facets
@@ -0,0 +1,99 @@
+import functools
+import math
+import random
+
+import pytest
+
+from cbrlib import casebase, evaluate, vectorized
+from cbrlib.casebase import CaseBase
+from cbrlib.columns import Column
+from cbrlib.types import (
+    FunctionCalculationParameter,
+    NumericEvaluationOptions,
+    NumericInterpolation,
+    ReasoningRequest,
+    WeightedPropertyEvaluatorMapping,
+)
+
+np = pytest.importorskip("numpy")
+
+
+def _parameters(rnd: random.Random) -> FunctionCalculationParameter:
+    equal = rnd.choice([0.0, 0.05, 0.2])
+    return FunctionCalculationParameter(
+        equal=equal,
+        tolerance=rnd.choice([equal, 0.3, 0.5, 1.0]),
+        linearity=rnd.choice([0.0, 0.5, 1.0, 2.0, 0.3]),
+        interpolation=rnd.choice(list(NumericInterpolation)),
+    )
+
+
+def _options(rnd: random.Random) -> NumericEvaluationOptions:
+    return NumericEvaluationOptions(
+        min_=rnd.choice([0, -10, 3.5]),
+        max_=rnd.choice([10, 24, 100.25]),
+        origin=rnd.choice([0, 5]),
+        use_origin=rnd.random() < 0.3,
+        cyclic=rnd.random() < 0.3,
+        if_less=_parameters(rnd),
+        if_more=_parameters(rnd),
+    )
+
+
+def test_vectorized_numeric_matches_scalar() -> None:
+    rnd = random.Random(42)
+    for _ in range(300):
+        options = _options(rnd)
+        cases = [rnd.choice([rnd.randint(-20, 120), rnd.uniform(-20, 120)]) for _ in range(200)]
+        for query in [rnd.randint(0, 100), rnd.uniform(-5, 105), options.origin, cases[0]]:
+            expected = [evaluate.numeric(options, query, case) for case in cases]
+            assert vectorized.numeric(options, query, cases).tolist() == expected
+
+
+def test_vectorized_numeric_no_distance() -> None:
+    options = NumericEvaluationOptions(10, 10)
+    assert vectorized.numeric(options, 10, [20, 0, 10]).tolist() == [1, 1, 1]
+
+
+def test_evaluate_column_uses_numbers() -> None:
+    options = NumericEvaluationOptions(0, 20)
+    evaluator = functools.partial(evaluate.numeric, options)
+    column = Column("size", [1, 5.5, 10, 19])
+    assert column.numbers is not None
+    assert evaluate.evaluate_column(evaluator, 10, column) == [evaluator(10, v) for v in column]
+
+
+def test_column_numbers_not_numeric() -> None:
+    assert Column("size", [1, None, 3]).numbers is None
+    assert Column("color", ["red"]).numbers is None
+    assert Column("size", [2**60]).numbers is None
+
+
+def _same(similarities: list[float], expected: list[float]) -> bool:
+    return len(similarities) == len(expected) and all(
+        similarity == value or (math.isnan(similarity) and math.isnan(value))
+        for similarity, value in zip(similarities, expected)
+    )
+
+
+@pytest.mark.parametrize("linearity", [0.0, 0.5, 1.0])
+def test_evaluate_column_non_finite_values(linearity) -> None:
+    parameters = FunctionCalculationParameter(equal=0.1, tolerance=0.5, linearity=linearity)
+    for cyclic in (False, True):
+        options = NumericEvaluationOptions(0, 20, cyclic=cyclic, if_less=parameters, if_more=parameters)
+        evaluator = functools.partial(evaluate.numeric, options)
+        column = Column("size", [1, math.nan, 10, math.inf, -math.inf, 19])
+        for query in (10, 3.5, math.nan, math.inf):
+            expected = [evaluator(query, value) for value in column]
+            assert _same(evaluate.evaluate_column(evaluator, query, column), expected)
+
+
+def test_infer_skips_nan_case_values() -> None:
+    options = NumericEvaluationOptions(0, 20)
+    mappings = (WeightedPropertyEvaluatorMapping("size", functools.partial(evaluate.numeric, options), 1),)
+    evaluator = functools.partial(evaluate.case_average, mappings, getvalue=dict.get)
+    cases = [{"size": size} for size in [1, math.nan, 10, math.inf]]
+    request = ReasoningRequest({"size": 10}, threshold=0)
+    for source in (cases, CaseBase(cases, mappings, getvalue=dict.get)):
+        response = casebase.infer(source, request, evaluator)
+        assert [hit.case["size"] for hit in response.hits] == [10, 1, math.inf]